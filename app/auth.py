@@ -1,11 +1,10 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from . import crud, models, schemas
+from . import crud, models, schemas, user_cache, io_executor
 from .database import get_db
 
 # Настройки JWT
@@ -13,19 +12,16 @@ SECRET_KEY = "your-secret-key-change-this-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Настройка для хеширования паролей
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
 # Схема безопасности
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет пароль"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return crud.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Хеширует пароль"""
-    return pwd_context.hash(password)
+    return crud.get_password_hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создает JWT токен"""
@@ -50,13 +46,8 @@ def verify_token(token: str) -> Optional[str]:
         return None
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
-    """Аутентифицирует пользователя"""
-    user = crud.get_user_by_username(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
+    """Аутентифицирует пользователя (с пересчетом устаревшего хеша)"""
+    return crud.authenticate_user(db, username, password)
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -74,9 +65,14 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = crud.get_user_by_username(db, username=username)
+    # Пользователь кэшируется по subject токена, чтобы не читать users на каждый запрос
+    user = user_cache.get_cached_user(username)
     if user is None:
-        raise credentials_exception
+        # Запрос к БД выполняем в пуле потоков, чтобы не блокировать event loop
+        user = await io_executor.run_io("db", crud.get_user_by_username, db, username=username)
+        if user is None:
+            raise credentials_exception
+        user_cache.cache_user(user)
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
@@ -84,3 +80,9 @@ async def get_current_active_user(current_user: models.User = Depends(get_curren
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_current_superuser(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+    """Получает активного пользователя с правами администратора"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    return current_user
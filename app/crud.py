@@ -1,18 +1,15 @@
 from sqlalchemy.orm import Session
-from . import models, schemas
-from passlib.context import CryptContext
+from . import models, schemas, user_cache, password_hashing
 from typing import Optional, List
 
-# Настройка для хеширования паролей
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет пароль"""
-    return pwd_context.verify(plain_password, hashed_password)
+    is_valid, _ = password_hashing.verify_password(plain_password, hashed_password)
+    return is_valid
 
 def get_password_hash(password: str) -> str:
-    """Хеширует пароль"""
-    return pwd_context.hash(password)
+    """Хеширует пароль в отдельном пуле процессов"""
+    return password_hashing.hash_password(password)
 
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
     """Получает пользователя по ID"""
@@ -54,12 +51,17 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> O
     if not db_user:
         return None
     
+    old_username = db_user.username
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
     db.commit()
     db.refresh(db_user)
+    
+    # Сбрасываем кэш аутентификации по старому и новому username
+    user_cache.invalidate_user(old_username)
+    user_cache.invalidate_user(db_user.username)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> bool:
@@ -68,15 +70,29 @@ def delete_user(db: Session, user_id: int) -> bool:
     if not db_user:
         return False
     
+    username = db_user.username
     db.delete(db_user)
     db.commit()
+    
+    user_cache.invalidate_user(username)
     return True
 
+def update_password_hash(db: Session, user: models.User, hashed_password: str) -> models.User:
+    """Сохраняет пересчитанный хеш пароля (например, после смены числа раундов)"""
+    user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(user)
+    return user
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
     """Аутентифицирует пользователя"""
     user = get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    is_valid, new_hash = password_hashing.verify_password(password, user.hashed_password)
+    if not is_valid:
         return None
+    if new_hash:
+        # Хеш создан с устаревшими параметрами - прозрачно пересчитываем при входе
+        update_password_hash(db, user, new_hash)
     return user
@@ -0,0 +1,278 @@
+"""
+Индекс DICOM серий ZIP архивов
+
+Имена DICOM файлов часто не имеют расширения или совпадают с SOP Instance UID
+(расширение ".1"), поэтому кандидатами считаются все файлы архива, кроме слишком
+маленьких и заведомо не DICOM по расширению; остальные отсеиваются по сигнатуре.
+
+Для каждого кандидата читается только заголовок (до пиксельных
+данных): локальный заголовок записи и начало ее данных запрашиваются из MinIO
+по Range, распаковываются и разбираются pydicom. Разбор идет пачками записей
+в отдельном пуле процессов. Результат - строки таблицы dicom_instances с
+положением среза в серии и смещением записи в архиве.
+
+Требует пакет pydicom; без него индексация пропускается.
+"""
+import io
+import os
+import zlib
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from . import job_crud, minio_utils, models, zip_utils
+from .database import SessionLocal
+
+# Количество процессов для разбора заголовков (0 - разбирать в текущем потоке)
+DICOM_INDEX_WORKERS = int(os.getenv("DICOM_INDEX_WORKERS", "2"))
+# Количество записей архива в одной задаче пула
+DICOM_INDEX_BATCH_SIZE = int(os.getenv("DICOM_INDEX_BATCH_SIZE", "50"))
+# Начальный объем данных записи для разбора заголовка; удваивается, если заголовок не поместился
+DICOM_HEADER_READ_BYTES = int(os.getenv("DICOM_HEADER_READ_BYTES", str(16 * 1024)))
+DICOM_HEADER_MAX_BYTES = int(os.getenv("DICOM_HEADER_MAX_BYTES", str(1024 * 1024)))
+# Файлы меньше этого размера не разбираются: в них не поместится заголовок с UID серии
+DICOM_MIN_FILE_SIZE = int(os.getenv("DICOM_MIN_FILE_SIZE", "128"))
+# Расширения файлов, которые заведомо не DICOM и не читаются из хранилища
+DICOM_SKIP_EXTENSIONS = [
+    extension.strip().lower()
+    for extension in os.getenv(
+        "DICOM_SKIP_EXTENSIONS",
+        ".txt,.xml,.json,.csv,.html,.htm,.pdf,.jpg,.jpeg,.png,.gif,.bmp,.zip,.exe,.dll,.ini,.log"
+    ).split(",")
+    if extension.strip()
+]
+
+# Columns (0028,0011) - последний нужный индексу тег заголовка
+_LAST_INDEXED_TAG = 0x00280011
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def is_available() -> bool:
+    """Установлен ли pydicom"""
+    try:
+        import pydicom  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_executor() -> ProcessPoolExecutor:
+    """Возвращает отдельный пул процессов для разбора заголовков DICOM"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=DICOM_INDEX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+def shutdown():
+    """Останавливает пул процессов"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def _iter_compressed(reader: minio_utils.MinIORangeReader, data_offset: int, compressed_size: int,
+                     chunk_size: int) -> Iterator[bytes]:
+    """Читает сжатые данные записи по частям"""
+    reader.seek(data_offset)
+    remaining = compressed_size
+    while remaining > 0:
+        chunk = reader.read(min(chunk_size, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+def _read_entry_prefix(reader: minio_utils.MinIORangeReader, entry: Dict, data_offset: int, length: int) -> Tuple[bytes, bool]:
+    """
+    Читает и распаковывает не меньше length байт с начала записи
+    
+    Возвращается все распакованное к этому моменту: последний блок сжатых
+    данных может дать заметно больше length байт.
+    
+    Returns:
+        Tuple[bytes, bool]: (prefix, complete) - complete=True, если прочитана вся запись
+    """
+    buffer = bytearray()
+    chunks = zip_utils.iter_entry_data(
+        _iter_compressed(reader, data_offset, entry['compressed_size'] or 0, length),
+        entry['compress_type']
+    )
+    try:
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= length:
+                break
+    finally:
+        chunks.close()
+    complete = entry['size'] is not None and len(buffer) >= entry['size']
+    return bytes(buffer), complete
+
+def _has_dicom_signature(prefix: bytes) -> bool:
+    """
+    Похоже ли начало файла на DICOM: маркер DICM после 128-байтной преамбулы или,
+    у файлов без преамбулы, первый тег группы 0002 или 0008 (Little Endian)
+    """
+    if prefix[128:132] == b"DICM":
+        return True
+    return prefix[:2] in (b"\x02\x00", b"\x08\x00")
+
+def _read_header(reader: minio_utils.MinIORangeReader, entry: Dict, data_offset: int):
+    """
+    Разбирает заголовок DICOM записи, увеличивая прочитанный объем, пока
+    в него не попадут все нужные теги
+    
+    Returns:
+        Dataset без пиксельных данных или None, если запись не DICOM
+        или заголовок разобрать не удалось
+    """
+    import pydicom
+    
+    length = DICOM_HEADER_READ_BYTES
+    while True:
+        prefix, complete = _read_entry_prefix(reader, entry, data_offset, length)
+        # Не DICOM файлы отсеиваются по первому прочитанному блоку, без разбора pydicom
+        if not _has_dicom_signature(prefix):
+            return None
+        try:
+            dataset = pydicom.dcmread(io.BytesIO(prefix), stop_before_pixels=True, force=True)
+        except Exception:
+            dataset = None
+        # Обрезанный заголовок разбирается без ошибок, поэтому проверяем, дошел ли разбор до нужных тегов
+        if dataset is not None and (complete or (len(dataset) and max(dataset.keys()) > _LAST_INDEXED_TAG)):
+            return dataset
+        if complete or length >= DICOM_HEADER_MAX_BYTES:
+            return dataset
+        length = min(length * 2, DICOM_HEADER_MAX_BYTES)
+
+def _text(dataset, keyword: str, max_length: int) -> Optional[str]:
+    value = dataset.get(keyword)
+    return str(value)[:max_length] if value not in (None, "") else None
+
+def _int(dataset, keyword: str) -> Optional[int]:
+    try:
+        return int(dataset.get(keyword))
+    except (TypeError, ValueError):
+        return None
+
+def _position(dataset) -> List[Optional[float]]:
+    """ImagePositionPatient в виде [x, y, z]"""
+    try:
+        x, y, z = (float(value) for value in dataset.get("ImagePositionPatient"))
+        return [x, y, z]
+    except (TypeError, ValueError):
+        return [None, None, None]
+
+def _instance_row(entry: Dict, data_offset: int, dataset) -> Dict:
+    """Строка таблицы dicom_instances для разобранного заголовка"""
+    x, y, z = _position(dataset)
+    return {
+        'job_file_id': entry['id'],
+        'path': entry['path'],
+        'study_instance_uid': _text(dataset, "StudyInstanceUID", 64),
+        'series_instance_uid': _text(dataset, "SeriesInstanceUID", 64),
+        'sop_instance_uid': _text(dataset, "SOPInstanceUID", 64),
+        'modality': _text(dataset, "Modality", 16),
+        'series_description': _text(dataset, "SeriesDescription", 255),
+        'instance_number': _int(dataset, "InstanceNumber"),
+        'image_position_x': x,
+        'image_position_y': y,
+        'image_position_z': z,
+        'rows': _int(dataset, "Rows"),
+        'columns': _int(dataset, "Columns"),
+        'header_offset': entry['header_offset'],
+        'data_offset': data_offset,
+    }
+
+def _index_entries(object_name: str, archive_size: int, entries: List[Dict]) -> List[Dict]:
+    """
+    Разбирает заголовки пачки записей одного архива (выполняется в пуле процессов)
+    
+    Записи отсортированы по смещению, поэтому соседние заголовки часто
+    попадают в уже загруженные блоки читателя.
+    """
+    reader = minio_utils.MinIORangeReader(object_name, size=archive_size, block_size=DICOM_HEADER_READ_BYTES)
+    rows = []
+    for entry in entries:
+        try:
+            reader.seek(entry['header_offset'])
+            data_offset = entry['header_offset'] + zip_utils.get_entry_data_offset(reader.read(zip_utils.LOCAL_HEADER_SIZE))
+            dataset = _read_header(reader, entry, data_offset)
+        except (zipfile.BadZipFile, zlib.error) as e:
+            print(f"⚠️  Не удалось прочитать запись '{entry['path']}': {e}")
+            continue
+        # Файлы без SeriesInstanceUID (не DICOM или без изображения) в индекс не попадают
+        if dataset is None or not dataset.get("SeriesInstanceUID"):
+            continue
+        rows.append(_instance_row(entry, data_offset, dataset))
+    return rows
+
+def _batches(entries: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for start in range(0, len(entries), size):
+        yield entries[start:start + size]
+
+def index_job(job: models.Job) -> int:
+    """
+    Строит индекс DICOM серий задания с ZIP архивом, заменяя предыдущий
+    
+    Returns:
+        int: Количество проиндексированных DICOM файлов
+    """
+    if job.file_type != "zip" or not job.file_path:
+        return 0
+    if not is_available():
+        print("⚠️  Пакет pydicom не установлен, индекс DICOM серий не строится")
+        return 0
+        
+    db = SessionLocal()
+    try:
+        job_files = job_crud.get_dicom_candidates(db, job.id, DICOM_MIN_FILE_SIZE, DICOM_SKIP_EXTENSIONS)
+        # Для записей без смещения (старые задания) заголовок найти нельзя
+        entries = sorted(
+            (
+                {
+                    'id': job_file.id,
+                    'path': job_file.path,
+                    'size': job_file.size,
+                    'compressed_size': job_file.compressed_size,
+                    'header_offset': job_file.header_offset,
+                    'compress_type': job_file.compress_type,
+                }
+                for job_file in job_files
+                if job_file.header_offset is not None and job_file.compress_type in zip_utils.STREAMABLE_COMPRESS_TYPES
+            ),
+            key=lambda entry: entry['header_offset']
+        )
+    finally:
+        db.close()
+        
+    rows: List[Dict] = []
+    if entries:
+        success, stat = minio_utils.stat_object(job.file_path)
+        if not success:
+            raise RuntimeError(f"Файл '{job.file_path}' недоступен в хранилище")
+        batches = list(_batches(entries, max(DICOM_INDEX_BATCH_SIZE, 1)))
+        if DICOM_INDEX_WORKERS <= 0:
+            results = [_index_entries(job.file_path, stat.size, batch) for batch in batches]
+        else:
+            executor = get_executor()
+            futures = [executor.submit(_index_entries, job.file_path, stat.size, batch) for batch in batches]
+            results = [future.result() for future in futures]
+        for batch_rows in results:
+            rows.extend(batch_rows)
+            
+    db = SessionLocal()
+    try:
+        job_crud.replace_dicom_instances(db, job.id, rows)
+    finally:
+        db.close()
+        
+    series_count = len({row['series_instance_uid'] for row in rows})
+    print(f"🩻 Задание {job.id}: проиндексировано DICOM файлов {len(rows)} из {len(entries)}, серий {series_count}")
+    return len(rows)
@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy import text
+from . import minio_utils, startup
+from .database import engine
+
+# Период фоновых проверок зависимостей
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "10"))
+# Максимальное время одной проверки
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "3"))
+# Результат старше этого считается устаревшим, и зависимость - недоступной
+HEALTH_RESULT_TTL_SECONDS = float(os.getenv("HEALTH_RESULT_TTL_SECONDS", "30"))
+
+class DependencyHealth:
+    """Последний результат проверки одной зависимости"""
+
+    def __init__(self, name: str, probe: Callable[[], None]):
+        self.name = name
+        self.probe = probe
+        self.healthy = False
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None  # time.monotonic() последней проверки
+        self.last_checked: Optional[datetime] = None
+        self.last_success: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.in_flight = False
+
+    def is_fresh(self) -> bool:
+        return self.checked_at is not None and time.monotonic() - self.checked_at <= HEALTH_RESULT_TTL_SECONDS
+
+    def is_healthy(self) -> bool:
+        return self.healthy and self.is_fresh()
+
+    def record(self, healthy: bool, latency_ms: float, error: Optional[str] = None):
+        now = datetime.now(timezone.utc)
+        self.healthy = healthy
+        self.latency_ms = round(latency_ms, 2)
+        self.checked_at = time.monotonic()
+        self.last_checked = now
+        self.last_error = error
+        if healthy:
+            self.last_success = now
+
+    def to_dict(self) -> Dict:
+        return {
+            "healthy": self.is_healthy(),
+            "stale": self.checked_at is not None and not self.is_fresh(),
+            "latency_ms": self.latency_ms,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "error": self.last_error,
+        }
+
+def probe_postgres():
+    """SELECT 1 через общий пул соединений"""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+def probe_minio():
+    """bucket_exists через общий клиент MinIO"""
+    if not minio_utils.get_minio_client().bucket_exists(minio_utils.MINIO_BUCKET):
+        raise RuntimeError(f"Bucket '{minio_utils.MINIO_BUCKET}' не найден")
+
+dependencies: Dict[str, DependencyHealth] = {
+    "postgresql": DependencyHealth("postgresql", probe_postgres),
+    "minio": DependencyHealth("minio", probe_minio),
+}
+
+# Время последнего прохода фонового цикла проверок (для liveness)
+_last_loop_tick: Optional[float] = None
+
+async def _run_probe(dependency: DependencyHealth):
+    """Выполняет одну проверку в пуле потоков с ограничением времени"""
+    # Зависшая проверка не запускается повторно, чтобы не копить потоки
+    if dependency.in_flight:
+        dependency.record(False, HEALTH_PROBE_TIMEOUT_SECONDS * 1000, "Предыдущая проверка еще не завершилась")
+        return
+
+    loop = asyncio.get_running_loop()
+    dependency.in_flight = True
+    started = time.perf_counter()
+    future = loop.run_in_executor(None, dependency.probe)
+    future.add_done_callback(lambda _: setattr(dependency, "in_flight", False))
+    try:
+        await asyncio.wait_for(asyncio.shield(future), timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+        dependency.record(True, (time.perf_counter() - started) * 1000)
+    except asyncio.TimeoutError:
+        dependency.record(False, (time.perf_counter() - started) * 1000, "Превышено время ожидания")
+    except Exception as e:
+        dependency.record(False, (time.perf_counter() - started) * 1000, f"{e.__class__.__name__}: {e}")
+
+async def run_probes():
+    """Параллельно проверяет все зависимости"""
+    global _last_loop_tick
+    await asyncio.gather(*(_run_probe(dependency) for dependency in dependencies.values()))
+    _last_loop_tick = time.monotonic()
+
+async def probe_loop():
+    """Фоновый цикл проверок; запускается в lifespan приложения"""
+    while True:
+        try:
+            await run_probes()
+        except Exception as e:
+            print(f"⚠️  Ошибка проверки зависимостей: {e}")
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL_SECONDS)
+
+def is_live() -> bool:
+    """
+    Процесс жив: фоновый цикл проверок выполняется
+
+    Если event loop заблокирован, цикл перестает обновляться и liveness падает.
+    До первого прохода процесс считается живым.
+    """
+    if _last_loop_tick is None:
+        return True
+    return time.monotonic() - _last_loop_tick <= HEALTH_PROBE_INTERVAL_SECONDS * 3 + HEALTH_PROBE_TIMEOUT_SECONDS
+
+def is_ready() -> bool:
+    """Экземпляр может принимать трафик: старт завершен и все зависимости доступны"""
+    return startup.is_ready() and all(dependency.is_healthy() for dependency in dependencies.values())
+
+def get_status() -> Dict:
+    """Сводка состояния по кэшированным результатам проверок (без обращения к зависимостям)"""
+    return {
+        "live": is_live(),
+        "ready": is_ready(),
+        "startup_finished": bool(startup.state["finished"]),
+        "dependencies": {name: dependency.to_dict() for name, dependency in dependencies.items()},
+    }
@@ -0,0 +1,205 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+import json
+import uuid
+
+# Максимальное количество диапазонов в одном Range запросе
+MAX_RANGES = 16
+# Количество строк NDJSON в одной порции ответа (по размеру страницы листинга MinIO)
+NDJSON_BATCH_SIZE = 1000
+
+class RangeNotSatisfiable(Exception):
+    """Ни один из запрошенных диапазонов не попадает в файл"""
+
+def format_http_date(value: datetime) -> str:
+    """Форматирует дату для заголовков Last-Modified/Date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def quote_etag(etag: str) -> str:
+    """Возвращает ETag в кавычках, как того требует HTTP"""
+    if etag.startswith('"') or etag.startswith('W/"'):
+        return etag
+    return f'"{etag}"'
+
+def content_disposition(file_name: str, disposition: str = "attachment") -> str:
+    """
+    Формирует заголовок Content-Disposition для произвольного имени файла
+    
+    Заголовки передаются в latin-1, поэтому в filename попадает ASCII версия
+    имени, а полное имя передается в filename* в UTF-8 (RFC 6266, RFC 5987).
+    """
+    fallback = "".join(
+        char if 32 <= ord(char) < 127 and char not in '"\\' else "_"
+        for char in file_name
+    )
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(file_name, safe='')}"
+
+def _strip_etag(etag: str) -> str:
+    """Приводит ETag к виду для слабого сравнения"""
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    return etag.strip('"')
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Разбирает заголовок Range
+    
+    Args:
+        range_header: Значение заголовка Range
+        size: Размер файла в байтах
+        
+    Returns:
+        Optional[List[Tuple[int, int]]]: Список диапазонов (start, end) включительно
+        или None если заголовок отсутствует или некорректен и нужно отдать весь файл
+        
+    Raises:
+        RangeNotSatisfiable: если ни один диапазон не попадает в файл
+    """
+    if not range_header:
+        return None
+        
+    unit, _, ranges_spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges_spec:
+        return None
+        
+    specs = [spec.strip() for spec in ranges_spec.split(",") if spec.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+        
+    ranges = []
+    for spec in specs:
+        start_str, dash, end_str = spec.partition("-")
+        if not dash:
+            return None
+        try:
+            if not start_str:
+                # Суффиксный диапазон: последние N байт
+                suffix_length = int(end_str)
+                if suffix_length <= 0:
+                    continue
+                start, end = max(size - suffix_length, 0), size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else size - 1
+                if end_str and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+            
+        if start < size and start <= end:
+            ranges.append((start, end))
+            
+    if not ranges:
+        raise RangeNotSatisfiable()
+    return ranges
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """Проверяет условие If-Range: диапазон отдается только если файл не изменился"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        # Для If-Range используется строгое сравнение ETag
+        return if_range == quote_etag(etag)
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return last_modified is not None and _truncate_seconds(last_modified) == since
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Проверяет условные заголовки запроса
+    
+    If-None-Match имеет приоритет над If-Modified-Since.
+    
+    Returns:
+        bool: True если клиенту можно ответить 304 Not Modified
+    """
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        current = _strip_etag(etag)
+        return any(_strip_etag(candidate) == current for candidate in if_none_match.split(","))
+        
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _truncate_seconds(last_modified) <= since
+        
+    return False
+
+def _truncate_seconds(value: datetime) -> datetime:
+    """Отбрасывает доли секунды: в HTTP датах точность до секунды"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def content_range(start: int, end: int, size: int) -> str:
+    """Формирует значение заголовка Content-Range"""
+    return f"bytes {start}-{end}/{size}"
+
+def new_multipart_boundary() -> str:
+    """Генерирует разделитель для ответа multipart/byteranges"""
+    return uuid.uuid4().hex
+
+def _multipart_part_header(boundary: str, content_type: str, start: int, end: int, size: int) -> bytes:
+    return (
+        f"\r\n--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: {content_range(start, end, size)}\r\n\r\n"
+    ).encode()
+
+def multipart_byteranges_length(ranges: List[Tuple[int, int]], boundary: str, content_type: str, size: int) -> int:
+    """Считает длину тела multipart/byteranges без его формирования"""
+    length = len(f"\r\n--{boundary}--\r\n".encode())
+    for start, end in ranges:
+        length += len(_multipart_part_header(boundary, content_type, start, end, size))
+        length += end - start + 1
+    return length
+
+def iter_multipart_byteranges(ranges: List[Tuple[int, int]], open_range: Callable[[int, int], Iterator[bytes]],
+                              boundary: str, content_type: str, size: int) -> Iterator[bytes]:
+    """
+    Отдает тело multipart/byteranges, читая каждый диапазон потоком
+    
+    Args:
+        ranges: Диапазоны (start, end) включительно
+        open_range: Функция, возвращающая поток байт диапазона по (offset, length)
+    """
+    for start, end in ranges:
+        yield _multipart_part_header(boundary, content_type, start, end, size)
+        yield from open_range(start, end - start + 1)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {value.__class__.__name__} не сериализуется в JSON")
+
+def iter_ndjson(items: Iterable[dict], batch_size: int = NDJSON_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Кодирует элементы в NDJSON (один JSON объект на строку)
+    
+    Строки отдаются порциями по batch_size, поэтому в памяти находится
+    не больше одной порции независимо от количества элементов.
+    """
+    lines = []
+    for item in items:
+        lines.append(json.dumps(item, ensure_ascii=False, default=_json_default))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Размер пула потоков для блокирующих операций с объектным хранилищем
+IO_EXECUTOR_MAX_WORKERS = int(os.getenv("IO_EXECUTOR_MAX_WORKERS", "32"))
+
+# Ограничения одновременных операций каждого типа, чтобы медленные загрузки
+# не занимали все потоки пула
+IO_OPERATION_LIMITS = {
+    "upload": int(os.getenv("IO_LIMIT_UPLOAD", "8")),
+    "download": int(os.getenv("IO_LIMIT_DOWNLOAD", "16")),
+    "list": int(os.getenv("IO_LIMIT_LIST", "4")),
+    "delete": int(os.getenv("IO_LIMIT_DELETE", "8")),
+    "presign": int(os.getenv("IO_LIMIT_PRESIGN", "8")),
+    "db": int(os.getenv("IO_LIMIT_DB", "10")),
+}
+IO_DEFAULT_LIMIT = int(os.getenv("IO_LIMIT_DEFAULT", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def get_executor() -> ThreadPoolExecutor:
+    """Возвращает общий пул потоков для операций ввода-вывода"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_EXECUTOR_MAX_WORKERS, thread_name_prefix="io")
+    return _executor
+
+def _get_semaphore(operation: str) -> asyncio.Semaphore:
+    """Возвращает семафор, ограничивающий одновременные операции данного типа"""
+    semaphore = _semaphores.get(operation)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(IO_OPERATION_LIMITS.get(operation, IO_DEFAULT_LIMIT))
+        _semaphores[operation] = semaphore
+    return semaphore
+
+async def run_io(operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет блокирующую функцию в пуле потоков, не блокируя event loop
+    
+    Args:
+        operation: Тип операции для ограничения параллелизма (upload, download, ...)
+        func: Блокирующая функция
+    """
+    async with _get_semaphore(operation):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+async def iterate_in_executor(iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Читает блокирующий итератор в пуле потоков, отдавая элементы асинхронно"""
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(get_executor(), next, iterator, sentinel)
+            if chunk is sentinel:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await loop.run_in_executor(get_executor(), close)
+
+def shutdown():
+    """Останавливает пул потоков"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
@@ -1,115 +1,805 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
-from typing import Optional, List
+from sqlalchemy import insert, update, delete, select, case, tuple_, or_, func
+from sqlalchemy.orm import Session, load_only
+from . import metrics, models, schemas
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime, timedelta, timezone
+import base64
+import os
 import uuid
-import json
 
-def get_job(db: Session, job_id: int) -> Optional[models.Job]:
-    """Получает задание по ID"""
-    return db.query(models.Job).filter(models.Job.id == job_id).first()
+# Статус задания, файл которого клиент загружает напрямую в MinIO
+UPLOADING_STATUS = "uploading"
+# Прямая загрузка, не завершенная за этот срок, считается брошенной (должен быть больше MINIO_PRESIGNED_UPLOAD_EXPIRES)
+DIRECT_UPLOAD_TTL_SECONDS = int(os.getenv("DIRECT_UPLOAD_TTL_SECONDS", str(2 * 3600)))
 
-def get_job_by_uuid(db: Session, job_uuid: str) -> Optional[models.Job]:
-    """Получает задание по UUID"""
-    return db.query(models.Job).filter(models.Job.uuid == job_uuid).first()
+# Настройки очереди обработки заданий
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))  # Срок аренды задания воркером
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # После стольких попыток задание считается failed
+# Сессия возобновляемой загрузки без новых частей дольше этого срока считается брошенной
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+
+def _job_conditions(job_id: int, owner_id: Optional[int] = None) -> list:
+    """Условия WHERE для задания; с owner_id чужое задание просто не находится"""
+    conditions = [models.Job.id == job_id]
+    if owner_id is not None:
+        conditions.append(models.Job.owner_id == owner_id)
+    return conditions
+
+def _update_jobs_returning(db: Session, conditions: list, values: Dict) -> List[models.Job]:
+    """
+    Обновляет задания одним запросом UPDATE ... RETURNING
+    
+    Коммит выполняет вызывающий код.
+    """
+    stmt = (
+        update(models.Job)
+        .where(*conditions)
+        .values(**values)
+        .returning(models.Job)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    return db.execute(stmt).scalars().all()
+
+def _update_job_returning(db: Session, conditions: list, values: Dict) -> Optional[models.Job]:
+    """Обновляет одно задание запросом UPDATE ... RETURNING"""
+    jobs = _update_jobs_returning(db, conditions, values)
+    return jobs[0] if jobs else None
+
+def get_job(db: Session, job_id: int, owner_id: Optional[int] = None) -> Optional[models.Job]:
+    """Получает задание по ID (если указан owner_id - только задание этого пользователя)"""
+    return db.query(models.Job).filter(*_job_conditions(job_id, owner_id)).first()
+
+def get_job_by_uuid(db: Session, job_uuid: str, owner_id: Optional[int] = None) -> Optional[models.Job]:
+    """Получает задание по UUID (если указан owner_id - только задание этого пользователя)"""
+    query = db.query(models.Job).filter(models.Job.uuid == job_uuid)
+    if owner_id is not None:
+        query = query.filter(models.Job.owner_id == owner_id)
+    return query.first()
 
 def get_jobs_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[models.Job]:
     """Получает задания пользователя с пагинацией"""
     return db.query(models.Job).filter(models.Job.owner_id == owner_id).offset(skip).limit(limit).all()
 
+# Колонки, которые загружаются для списка заданий (без тяжелых полей вроде zip_contents)
+JOB_SUMMARY_COLUMNS = (
+    models.Job.id,
+    models.Job.uuid,
+    models.Job.title,
+    models.Job.status,
+    models.Job.file_name,
+    models.Job.file_size,
+    models.Job.file_type,
+    models.Job.created_at,
+    models.Job.completed_at,
+)
+
+def encode_job_cursor(job: models.Job) -> str:
+    """Кодирует позицию задания (created_at, id) в курсор пагинации"""
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_job_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Декодирует курсор пагинации, возвращает None если курсор некорректен"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, job_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(job_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def get_jobs_page_by_owner(db: Session, owner_id: int, limit: int = 100, after: Optional[Tuple[datetime, int]] = None) -> Tuple[List[models.Job], Optional[str]]:
+    """
+    Получает страницу заданий пользователя с keyset пагинацией
+    
+    Задания отсортированы от новых к старым по (created_at, id). Загружаются
+    только колонки для списка, а позиция страницы задается курсором, поэтому
+    стоимость запроса не зависит от глубины прокрутки.
+    
+    Returns:
+        Tuple[List[Job], Optional[str]]: (jobs, next_cursor)
+    """
+    query = (
+        db.query(models.Job)
+        .options(load_only(*JOB_SUMMARY_COLUMNS))
+        .filter(models.Job.owner_id == owner_id)
+    )
+    if after is not None:
+        query = query.filter(tuple_(models.Job.created_at, models.Job.id) < tuple_(*after))
+    
+    jobs = query.order_by(models.Job.created_at.desc(), models.Job.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = encode_job_cursor(jobs[-1])
+    return jobs, next_cursor
+
 def get_all_jobs(db: Session, skip: int = 0, limit: int = 100) -> List[models.Job]:
     """Получает все задания с пагинацией"""
     return db.query(models.Job).offset(skip).limit(limit).all()
 
-def create_job(db: Session, job: schemas.JobCreate, owner_id: int) -> models.Job:
-    """Создает новое задание"""
-    db_job = models.Job(
-        title=job.title,
-        description=job.description,
-        file_type=job.file_type or "single",
-        owner_id=owner_id,
-        uuid=uuid.uuid4()
-    )
-    db.add(db_job)
+def _file_info_values(file_name: str, file_size: int, file_content_type: str, file_path: str, file_type: str = "single", file_checksum: Optional[str] = None, zip_info: Optional[Dict] = None, upload_id: Optional[str] = None) -> Dict:
+    """
+    Значения колонок задания с информацией о загруженном файле
+    
+    upload_id задается только для незавершенной multipart загрузки и сбрасывается,
+    когда информация о файле обновляется после загрузки.
+    """
+    values = {
+        'file_name': file_name,
+        'file_size': file_size,
+        'file_content_type': file_content_type,
+        'file_path': file_path,
+        'file_type': file_type,
+        'file_checksum': file_checksum,
+        'upload_id': upload_id,
+    }
+    # Агрегированная статистика ZIP архива
+    if zip_info:
+        values.update(_zip_info_values(zip_info))
+    return values
+
+def _job_values(job: schemas.JobCreate, owner_id: int, file_info: Optional[Dict] = None, status: Optional[str] = None) -> Dict:
+    """Значения колонок нового задания"""
+    values = {
+        'title': job.title,
+        'description': job.description,
+        'file_type': job.file_type or "single",
+        'owner_id': owner_id,
+        'uuid': uuid.uuid4(),
+    }
+    if status:
+        values['status'] = status
+    if file_info:
+        values.update(_file_info_values(**file_info))
+    return values
+
+@metrics.db_timer("create_job")
+def create_job(db: Session, job: schemas.JobCreate, owner_id: int, file_info: Optional[Dict] = None, zip_contents: Optional[List[dict]] = None, status: Optional[str] = None) -> models.Job:
+    """
+    Создает новое задание одним запросом INSERT ... RETURNING
+    
+    Args:
+        file_info: Информация об уже загруженном файле (аргументы update_job_file_info
+            кроме zip_contents) - задание сразу создается с файлом
+        zip_contents: Список файлов ZIP архива для таблицы job_files
+        status: Начальный статус (по умолчанию pending)
+    """
+    stmt = insert(models.Job).values(**_job_values(job, owner_id, file_info, status)).returning(models.Job)
+    db_job = db.execute(stmt).scalars().one()
+    
+    # Сохраняем содержимое ZIP архива в той же транзакции
+    if zip_contents:
+        create_job_files(db, db_job.id, zip_contents)
+        
     db.commit()
-    db.refresh(db_job)
     return db_job
 
-def update_job(db: Session, job_id: int, job_update: schemas.JobUpdate) -> Optional[models.Job]:
-    """Обновляет задание"""
-    db_job = get_job(db, job_id)
-    if not db_job:
-        return None
+@metrics.db_timer("create_jobs")
+def create_jobs(db: Session, owner_id: int, items: List[Tuple[schemas.JobCreate, Optional[Dict], Optional[List[dict]]]]) -> List[models.Job]:
+    """
+    Создает несколько заданий в одной транзакции
     
-    update_data = job_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_job, field, value)
+    Задания вставляются одним INSERT ... RETURNING, файлы всех архивов -
+    одной пакетной вставкой в job_files.
+    
+    Args:
+        items: Список (job, file_info, zip_contents) - как аргументы create_job
+    """
+    if not items:
+        return []
+        
+    rows = [_job_values(job, owner_id, file_info) for job, file_info, _ in items]
+    
+    # Значения в строках могут отличаться набором колонок - выравниваем их
+    columns = set().union(*rows)
+    rows = [{column: row.get(column) for column in columns} for row in rows]
+    
+    db_jobs = db.scalars(insert(models.Job).returning(models.Job, sort_by_parameter_order=True), rows).all()
     
+    file_rows = []
+    for db_job, (_, _, zip_contents) in zip(db_jobs, items):
+        if zip_contents:
+            file_rows.extend(_job_file_rows(db_job.id, zip_contents))
+    if file_rows:
+        db.execute(insert(models.JobFile), file_rows)
+        
+    db.commit()
+    return db_jobs
+
+def update_job(db: Session, job_id: int, job_update: schemas.JobUpdate, owner_id: Optional[int] = None) -> Optional[models.Job]:
+    """
+    Обновляет задание (если указан owner_id - только задание этого пользователя)
+    
+    Статус задания, файл которого еще загружается, не меняется: такое задание
+    не находится, если в job_update передан статус.
+    """
+    update_data = job_update.dict(exclude_unset=True)
+    # status: null не сбрасывает статус
+    if update_data.get('status', "") is None:
+        del update_data['status']
+    if not update_data:
+        return get_job(db, job_id, owner_id=owner_id)
+        
+    conditions = _job_conditions(job_id, owner_id)
+    if 'status' in update_data:
+        conditions.append(models.Job.status != UPLOADING_STATUS)
+        update_data.update(_status_values(update_data['status']))
+    db_job = _update_job_returning(db, conditions, update_data)
     db.commit()
-    db.refresh(db_job)
     return db_job
 
-def update_job_file_info(db: Session, job_id: int, file_name: str, file_size: int, file_content_type: str, file_path: str, file_type: str = "single", zip_contents: Optional[List[dict]] = None) -> Optional[models.Job]:
+@metrics.db_timer("update_job_file_info")
+def update_job_file_info(db: Session, job_id: int, file_name: str, file_size: int, file_content_type: str, file_path: str, file_type: str = "single", zip_contents: Optional[List[dict]] = None, file_checksum: Optional[str] = None, zip_info: Optional[Dict] = None, owner_id: Optional[int] = None) -> Optional[models.Job]:
     """Обновляет информацию о файле в задании"""
-    db_job = get_job(db, job_id)
+    values = _file_info_values(file_name, file_size, file_content_type, file_path, file_type, file_checksum, zip_info)
+    db_job = _update_job_returning(db, _job_conditions(job_id, owner_id), values)
     if not db_job:
+        db.rollback()
         return None
     
-    db_job.file_name = file_name
-    db_job.file_size = file_size
-    db_job.file_content_type = file_content_type
-    db_job.file_path = file_path
-    db_job.file_type = file_type
-    
-    # Сохраняем содержимое ZIP архива как JSON
+    # Сохраняем содержимое ZIP архива в таблицу job_files
     if zip_contents:
-        db_job.zip_contents = json.dumps(zip_contents, ensure_ascii=False)
+        create_job_files(db, job_id, zip_contents)
     
     db.commit()
-    db.refresh(db_job)
     return db_job
 
-def update_job_status(db: Session, job_id: int, status: str) -> Optional[models.Job]:
-    """Обновляет статус задания"""
-    db_job = get_job(db, job_id)
+@metrics.db_timer("finalize_job_upload")
+def finalize_job_upload(db: Session, job_id: int, owner_id: int, file_info: Dict, zip_contents: Optional[List[dict]] = None) -> Optional[models.Job]:
+    """
+    Сохраняет информацию о файле, загруженном напрямую в MinIO, и ставит задание в очередь
+    
+    Задание обновляется только из статуса uploading, поэтому повторный или
+    параллельный finalize не создаст записи job_files дважды.
+    
+    Returns:
+        Optional[models.Job]: Задание или None если оно не найдено или уже не ожидает загрузки
+    """
+    conditions = _job_conditions(job_id, owner_id) + [models.Job.status == UPLOADING_STATUS]
+    values = _file_info_values(**file_info)
+    values['status'] = "pending"
+    db_job = _update_job_returning(db, conditions, values)
     if not db_job:
+        db.rollback()
+        return None
+        
+    if zip_contents:
+        create_job_files(db, job_id, zip_contents)
+        
+    db.commit()
+    return db_job
+
+def _zip_time_to_datetime(date_time) -> Optional[datetime]:
+    """Преобразует время из заголовка ZIP в datetime"""
+    try:
+        return datetime(*date_time) if date_time else None
+    except (TypeError, ValueError):
         return None
+
+def create_job_files(db: Session, job_id: int, zip_contents: List[dict]) -> int:
+    """
+    Сохраняет список файлов ZIP архива одной пакетной вставкой
     
-    db_job.status = status
-    if status == "completed":
-        from sqlalchemy.sql import func
-        db_job.completed_at = func.now()
+    Коммит выполняет вызывающий код.
+    """
+    rows = _job_file_rows(job_id, zip_contents)
+    if rows:
+        db.execute(insert(models.JobFile), rows)
+    return len(rows)
+
+def _job_file_rows(job_id: int, zip_contents: List[dict]) -> List[dict]:
+    """Строки таблицы job_files для файлов ZIP архива"""
+    return [
+        {
+            'job_id': job_id,
+            'path': entry['filename'],
+            'extension': os.path.splitext(entry['filename'])[1].lower() or None,
+            'size': entry.get('size'),
+            'compressed_size': entry.get('compressed_size'),
+            'content_type': entry.get('content_type'),
+            'mtime': _zip_time_to_datetime(entry.get('modified_time')),
+            'header_offset': entry.get('header_offset'),
+            'compress_type': entry.get('compress_type'),
+            'crc32': entry.get('crc'),
+        }
+        for entry in zip_contents
+    ]
+
+def _job_files_query(db: Session, job_id: int, extension: Optional[str] = None, min_size: Optional[int] = None, max_size: Optional[int] = None, path_prefix: Optional[str] = None):
+    """Строит запрос к файлам задания с фильтрами"""
+    query = db.query(models.JobFile).filter(models.JobFile.job_id == job_id)
+    if extension is not None:
+        extension = extension.lower()
+        if extension and not extension.startswith('.'):
+            extension = f".{extension}"
+        query = query.filter(models.JobFile.extension == (extension or None))
+    if min_size is not None:
+        query = query.filter(models.JobFile.size >= min_size)
+    if max_size is not None:
+        query = query.filter(models.JobFile.size <= max_size)
+    if path_prefix:
+        query = query.filter(models.JobFile.path.startswith(path_prefix, autoescape=True))
+    return query
+
+def get_job_files(db: Session, job_id: int, skip: int = 0, limit: int = 100, extension: Optional[str] = None, min_size: Optional[int] = None, max_size: Optional[int] = None, path_prefix: Optional[str] = None) -> List[models.JobFile]:
+    """Получает файлы ZIP архива задания с фильтрами и пагинацией"""
+    query = _job_files_query(db, job_id, extension, min_size, max_size, path_prefix)
+    return query.order_by(models.JobFile.id).offset(skip).limit(limit).all()
+
+def count_job_files(db: Session, job_id: int, extension: Optional[str] = None, min_size: Optional[int] = None, max_size: Optional[int] = None, path_prefix: Optional[str] = None) -> int:
+    """Считает файлы ZIP архива задания с фильтрами"""
+    return _job_files_query(db, job_id, extension, min_size, max_size, path_prefix).count()
+
+def get_job_file_by_path(db: Session, job_id: int, path: str) -> Optional[models.JobFile]:
+    """Получает файл ZIP архива задания по пути внутри архива"""
+    return db.query(models.JobFile).filter(models.JobFile.job_id == job_id, models.JobFile.path == path).first()
+
+def update_job_file_location(db: Session, job_file: models.JobFile, header_offset: int, compress_type: int, crc32: Optional[int] = None) -> models.JobFile:
+    """Сохраняет положение записи в архиве для файлов, загруженных до появления этих колонок"""
+    job_file.header_offset = header_offset
+    job_file.compress_type = compress_type
+    job_file.crc32 = crc32
+    db.commit()
+    return job_file
+
+def _zip_info_values(zip_info: Dict) -> Dict:
+    """Значения колонок задания со статистикой ZIP архива"""
+    return {
+        'zip_total_files': zip_info.get('total_files'),
+        'zip_total_size': zip_info.get('total_size'),
+        'zip_total_compressed_size': zip_info.get('total_compressed_size'),
+        'zip_compression_ratio': zip_info.get('compression_ratio'),
+        'zip_is_encrypted': zip_info.get('is_encrypted'),
+        'zip_comment': zip_info.get('comment'),
+    }
+
+def update_job_zip_info(db: Session, job_id: int, zip_info: Dict) -> Optional[models.Job]:
+    """Сохраняет статистику ZIP архива в задании"""
+    db_job = _update_job_returning(db, _job_conditions(job_id), _zip_info_values(zip_info))
+    db.commit()
+    return db_job
+
+def get_job_zip_info(db_job: models.Job) -> Optional[Dict]:
+    """Возвращает сохраненную статистику ZIP архива или None если она не вычислена"""
+    if db_job.zip_total_files is None:
+        return None
+    
+    return {
+        'total_files': db_job.zip_total_files,
+        'total_size': db_job.zip_total_size,
+        'total_compressed_size': db_job.zip_total_compressed_size,
+        'compression_ratio': db_job.zip_compression_ratio,
+        'is_encrypted': db_job.zip_is_encrypted,
+        'comment': db_job.zip_comment
+    }
+
+def get_dicom_candidates(db: Session, job_id: int, min_size: int = 0, skip_extensions: Optional[List[str]] = None) -> List[models.JobFile]:
+    """
+    Файлы архива, которые могут быть DICOM
     
+    Расширение DICOM файла ничего не говорит (часто его нет или это часть UID),
+    поэтому отбрасываются только файлы меньше min_size и с расширениями из skip_extensions.
+    """
+    conditions = [models.JobFile.job_id == job_id, models.JobFile.size >= min_size]
+    if skip_extensions:
+        conditions.append(or_(models.JobFile.extension.is_(None), models.JobFile.extension.notin_(skip_extensions)))
+    return db.query(models.JobFile).filter(*conditions).all()
+
+@metrics.db_timer("replace_dicom_instances")
+def replace_dicom_instances(db: Session, job_id: int, rows: List[dict]) -> int:
+    """
+    Заменяет индекс DICOM серий задания одной транзакцией
+    
+    Args:
+        rows: Строки dicom_instances без job_id
+    """
+    db.execute(delete(models.DicomInstance).where(models.DicomInstance.job_id == job_id))
+    if rows:
+        db.execute(insert(models.DicomInstance), [{**row, 'job_id': job_id} for row in rows])
+    db.execute(
+        update(models.Job)
+        .where(models.Job.id == job_id)
+        .values(dicom_indexed_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(rows)
+
+def get_dicom_series(db: Session, job_id: int) -> List:
+    """Серии задания с количеством срезов"""
+    return db.query(
+        models.DicomInstance.series_instance_uid,
+        func.min(models.DicomInstance.study_instance_uid).label('study_instance_uid'),
+        func.min(models.DicomInstance.modality).label('modality'),
+        func.min(models.DicomInstance.series_description).label('series_description'),
+        func.min(models.DicomInstance.rows).label('rows'),
+        func.min(models.DicomInstance.columns).label('columns'),
+        func.count(models.DicomInstance.id).label('instance_count'),
+    ).filter(
+        models.DicomInstance.job_id == job_id
+    ).group_by(
+        models.DicomInstance.series_instance_uid
+    ).order_by(
+        models.DicomInstance.series_instance_uid
+    ).all()
+
+def get_dicom_instances(db: Session, job_id: int, series_uid: str) -> List[models.DicomInstance]:
+    """Срезы серии в порядке InstanceNumber, затем положения по оси z"""
+    return db.query(models.DicomInstance).filter(
+        models.DicomInstance.job_id == job_id,
+        models.DicomInstance.series_instance_uid == series_uid
+    ).order_by(
+        models.DicomInstance.instance_number.asc().nullslast(),
+        models.DicomInstance.image_position_z.asc().nullslast(),
+        models.DicomInstance.path
+    ).all()
+
+def _status_values(status, error: Optional[str] = None) -> Dict:
+    """Значения колонок при смене статуса; при выходе из processing аренда снимается"""
+    values = {'status': status}
+    if isinstance(status, str):
+        if status == "completed":
+            values['completed_at'] = func.now()
+        if status != "processing":
+            values['worker_id'] = None
+            values['lease_expires_at'] = None
+    if error is not None:
+        values['last_error'] = error
+    return values
+
+def _worker_conditions(job_id: int, worker_id: Optional[str] = None) -> list:
+    """Условия WHERE для задания, находящегося в обработке у воркера"""
+    conditions = [models.Job.id == job_id]
+    if worker_id is not None:
+        conditions += [models.Job.status == "processing", models.Job.worker_id == worker_id]
+    return conditions
+
+@metrics.db_timer("update_job_status")
+def update_job_status(db: Session, job_id: int, status: str, worker_id: Optional[str] = None, error: Optional[str] = None, owner_id: Optional[int] = None) -> Optional[models.Job]:
+    """
+    Обновляет статус задания
+    
+    Если указан worker_id, статус меняется только пока задание находится
+    в обработке у этого воркера (аренда не истекла и не перехвачена).
+    При выходе из статуса processing аренда снимается.
+    """
+    conditions = _worker_conditions(job_id, worker_id)
+    if owner_id is not None:
+        conditions.append(models.Job.owner_id == owner_id)
+    db_job = _update_job_returning(db, conditions, _status_values(status, error))
     db.commit()
-    db.refresh(db_job)
     return db_job
 
-def delete_job(db: Session, job_id: int) -> bool:
-    """Удаляет задание"""
-    db_job = get_job(db, job_id)
-    if not db_job:
-        return False
+@metrics.db_timer("delete_job")
+def delete_job(db: Session, job_id: int, owner_id: Optional[int] = None):
+    """
+    Удаляет задание одним запросом DELETE ... RETURNING
     
-    db.delete(db_job)
+    Файлы архива удаляются каскадно на стороне БД.
+    
+    Returns:
+        Строка (id, file_path) удаленного задания или None если задание не найдено
+    """
+    stmt = delete(models.Job).where(*_job_conditions(job_id, owner_id)).returning(models.Job.id, models.Job.file_path)
+    deleted = db.execute(stmt).first()
+    db.commit()
+    return deleted
+
+@metrics.db_timer("delete_jobs")
+def delete_jobs(db: Session, job_ids: List[int], owner_id: Optional[int] = None) -> list:
+    """
+    Удаляет несколько заданий одним DELETE ... RETURNING
+    
+    Returns:
+        Строки (id, file_path) удаленных заданий
+    """
+    if not job_ids:
+        return []
+    conditions = [models.Job.id.in_(job_ids)]
+    if owner_id is not None:
+        conditions.append(models.Job.owner_id == owner_id)
+    stmt = delete(models.Job).where(*conditions).returning(models.Job.id, models.Job.file_path)
+    deleted = db.execute(stmt).all()
     db.commit()
-    return True
+    return deleted
+
+@metrics.db_timer("get_referenced_file_paths")
+def get_referenced_file_paths(db: Session, file_paths: List[str]) -> set:
+    """Возвращает пути объектов из списка, на которые ссылается хотя бы одно задание"""
+    paths = {path for path in file_paths if path}
+    if not paths:
+        return set()
+    rows = db.execute(select(models.Job.file_path).where(models.Job.file_path.in_(paths)).distinct()).all()
+    return {row.file_path for row in rows}
+
+def get_unreferenced_file_paths(db: Session, file_paths: List[str]) -> List[str]:
+    """
+    Оставляет из списка пути объектов, на которые больше не ссылается ни одно задание
+    
+    Объект бакета удаляется из MinIO только вместе с последним ссылающимся на него заданием.
+    """
+    paths = list(dict.fromkeys(path for path in file_paths if path))
+    referenced = get_referenced_file_paths(db, paths)
+    return [path for path in paths if path not in referenced]
+
+@metrics.db_timer("update_jobs_status")
+def update_jobs_status(db: Session, job_ids: List[int], status: str, owner_id: Optional[int] = None) -> List[models.Job]:
+    """
+    Обновляет статус нескольких заданий одним UPDATE ... RETURNING
+    
+    Задания в статусе uploading не меняются: без загруженного файла их нельзя ставить в очередь.
+    """
+    if not job_ids:
+        return []
+    conditions = [models.Job.id.in_(job_ids), models.Job.status != UPLOADING_STATUS]
+    if owner_id is not None:
+        conditions.append(models.Job.owner_id == owner_id)
+    db_jobs = _update_jobs_returning(db, conditions, _status_values(status))
+    db.commit()
+    return db_jobs
 
 def get_jobs_by_status(db: Session, status: str, skip: int = 0, limit: int = 100) -> List[models.Job]:
     """Получает задания по статусу"""
     return db.query(models.Job).filter(models.Job.status == status).offset(skip).limit(limit).all()
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def requeue_expired_jobs(db: Session, limit: int = 100) -> int:
+    """
+    Возвращает в очередь задания, воркер которых перестал присылать heartbeat
+    
+    Задания, исчерпавшие JOB_MAX_ATTEMPTS попыток, переводятся в failed.
+    Задания выбираются с SKIP LOCKED и не больше limit за вызов, поэтому
+    параллельные воркеры не ждут блокировок друг друга.
+    Изменения не коммитятся - это делает вызывающий код.
+    
+    Returns:
+        int: Количество заданий с истекшей арендой
+    """
+    expired_ids = (
+        select(models.Job.id)
+        .where(models.Job.status == "processing", models.Job.lease_expires_at < _utcnow())
+        .order_by(models.Job.lease_expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(models.Job)
+        .where(models.Job.id.in_(expired_ids.scalar_subquery()))
+        .values(
+            status=case((models.Job.attempts < JOB_MAX_ATTEMPTS, "pending"), else_="failed"),
+            worker_id=None,
+            lease_expires_at=None,
+            last_error="Истек срок аренды задания воркером",
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount
+
+@metrics.db_timer("claim_jobs")
+def claim_jobs(db: Session, worker_id: str, limit: int = 1, lease_seconds: Optional[int] = None) -> List[models.Job]:
+    """
+    Берет в обработку до limit ожидающих заданий
+    
+    Использует SELECT ... FOR UPDATE SKIP LOCKED по частичному индексу
+    ix_jobs_pending_queue: параллельные воркеры получают разные задания
+    и не ждут блокировок друг друга.
+    
+    Args:
+        worker_id: Идентификатор воркера
+        limit: Максимальное количество заданий
+        lease_seconds: Срок аренды (по умолчанию JOB_LEASE_SECONDS)
+    """
+    requeue_expired_jobs(db)
+    
+    pending = (
+        select(models.Job.id)
+        .where(models.Job.status == "pending", models.Job.file_path.isnot(None))
+        .order_by(models.Job.created_at, models.Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    now = _utcnow()
+    jobs = _update_jobs_returning(db, [models.Job.id.in_(pending)], {
+        'status': "processing",
+        'worker_id': worker_id,
+        'attempts': models.Job.attempts + 1,
+        'heartbeat_at': now,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds or JOB_LEASE_SECONDS),
+        'last_error': None,
+    })
+    db.commit()
+    return sorted(jobs, key=lambda db_job: (db_job.created_at, db_job.id))
+
+def heartbeat_job(db: Session, job_id: int, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+    """
+    Продлевает аренду задания воркером
+    
+    Returns:
+        bool: False если задание больше не принадлежит воркеру
+    """
+    now = _utcnow()
+    updated = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.status == "processing",
+        models.Job.worker_id == worker_id
+    ).update({
+        models.Job.heartbeat_at: now,
+        models.Job.lease_expires_at: now + timedelta(seconds=lease_seconds or JOB_LEASE_SECONDS),
+    }, synchronize_session=False)
+    db.commit()
+    return updated > 0
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> Optional[models.Job]:
+    """Завершает обработку задания воркером"""
+    return update_job_status(db, job_id, "completed", worker_id=worker_id)
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str) -> Optional[models.Job]:
+    """
+    Отмечает неудачную попытку обработки
+    
+    Пока не исчерпано JOB_MAX_ATTEMPTS попыток, задание возвращается в очередь.
+    """
+    # Новый статус вычисляется в том же UPDATE, без предварительного SELECT
+    status = case((models.Job.attempts < JOB_MAX_ATTEMPTS, "pending"), else_="failed")
+    values = _status_values(status, error)
+    values.update({'worker_id': None, 'lease_expires_at': None})
+    db_job = _update_job_returning(db, _worker_conditions(job_id, worker_id), values)
+    db.commit()
+    return db_job
+
+@metrics.db_timer("expire_direct_uploads")
+def expire_direct_uploads(db: Session, limit: int = 100) -> list:
+    """
+    Переводит в failed задания прямой загрузки, не завершенные за DIRECT_UPLOAD_TTL_SECONDS
+    
+    Задания с сессией возобновляемой загрузки не затрагиваются - их срок
+    отслеживает expire_upload_sessions. Задания выбираются с SKIP LOCKED.
+    
+    Returns:
+        Строки (id, file_path, upload_id) истекших заданий - их multipart загрузки
+        нужно отменить, а объекты удалить из MinIO
+    """
+    has_session = select(models.UploadSession.id).where(models.UploadSession.job_id == models.Job.id).exists()
+    expired_ids = (
+        select(models.Job.id)
+        .where(
+            models.Job.status == UPLOADING_STATUS,
+            models.Job.created_at < _utcnow() - timedelta(seconds=DIRECT_UPLOAD_TTL_SECONDS),
+            ~has_session
+        )
+        .order_by(models.Job.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(models.Job)
+        .where(models.Job.id.in_(expired_ids.scalar_subquery()), models.Job.status == UPLOADING_STATUS)
+        .values(status="failed", last_error="Загрузка файла не завершена в срок")
+        .returning(models.Job.id, models.Job.file_path, models.Job.upload_id)
+        .execution_options(synchronize_session=False)
+    )
+    expired = db.execute(stmt).all()
+    db.commit()
+    return expired
+
 def get_job_with_zip_contents(db: Session, job_id: int) -> Optional[models.Job]:
     """Получает задание с распарсенным содержимым ZIP архива"""
     job = get_job(db, job_id)
     if not job:
         return None
     
-    # Парсим ZIP содержимое если есть
-    if job.zip_contents:
-        try:
-            job.zip_contents_parsed = json.loads(job.zip_contents)
-        except json.JSONDecodeError:
-            job.zip_contents_parsed = []
-    else:
-        job.zip_contents_parsed = []
+    # Собираем содержимое ZIP архива из таблицы job_files
+    job.zip_contents_parsed = [
+        {
+            'filename': job_file.path,
+            'size': job_file.size,
+            'compressed_size': job_file.compressed_size,
+            'content_type': job_file.content_type,
+            'modified_time': job_file.mtime.isoformat() if job_file.mtime else None,
+        }
+        for job_file in get_job_files(db, job_id, limit=None)
+    ]
     
     return job
+
+@metrics.db_timer("create_upload_session")
+def create_upload_session(db: Session, job: schemas.JobCreate, owner_id: int, file_info: Dict,
+                          upload_id: str, part_size: int, part_count: int) -> Tuple[models.Job, models.UploadSession]:
+    """
+    Создает задание в статусе uploading и сессию возобновляемой загрузки в одной транзакции
+    
+    Args:
+        file_info: Заявленная информация о файле (аргументы _file_info_values)
+        upload_id: Идентификатор уже начатой multipart загрузки MinIO
+    """
+    db_job = db.execute(
+        insert(models.Job).values(**_job_values(job, owner_id, file_info, UPLOADING_STATUS)).returning(models.Job)
+    ).scalars().one()
+    db_session = db.execute(insert(models.UploadSession).values(
+        id=uuid.uuid4(),
+        job_id=db_job.id,
+        owner_id=owner_id,
+        object_name=file_info['file_path'],
+        upload_id=upload_id,
+        file_size=file_info['file_size'],
+        part_size=part_size,
+        part_count=part_count,
+        status="active",
+        expires_at=_utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+    ).returning(models.UploadSession)).scalars().one()
+    db.commit()
+    return db_job, db_session
+
+def get_upload_session(db: Session, session_id: uuid.UUID, owner_id: Optional[int] = None) -> Optional[models.UploadSession]:
+    """Получает сессию загрузки (если указан owner_id - только сессию этого пользователя)"""
+    query = db.query(models.UploadSession).filter(models.UploadSession.id == session_id)
+    if owner_id is not None:
+        query = query.filter(models.UploadSession.owner_id == owner_id)
+    return query.first()
+
+def _update_upload_session(db: Session, session_id: uuid.UUID, values: Dict) -> Optional[models.UploadSession]:
+    """Обновляет активную сессию загрузки; None если сессия уже завершена, отменена или истекла"""
+    stmt = (
+        update(models.UploadSession)
+        .where(models.UploadSession.id == session_id, models.UploadSession.status == "active")
+        .values(**values)
+        .returning(models.UploadSession)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    db_session = db.execute(stmt).scalars().first()
+    db.commit()
+    return db_session
+
+def touch_upload_session(db: Session, session_id: uuid.UUID) -> Optional[models.UploadSession]:
+    """Продлевает срок активной сессии после загрузки части"""
+    return _update_upload_session(db, session_id, {
+        'expires_at': _utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+    })
+
+def finish_upload_session(db: Session, session_id: uuid.UUID, status: str) -> Optional[models.UploadSession]:
+    """
+    Переводит активную сессию в конечный статус (completed, aborted)
+    
+    Returns:
+        Optional[models.UploadSession]: Сессия или None если она уже не активна
+    """
+    return _update_upload_session(db, session_id, {'status': status})
+
+@metrics.db_timer("expire_upload_sessions")
+def expire_upload_sessions(db: Session, limit: int = 100) -> List[models.UploadSession]:
+    """
+    Помечает брошенные сессии загрузки истекшими, а их задания - failed
+    
+    Сессии выбираются с SKIP LOCKED, поэтому несколько экземпляров API
+    не обработают одну сессию дважды.
+    
+    Returns:
+        List[models.UploadSession]: Истекшие сессии - их multipart загрузки нужно отменить в MinIO
+    """
+    expired_ids = (
+        select(models.UploadSession.id)
+        .where(models.UploadSession.status == "active", models.UploadSession.expires_at < _utcnow())
+        .order_by(models.UploadSession.expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(models.UploadSession)
+        .where(models.UploadSession.id.in_(expired_ids.scalar_subquery()))
+        .values(status="expired")
+        .returning(models.UploadSession)
+        .execution_options(synchronize_session=False)
+    )
+    sessions = db.execute(stmt).scalars().all()
+    if sessions:
+        db.execute(
+            update(models.Job)
+            .where(models.Job.id.in_([session.job_id for session in sessions]), models.Job.status == UPLOADING_STATUS)
+            .values(status="failed", last_error="Загрузка файла не завершена в срок")
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return sessions
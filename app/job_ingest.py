@@ -0,0 +1,185 @@
+import os
+import time
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from . import metrics, minio_utils, zip_utils
+
+# Сколько файлов пакета загружается или анализируется одновременно
+JOB_BATCH_CONCURRENCY = int(os.getenv("JOB_BATCH_CONCURRENCY", "4"))
+# Максимальное количество заданий в одном пакетном запросе
+JOB_BATCH_MAX_ITEMS = int(os.getenv("JOB_BATCH_MAX_ITEMS", "500"))
+# Ограничения архива, загруженного в хранилище частями: байты не проходят через API,
+# а исследование КТ/МРТ - это сотни мегабайт и тысячи срезов
+ZIP_STORED_MAX_FILES = int(os.getenv("ZIP_STORED_MAX_FILES", "100000"))
+ZIP_STORED_MAX_SIZE = int(os.getenv("ZIP_STORED_MAX_SIZE", str(50 * 1024 ** 3)))
+
+class IngestError(Exception):
+    """Файл не может быть принят в задание"""
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _zip_manifest(source, file_name: str, max_files: int = zip_utils.ZIP_MAX_FILES,
+                  max_size: int = zip_utils.ZIP_MAX_SIZE) -> Optional[zip_utils.ZipManifest]:
+    """Разбирает и валидирует ZIP архив; None если файл не является архивом"""
+    started = time.perf_counter()
+    zip_manifest = zip_utils.open_zip_manifest(source, file_name)
+    if zip_manifest is None:
+        return None
+    metrics.ZIP_ANALYSIS_DURATION.observe(time.perf_counter() - started)
+        
+    is_valid, error_message = zip_manifest.validate(max_files=max_files, max_size=max_size)
+    if not is_valid:
+        raise IngestError(400, f"Некорректный ZIP файл: {error_message}")
+    print(f"📦 ZIP архив содержит {zip_manifest.total_files} файлов")
+    return zip_manifest
+
+def upload_job_file(stream: BinaryIO, file_name: str, content_type: Optional[str]) -> Tuple[Dict, Optional[List[dict]]]:
+    """
+    Анализирует и загружает файл задания в MinIO
+    
+    Args:
+        stream: Seekable поток с содержимым файла
+        file_name: Оригинальное имя файла
+        content_type: MIME тип файла
+        
+    Returns:
+        Tuple[Dict, Optional[List[dict]]]: (file_info, zip_contents) - аргументы
+        для job_crud.create_job / update_job_file_info
+        
+    Raises:
+        IngestError: если архив некорректен или загрузка не удалась
+    """
+    # Определяем тип файла, разбирая центральный каталог ZIP один раз
+    zip_manifest = _zip_manifest(stream, file_name)
+    
+    # Потоково загружаем файл в MinIO, считая размер и контрольную сумму на лету
+    stream.seek(0)
+    success, file_path, file_size, file_checksum = minio_utils.upload_stream_to_minio(
+        stream=stream,
+        file_name=file_name,
+        content_type=content_type
+    )
+    if not success:
+        raise IngestError(500, "Ошибка загрузки файла")
+        
+    file_info = {
+        'file_name': file_name,
+        'file_size': file_size,
+        'file_content_type': content_type,
+        'file_path': file_path,
+        'file_type': "zip" if zip_manifest else "single",
+        'file_checksum': file_checksum,
+        'zip_info': zip_manifest.info() if zip_manifest else None,
+    }
+    return file_info, zip_manifest.entries if zip_manifest else None
+
+def analyze_stored_object(object_name: str, file_name: Optional[str] = None, content_type: Optional[str] = None,
+                          file_checksum: Optional[str] = None, max_files: int = zip_utils.ZIP_MAX_FILES,
+                          max_size: int = zip_utils.ZIP_MAX_SIZE) -> Tuple[Dict, Optional[List[dict]]]:
+    """
+    Анализирует объект, уже загруженный в MinIO, без его скачивания
+    
+    Размер берется из метаданных объекта, а для ZIP архива по Range запросам
+    читается только центральный каталог.
+    
+    Args:
+        max_files, max_size: Ограничения ZIP архива
+    
+    Returns:
+        Tuple[Dict, Optional[List[dict]]]: (file_info, zip_contents)
+        
+    Raises:
+        IngestError: если объект не найден или архив некорректен
+    """
+    file_name = file_name or os.path.basename(object_name)
+    success, object_reader = minio_utils.open_object_reader(object_name)
+    if not success:
+        raise IngestError(404, f"Объект '{object_name}' не найден в хранилище")
+        
+    zip_manifest = _zip_manifest(object_reader, file_name, max_files, max_size)
+    file_info = {
+        'file_name': file_name,
+        'file_size': object_reader.size,
+        'file_content_type': content_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+        'file_path': object_name,
+        'file_type': "zip" if zip_manifest else "single",
+        'file_checksum': file_checksum,
+        'zip_info': zip_manifest.info() if zip_manifest else None,
+    }
+    return file_info, zip_manifest.entries if zip_manifest else None
+
+def finalize_direct_upload(object_name: str, file_name: str, content_type: Optional[str], file_size: int,
+                           file_checksum: Optional[str] = None, upload_id: Optional[str] = None,
+                           part_count: Optional[int] = None, max_files: int = zip_utils.ZIP_MAX_FILES,
+                           max_size: int = zip_utils.ZIP_MAX_SIZE) -> Tuple[Dict, Optional[List[dict]]]:
+    """
+    Проверяет файл, загруженный клиентом напрямую в MinIO, и анализирует его
+    
+    Multipart загрузка завершается (если объект еще не собран), затем сверяются
+    размер и, если он был заявлен, SHA-256. Отклоненный файл удаляется из хранилища.
+    
+    Args:
+        file_size: Заявленный клиентом размер файла
+        file_checksum: Заявленный SHA-256 (проверка требует прочитать объект целиком)
+        upload_id: Идентификатор multipart загрузки
+        part_count: Ожидаемое количество частей (по умолчанию - как у presign_multipart_upload)
+        max_files, max_size: Ограничения ZIP архива
+        
+    Returns:
+        Tuple[Dict, Optional[List[dict]]]: (file_info, zip_contents)
+        
+    Raises:
+        IngestError: 409 - файл загружен не полностью, 400 - файл отклонен
+    """
+    success, stat = minio_utils.stat_object(object_name)
+    if not success and upload_id:
+        if part_count is None:
+            part_count = -(-file_size // minio_utils.multipart_part_size(file_size))
+        completed, error_message = minio_utils.complete_multipart_upload(object_name, upload_id, part_count)
+        if not completed:
+            raise IngestError(409, error_message)
+        success, stat = minio_utils.stat_object(object_name)
+    if not success:
+        raise IngestError(409, "Файл еще не загружен в хранилище")
+        
+    try:
+        if stat.size != file_size:
+            raise IngestError(400, f"Размер загруженного файла ({stat.size} байт) не совпадает с заявленным ({file_size} байт)")
+        if file_checksum:
+            success, checksum = minio_utils.compute_object_checksum(object_name)
+            if not success:
+                raise IngestError(500, "Ошибка чтения файла из хранилища")
+            if checksum != file_checksum.lower():
+                raise IngestError(400, "Контрольная сумма SHA-256 загруженного файла не совпадает с заявленной")
+        return analyze_stored_object(object_name, file_name, content_type, file_checksum, max_files, max_size)
+    except IngestError as e:
+        if e.status_code == 400:
+            minio_utils.delete_file_from_minio(object_name)
+        raise
+
+def run_batch(items: list, func: Callable) -> List[Tuple[bool, object]]:
+    """
+    Выполняет func для каждого элемента пакета в пуле потоков
+    
+    Returns:
+        List[Tuple[bool, object]]: Для каждого элемента в исходном порядке
+        (True, результат) или (False, IngestError)
+    """
+    def run_one(item):
+        try:
+            return True, func(item)
+        except IngestError as e:
+            return False, e
+        except Exception as e:
+            return False, IngestError(500, f"Ошибка: {str(e)}")
+            
+    with ThreadPoolExecutor(max_workers=JOB_BATCH_CONCURRENCY, thread_name_prefix="ingest") as executor:
+        return list(executor.map(run_one, items))
+
+def remove_uploaded_files(file_infos: List[Dict]):
+    """Удаляет загруженные файлы, если задания для них так и не были созданы"""
+    minio_utils.delete_files_from_minio([file_info['file_path'] for file_info in file_infos])
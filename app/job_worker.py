@@ -0,0 +1,137 @@
+"""
+Воркер обработки заданий
+
+Запуск: python -m app.job_worker
+
+Берет ожидающие задания напрямую из БД (SELECT ... FOR UPDATE SKIP LOCKED),
+поэтому можно запускать любое количество воркеров на разных узлах.
+Функция обработки задается переменной JOB_WORKER_HANDLER в виде "module:function"
+и получает объект задания; исключение означает неудачную попытку.
+"""
+import os
+import sys
+import socket
+import signal
+import threading
+import importlib
+import traceback
+from typing import Callable
+from .database import SessionLocal
+from . import dicom_index, job_crud, minio_utils, models
+
+# Количество заданий, обрабатываемых одновременно одним процессом
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+# Пауза между опросами очереди, когда заданий нет
+JOB_WORKER_POLL_INTERVAL = float(os.getenv("JOB_WORKER_POLL_INTERVAL", "5"))
+JOB_WORKER_HANDLER = os.getenv("JOB_WORKER_HANDLER", "app.job_worker:ingest_job")
+JOB_WORKER_ID = os.getenv("JOB_WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+
+def check_job_file(job: models.Job):
+    """Проверяет, что файл задания доступен в хранилище"""
+    success, stat = minio_utils.stat_object(job.file_path)
+    if not success:
+        raise RuntimeError(f"Файл '{job.file_path}' недоступен в хранилище")
+    if job.file_size is not None and stat.size != job.file_size:
+        raise RuntimeError(f"Размер файла в хранилище ({stat.size}) не совпадает с заданием ({job.file_size})")
+
+def ingest_job(job: models.Job):
+    """Обработчик по умолчанию: проверяет файл задания и строит индекс DICOM серий ZIP архива"""
+    check_job_file(job)
+    if job.file_type == "zip":
+        dicom_index.index_job(job)
+
+def load_handler(path: str) -> Callable[[models.Job], None]:
+    """Загружает функцию обработки по строке вида 'module:function'"""
+    module_name, _, function_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def _heartbeat_loop(job_id: int, worker_id: str, stop: threading.Event):
+    """Продлевает аренду задания, пока идет обработка"""
+    interval = max(job_crud.JOB_LEASE_SECONDS / 3, 1)
+    while not stop.wait(interval):
+        db = SessionLocal()
+        try:
+            if not job_crud.heartbeat_job(db, job_id, worker_id):
+                print(f"⚠️  Задание {job_id} больше не принадлежит воркеру {worker_id}")
+                return
+        except Exception as e:
+            print(f"⚠️  Ошибка heartbeat задания {job_id}: {e}")
+        finally:
+            db.close()
+
+def process_job(job: models.Job, worker_id: str, handler: Callable[[models.Job], None]):
+    """Обрабатывает одно задание и фиксирует результат"""
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(job.id, worker_id, stop), daemon=True)
+    heartbeat.start()
+    
+    error = None
+    try:
+        handler(job)
+    except Exception as e:
+        error = f"{e}\n{traceback.format_exc()}"
+    finally:
+        stop.set()
+        heartbeat.join()
+        
+    db = SessionLocal()
+    try:
+        if error is None:
+            result = job_crud.complete_job(db, job.id, worker_id)
+            print(f"✅ Задание {job.id} обработано" if result else f"⚠️  Задание {job.id} обработано, но аренда уже утеряна")
+        else:
+            job_crud.fail_job(db, job.id, worker_id, error)
+            print(f"❌ Ошибка обработки задания {job.id}: {error.splitlines()[0]}")
+    finally:
+        db.close()
+
+def worker_loop(slot: int, handler: Callable[[models.Job], None], stop: threading.Event):
+    """Цикл одного потока воркера: берет по одному заданию и обрабатывает его"""
+    worker_id = f"{JOB_WORKER_ID}-{slot}"
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            jobs = job_crud.claim_jobs(db, worker_id, limit=1)
+            # Отсоединяем задания, чтобы сессия не держала соединение во время обработки
+            db.expunge_all()
+        except Exception as e:
+            print(f"❌ Ошибка получения заданий из очереди: {e}")
+            jobs = []
+        finally:
+            db.close()
+            
+        if not jobs:
+            stop.wait(JOB_WORKER_POLL_INTERVAL)
+            continue
+            
+        for job in jobs:
+            process_job(job, worker_id, handler)
+
+def run(concurrency: int = JOB_WORKER_CONCURRENCY, handler_path: str = JOB_WORKER_HANDLER):
+    """Запускает concurrency потоков обработки и ждет сигнала остановки"""
+    handler = load_handler(handler_path)
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        print("🛑 Получен сигнал остановки, завершаем текущие задания...")
+        stop.set()
+        
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    
+    print(f"🚀 Воркер {JOB_WORKER_ID} запущен: потоков {concurrency}, обработчик {handler_path}")
+    threads = [
+        threading.Thread(target=worker_loop, args=(slot, handler, stop), name=f"job-worker-{slot}")
+        for slot in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    dicom_index.shutdown()
+    print("👋 Воркер остановлен")
+
+if __name__ == "__main__":
+    run()
+    sys.exit(0)
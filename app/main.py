@@ -1,19 +1,64 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status, Form
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status, Form, Query, Header, Request
+from fastapi.responses import StreamingResponse, Response, JSONResponse, RedirectResponse
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-import io
-import json
+from typing import List, Optional
 import mimetypes
+import zipfile
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from contextlib import asynccontextmanager
+import os
+import uuid
+import asyncio
+import time
 from .minio_client import minio_client
-from . import crud, models, schemas, auth, job_crud, minio_utils, zip_utils
-from .database import SessionLocal, engine, get_db
-from .db_wait import wait_for_postgres
+from . import crud, models, schemas, auth, job_crud, minio_utils, zip_utils, http_utils, io_executor, password_hashing, job_ingest, startup, health, metrics, upload_sessions
+from .database import SessionLocal, engine, get_db, get_pool_stats
+
+# Скачивание по умолчанию перенаправлением (307) на presigned URL вместо передачи файла через API
+DOWNLOAD_REDIRECT = os.getenv("DOWNLOAD_REDIRECT", "false").lower() == "true"
+# Срок действия presigned URL при скачивании перенаправлением
+DOWNLOAD_REDIRECT_EXPIRES = int(os.getenv("DOWNLOAD_REDIRECT_EXPIRES", "900"))
+
+def _redirect_to_object(object_name: str, bucket_name: str, download_name: str, content_type: Optional[str] = None) -> RedirectResponse:
+    """Перенаправляет клиента на presigned URL объекта: данные идут из MinIO, минуя API"""
+    success, url = minio_utils.presigned_get_url(
+        object_name,
+        bucket_name=bucket_name,
+        expires_in_seconds=DOWNLOAD_REDIRECT_EXPIRES,
+        download_name=download_name,
+        content_type=content_type
+    )
+    if not success:
+        raise HTTPException(status_code=500, detail="Ошибка создания ссылки на файл")
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл приложения
+    
+    Ожидание PostgreSQL и MinIO идет в фоне: сервер сразу начинает отвечать,
+    а /ready сообщает, когда зависимости доступны.
+    """
+    startup_task = asyncio.create_task(startup.run_startup())
+    # Фоновые проверки зависимостей для /health и /ready
+    health_task = asyncio.create_task(health.probe_loop())
+    # Отмена брошенных возобновляемых загрузок
+    reaper_task = asyncio.create_task(upload_sessions.reaper_loop())
+    yield
+    
+    startup_task.cancel()
+    health_task.cancel()
+    reaper_task.cancel()
+    io_executor.shutdown()
+    password_hashing.shutdown()
+    engine.dispose()
+    print("👋 Приложение остановлено")
 
 app = FastAPI(
+    lifespan=lifespan,
     title="California Gold API",
     description="""
     # California Gold API
@@ -63,21 +108,48 @@ app.add_middleware(
     allow_headers=["*"],  # Разрешить все заголовки
 )
 
-# Ожидаем готовности PostgreSQL перед созданием таблиц
-print("🔄 Ожидание готовности PostgreSQL...")
-if wait_for_postgres():
-    print("📊 Создание таблиц в базе данных...")
-    models.Base.metadata.create_all(bind=engine)
-    print("✅ Таблицы созданы успешно!")
-else:
-    print("❌ Не удалось подключиться к PostgreSQL")
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """
+    Время обработки запроса по шаблону маршрута
+    
+    Метка route - шаблон пути (/jobs/{job_id}), а не сам путь, чтобы количество
+    серий не росло с числом заданий. Для потоковых ответов измеряется время
+    до начала отправки тела.
+    """
+    method = request.method
+    in_flight = metrics.HTTP_REQUESTS_IN_FLIGHT.labels(method=method)
+    in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_DURATION.labels(
+            method=method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status_code),
+        ).observe(time.perf_counter() - started)
+
+@app.exception_handler(password_hashing.PasswordHashingBusy)
+def password_hashing_busy_handler(request, exc):
+    """Пул хеширования паролей перегружен - просим клиента повторить позже"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many authentication requests, try again later"},
+        headers={"Retry-After": "1"}
+    )
 
 @app.get("/", tags=["🏠 Главная"])
 def read_root():
     """
     **Главная страница API**
     
-    Приветственное сообщение и проверка работоспособности всех сервисов.
+    Приветственное сообщение и состояние сервисов (по результатам последних фоновых проверок).
     """
     return {
         "message": "Добро пожаловать в California Gold API!",
@@ -85,8 +157,8 @@ def read_root():
         "version": "1.0.0",
         "team": "California Gold Team",
         "services": {
-            "minio": "✅ Подключен",
-            "postgresql": "✅ Подключен"
+            name: "✅ Подключен" if dependency.is_healthy() else "❌ Недоступен"
+            for name, dependency in health.dependencies.items()
         },
         "description": "Современное API для управления файлами и пользователями"
     }
@@ -178,14 +250,13 @@ async def upload_file(
         # Определяем content type
         content_type = file.content_type or mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
         
-        # Читаем файл в память
-        file_data = io.BytesIO(await file.read())
-        
-        # Загружаем в MinIO
-        success = minio_client.upload_file(
+        # Загружаем в MinIO временный файл загрузки напрямую, в пуле потоков ввода-вывода
+        success = await io_executor.run_io(
+            "upload",
+            minio_client.upload_file,
             bucket_name=bucket_name,
             object_name=file.filename,
-            file_data=file_data,
+            file_data=file.file,
             content_type=content_type
         )
         
@@ -202,28 +273,59 @@ async def upload_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
+def _iter_files_or_error(bucket_name: str, prefix: str, recursive: bool, start_after: Optional[str]):
+    """Перечисляет файлы; ошибка посреди потока передается последней строкой"""
+    try:
+        yield from minio_client.iter_files(bucket_name, prefix, recursive, start_after)
+    except Exception as e:
+        yield {"error": str(e)}
+
 @app.get("/files", tags=["📁 Файлы"])
 async def list_files(
     bucket_name: str = "uploads", 
     prefix: str = "",
+    start_after: Optional[str] = None,
+    max_keys: int = Query(1000, ge=1, le=1000),
+    recursive: bool = True,
+    stream: bool = False,
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
     **Список файлов**
     
-    Получает список всех файлов в указанном bucket.
+    Получает страницу списка файлов в указанном bucket (в лексикографическом порядке).
     
     - **bucket_name**: Имя bucket (по умолчанию: "uploads")
     - **prefix**: Фильтр по префиксу имени файла
+    - **start_after**: Значение `next_start_after` предыдущей страницы (для первой страницы не указывается)
+    - **max_keys**: Максимальное количество файлов на странице (по умолчанию 1000)
+    - **recursive**: false - просмотр по "каталогам": вложенные префиксы до "/" возвращаются одной записью с `is_dir: true`
+    - **stream**: true - весь список потоком в формате NDJSON (один файл на строку) без пагинации
     
-    Возвращает список файлов с метаданными.
+    Возвращает файлы с метаданными и `next_start_after` для следующей страницы
+    (null, если список закончился; последняя полная страница может быть последней).
     """
+    if stream:
+        # Объекты отдаются по мере получения страниц из MinIO, память не зависит от размера bucket
+        lines = http_utils.iter_ndjson(_iter_files_or_error(bucket_name, prefix, recursive, start_after))
+        return StreamingResponse(io_executor.iterate_in_executor(lines), media_type="application/x-ndjson")
+    
     try:
-        files = minio_client.list_files(bucket_name, prefix)
+        files, next_start_after = await io_executor.run_io(
+            "list",
+            minio_client.list_files_page,
+            bucket_name,
+            prefix=prefix,
+            recursive=recursive,
+            start_after=start_after,
+            max_keys=max_keys
+        )
         return {
             "bucket": bucket_name,
+            "prefix": prefix,
             "files": files,
-            "count": len(files)
+            "count": len(files),
+            "next_start_after": next_start_after
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
@@ -232,6 +334,7 @@ async def list_files(
 async def download_file(
     filename: str, 
     bucket_name: str = "uploads",
+    redirect: bool = DOWNLOAD_REDIRECT,
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
@@ -241,25 +344,32 @@ async def download_file(
     
     - **filename**: Имя файла для скачивания
     - **bucket_name**: Имя bucket (по умолчанию: "uploads")
+    - **redirect**: true - ответ 307 на presigned URL, файл скачивается напрямую из MinIO
     
     Возвращает файл как поток данных.
     """
-    try:
-        file_data = minio_client.download_file(bucket_name, filename)
-        
-        if file_data is None:
-            raise HTTPException(status_code=404, detail="Файл не найден")
+    if redirect:
+        return _redirect_to_object(filename, bucket_name, filename)
         
-        # Определяем content type
-        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
-        
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=content_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+    try:
+        response = await io_executor.run_io("download", minio_client.open_file_stream, bucket_name, filename)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
+        
+    if response is None:
+        raise HTTPException(status_code=404, detail="Файл не найден")
+        
+    # Определяем content type
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    
+    # Передаем данные клиенту по мере получения из MinIO
+    headers = {"Content-Disposition": http_utils.content_disposition(filename)}
+    headers.update(minio_utils.get_stream_headers(response))
+    return StreamingResponse(
+        io_executor.iterate_in_executor(minio_utils.iter_object_stream(response)),
+        media_type=content_type,
+        headers=headers
+    )
 
 @app.delete("/files/{filename}", tags=["📁 Файлы"])
 async def delete_file(
@@ -278,7 +388,7 @@ async def delete_file(
     Возвращает подтверждение об удалении.
     """
     try:
-        success = minio_client.delete_file(bucket_name, filename)
+        success = await io_executor.run_io("delete", minio_client.delete_file, bucket_name, filename)
         
         if success:
             return {"message": f"Файл '{filename}' успешно удален"}
@@ -304,10 +414,13 @@ async def get_file_url(
     - **bucket_name**: Имя bucket (по умолчанию: "uploads")
     - **expires**: Время жизни ссылки в секундах (по умолчанию: 3600)
     
+    Подписанные ссылки кэшируются: повторный запрос в течение нескольких минут
+    получает ту же ссылку, срок действия которой не меньше запрошенного.
+    
     Возвращает presigned URL для безопасного доступа к файлу.
     """
     try:
-        url = minio_client.get_presigned_url(bucket_name, filename, expires)
+        url = await io_executor.run_io("presign", minio_client.get_presigned_url, bucket_name, filename, expires)
         
         if url:
             return {
@@ -328,13 +441,63 @@ async def health_check():
     
     Проверяет состояние всех сервисов API.
     
-    Возвращает статус MinIO и общее состояние системы.
+    Возвращает статус PostgreSQL и MinIO по результатам фоновых проверок: доступность,
+    задержку и время последней успешной проверки. Сами сервисы при запросе не опрашиваются.
+    Код ответа 503, если экземпляр не готов принимать трафик.
     """
-    return {
-        "status": "healthy",
-        "minio_endpoint": minio_client.endpoint,
-        "message": "FastAPI и MinIO работают корректно"
-    }
+    report = health.get_status()
+    report["status"] = "healthy" if report["ready"] else "unhealthy"
+    report["minio_endpoint"] = minio_client.endpoint
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/health/live", tags=["🔧 Система"])
+async def liveness_check():
+    """
+    **Проверка жизнеспособности**
+    
+    Возвращает 200, пока процесс отвечает и цикл фоновых проверок не завис.
+    Недоступность PostgreSQL или MinIO на liveness не влияет - перезапуск процесса ее не исправит.
+    """
+    if not health.is_live():
+        return JSONResponse(status_code=503, content={"status": "stalled"})
+    return {"status": "alive"}
+
+@app.get("/ready", tags=["🔧 Система"])
+def readiness_check():
+    """
+    **Проверка готовности**
+    
+    Возвращает 200, когда старт завершен и последние проверки PostgreSQL и MinIO успешны, иначе 503.
+    Используется оркестратором, чтобы направлять трафик только на готовые экземпляры.
+    """
+    checks = {name: startup.state[name] for name in ("postgres", "minio", "schema")}
+    dependencies = {name: dependency.to_dict() for name, dependency in health.dependencies.items()}
+    if not health.is_ready():
+        status_name = "starting" if not startup.is_ready() else "unavailable"
+        return JSONResponse(status_code=503, content={
+            "status": status_name, "checks": checks, "dependencies": dependencies, "error": startup.state["error"]
+        })
+    return {"status": "ready", "checks": checks, "dependencies": dependencies}
+
+@app.get("/health/db-pool", tags=["🔧 Система"])
+def db_pool_stats():
+    """
+    **Состояние пула соединений с БД**
+    
+    Возвращает размер пула, количество выданных и свободных соединений,
+    а также статистику ожидания соединения (количество выдач, таймауты, среднее и максимальное ожидание).
+    """
+    return get_pool_stats()
+
+@app.get("/metrics", tags=["🔧 Система"])
+def prometheus_metrics():
+    """
+    **Метрики в формате Prometheus**
+    
+    Время обработки запросов по маршрутам, время операций с MinIO и БД,
+    разбор ZIP архивов, объем переданных данных и состояние пула соединений с БД.
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
 
 # Эндпоинты для пользователей
 
@@ -474,77 +637,538 @@ def create_job(
     if not job_title and file and file.filename:
         job_title = file.filename
     
-    # Создаем задание
     job_data = schemas.JobCreate(title=job_title, description=description)
-    db_job = job_crud.create_job(db=db, job=job_data, owner_id=current_user.id)
+    file_info = None
+    zip_contents = None
     
-    # Если есть файл, загружаем его в MinIO
+    # Если есть файл, сначала загружаем его в MinIO, а задание создаем
+    # одним INSERT уже с информацией о файле
     if file and file.filename:
-        file_content = file.file.read()
-        
-        # Определяем тип файла
-        is_zip = zip_utils.is_zip_file(file_content, file.filename)
-        file_type = "zip" if is_zip else "single"
-        
-        # Если это ZIP файл, валидируем его
-        if is_zip:
-            is_valid, error_message = zip_utils.validate_zip_file(file_content)
-            if not is_valid:
-                job_crud.delete_job(db=db, job_id=db_job.id)
-                raise HTTPException(status_code=400, detail=f"Некорректный ZIP файл: {error_message}")
-        
-        # Загружаем файл в MinIO
-        success, file_path = minio_utils.upload_file_to_minio(
-            file_content=file_content,
-            file_name=file.filename,
-            content_type=file.content_type
+        # Возвращаем соединение в пул на время загрузки: сессия переподключится
+        # при следующем запросе к БД
+        db.close()
+        
+        # Работаем с временным файлом загрузки напрямую, не копируя его в память
+        try:
+            file_info, zip_contents = job_ingest.upload_job_file(file.file, file.filename, file.content_type)
+        except job_ingest.IngestError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+            
+    try:
+        db_job = job_crud.create_job(
+            db=db,
+            job=job_data,
+            owner_id=current_user.id,
+            file_info=file_info,
+            zip_contents=zip_contents
+        )
+    except Exception:
+        # Задание не создано - удаляем уже загруженный файл, чтобы он не остался без владельца
+        if file_info:
+            job_ingest.remove_uploaded_files([file_info])
+        raise
+    
+    return db_job
+
+@app.post("/jobs/upload", response_model=schemas.JobUploadResponse, tags=["📋 Задания"])
+def create_job_upload(
+    upload: schemas.JobUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Создание задания с прямой загрузкой файла в MinIO**
+    
+    Первый шаг двухфазной загрузки: создает задание в статусе `uploading` и выдает
+    presigned URL, по которым клиент загружает файл напрямую в хранилище, минуя API.
+    
+    - **file_name**, **file_size**: Имя и точный размер файла
+    - **content_type**: MIME тип файла
+    - **checksum**: SHA-256 файла (необязательно, проверяется при завершении)
+    
+    Файл до `MINIO_PRESIGNED_SINGLE_MAX` байт загружается одним PUT запросом на `url`.
+    Большой файл загружается частями: часть N (размером `part_size`, последняя - остаток)
+    PUT запросом на URL из `parts`.
+    
+    После загрузки вызовите `POST /jobs/{job_id}/upload/finalize`. Задание, не завершенное
+    за `DIRECT_UPLOAD_TTL_SECONDS`, переводится в `failed`, а загруженный файл удаляется.
+    """
+    content_type = minio_utils.resolve_content_type(upload.file_name, upload.content_type)
+    object_name = minio_utils.build_object_name(upload.file_name)
+    
+    if upload.file_size <= minio_utils.MINIO_PRESIGNED_SINGLE_MAX:
+        success, url = minio_utils.presign_upload(object_name)
+        upload_info = {"url": url}
+    else:
+        success, upload_info = minio_utils.presign_multipart_upload(object_name, upload.file_size, content_type)
+    if not success:
+        raise HTTPException(status_code=500, detail="Ошибка создания URL для загрузки")
+        
+    file_info = {
+        'file_name': upload.file_name,
+        'file_size': upload.file_size,
+        'file_content_type': content_type,
+        'file_path': object_name,
+        'file_checksum': upload.checksum.lower() if upload.checksum else None,
+        'upload_id': upload_info.get("upload_id"),
+    }
+    job_data = schemas.JobCreate(title=upload.title or upload.file_name, description=upload.description)
+    try:
+        db_job = job_crud.create_job(
+            db=db,
+            job=job_data,
+            owner_id=current_user.id,
+            file_info=file_info,
+            status=job_crud.UPLOADING_STATUS
+        )
+    except Exception:
+        if upload_info.get("upload_id"):
+            minio_utils.abort_multipart_upload(object_name, upload_info["upload_id"])
+        raise
+        
+    return {
+        "job": db_job,
+        "object_name": object_name,
+        "expires_in": minio_utils.MINIO_PRESIGNED_UPLOAD_EXPIRES,
+        **upload_info
+    }
+
+@app.post("/jobs/{job_id}/upload/finalize", response_model=schemas.JobResponse, tags=["📋 Задания"])
+def finalize_job_upload(
+    job_id: int,
+    finalize: schemas.JobUploadFinalizeRequest = schemas.JobUploadFinalizeRequest(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Завершение прямой загрузки файла**
+    
+    Второй шаг двухфазной загрузки: проверяет загруженный объект (наличие, размер,
+    SHA-256 если был указан), анализирует ZIP архив чтением из хранилища и ставит
+    задание в очередь (статус `pending`).
+    
+    - **upload_id**: Идентификатор multipart загрузки (необязательно, по умолчанию - выданный при создании)
+    
+    Возвращает 409, если файл загружен не полностью (можно догрузить и повторить).
+    Если файл отклонен (400), он удаляется, а задание переводится в `failed`.
+    ZIP архив ограничен `ZIP_STORED_MAX_SIZE` и `ZIP_STORED_MAX_FILES`, а не лимитами загрузки через API.
+    """
+    db_job = job_crud.get_job(db, job_id=job_id, owner_id=current_user.id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    if db_job.status != job_crud.UPLOADING_STATUS:
+        raise HTTPException(status_code=409, detail="Загрузка файла задания уже завершена")
+        
+    # Проверка и анализ обращаются только к MinIO - возвращаем соединение в пул
+    db.close()
+    try:
+        file_info, zip_contents = job_ingest.finalize_direct_upload(
+            object_name=db_job.file_path,
+            file_name=db_job.file_name,
+            content_type=db_job.file_content_type,
+            file_size=db_job.file_size,
+            file_checksum=db_job.file_checksum,
+            upload_id=finalize.upload_id or db_job.upload_id,
+            max_files=job_ingest.ZIP_STORED_MAX_FILES,
+            max_size=job_ingest.ZIP_STORED_MAX_SIZE
         )
+    except job_ingest.IngestError as e:
+        if e.status_code == 400:
+            job_crud.update_job_status(db, job_id, "failed", error=e.detail, owner_id=current_user.id)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+    db_job = job_crud.finalize_job_upload(db, job_id, current_user.id, file_info, zip_contents)
+    if db_job is None:
+        raise HTTPException(status_code=409, detail="Загрузка файла задания уже завершена")
+    return db_job
+
+# Возобновляемая загрузка частями
+
+def _get_upload_session(db: Session, session_id: uuid.UUID, owner_id: int) -> models.UploadSession:
+    """Сессия загрузки пользователя; чужая сессия не находится"""
+    db_session = job_crud.get_upload_session(db, session_id, owner_id=owner_id)
+    if db_session is None:
+        raise HTTPException(status_code=404, detail="Сессия загрузки не найдена")
+    return db_session
+
+def _require_active_session(db_session: models.UploadSession):
+    if db_session.status != "active":
+        raise HTTPException(status_code=409, detail=f"Сессия загрузки не активна (статус: {db_session.status})")
+
+@app.post("/uploads", response_model=schemas.UploadSessionCreateResponse, tags=["📋 Задания"])
+def create_upload_session(
+    upload: schemas.UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Создание сессии возобновляемой загрузки**
+    
+    Создает задание в статусе `uploading` и сессию загрузки файла частями через API.
+    Части загружаются запросами `PUT /uploads/{id}/parts/{part_number}` в любом порядке
+    и параллельно; при обрыве повторяется только неудавшаяся часть.
+    
+    - **file_name**, **file_size**: Имя и точный размер файла
+    - **part_size**: Желаемый размер части (от 5 MiB до `UPLOAD_MAX_PART_SIZE`, по умолчанию 16 MiB)
+    - **checksum**: SHA-256 файла (необязательно, проверяется при завершении)
+    
+    Сессия без новых частей дольше `UPLOAD_SESSION_TTL_SECONDS` отменяется.
+    """
+    content_type = minio_utils.resolve_content_type(upload.file_name, upload.content_type)
+    object_name = minio_utils.build_object_name(upload.file_name)
+    try:
+        part_size = upload_sessions.choose_part_size(upload.file_size, upload.part_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    part_count = max(1, -(-upload.file_size // part_size))
+    
+    success, upload_id = minio_utils.create_multipart_upload(object_name, content_type)
+    if not success:
+        raise HTTPException(status_code=500, detail="Ошибка создания загрузки в хранилище")
         
+    file_info = {
+        'file_name': upload.file_name,
+        'file_size': upload.file_size,
+        'file_content_type': content_type,
+        'file_path': object_name,
+        'file_checksum': upload.checksum.lower() if upload.checksum else None,
+    }
+    job_data = schemas.JobCreate(title=upload.title or upload.file_name, description=upload.description)
+    try:
+        db_job, db_session = job_crud.create_upload_session(
+            db, job_data, current_user.id, file_info, upload_id, part_size, part_count
+        )
+    except Exception:
+        minio_utils.abort_multipart_upload(object_name, upload_id)
+        raise
+        
+    return {**upload_sessions.session_status(db_session), "job": db_job}
+
+@app.put("/uploads/{session_id}/parts/{part_number}", response_model=schemas.UploadPartResponse, tags=["📋 Задания"])
+async def upload_session_part(
+    session_id: uuid.UUID,
+    part_number: int,
+    request: Request,
+    content_md5: Optional[str] = Header(None, alias="Content-MD5"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Загрузка части файла**
+    
+    Тело запроса - байты части. Все части, кроме последней, имеют размер `part_size`,
+    последняя - остаток файла. Повторная загрузка части заменяет ее.
+    
+    Заголовок `Content-MD5` (необязательно) передается в MinIO, который отклонит
+    поврежденную при передаче часть.
+    """
+    db_session = await io_executor.run_io("db", _get_upload_session, db, session_id, current_user.id)
+    _require_active_session(db_session)
+    if not 1 <= part_number <= db_session.part_count:
+        raise HTTPException(status_code=400, detail=f"Номер части должен быть от 1 до {db_session.part_count}")
+        
+    # Соединение с БД не нужно на время приема части
+    await io_executor.run_io("db", db.close)
+    
+    expected_size = upload_sessions.expected_part_size(db_session, part_number)
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) != expected_size:
+        raise HTTPException(status_code=400, detail=f"Размер части {part_number} должен быть {expected_size} байт")
+        
+    # Часть принимается в память целиком (ее размер ограничен UPLOAD_MAX_PART_SIZE):
+    # MinIO клиент подписывает тело части его SHA-256, поэтому длина и данные нужны до отправки
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > expected_size:
+            raise HTTPException(status_code=400, detail=f"Размер части {part_number} должен быть {expected_size} байт")
+    if len(data) != expected_size:
+        raise HTTPException(status_code=400, detail=f"Размер части {part_number} должен быть {expected_size} байт")
+        
+    success, etag = await io_executor.run_io(
+        "upload", minio_utils.upload_part, db_session.object_name, db_session.upload_id, part_number, data, content_md5
+    )
+    if not success:
+        if etag in ("BadDigest", "InvalidDigest"):
+            raise HTTPException(status_code=400, detail="Content-MD5 не совпадает с данными части")
+        if etag == "NoSuchUpload":
+            raise HTTPException(status_code=409, detail="Загрузка в хранилище отменена")
+        raise HTTPException(status_code=500, detail="Ошибка загрузки части в хранилище")
+        
+    if await io_executor.run_io("db", job_crud.touch_upload_session, db, db_session.id) is None:
+        raise HTTPException(status_code=409, detail="Сессия загрузки завершена или отменена")
+    return {"part_number": part_number, "size": expected_size, "etag": etag}
+
+@app.get("/uploads/{session_id}", response_model=schemas.UploadSessionResponse, tags=["📋 Задания"])
+def get_upload_session(
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Состояние сессии загрузки**
+    
+    Возвращает загруженные и недостающие части, а также `offset` - количество байт,
+    загруженных подряд с начала файла, чтобы продолжить загрузку после обрыва.
+    """
+    db_session = _get_upload_session(db, session_id, current_user.id)
+    db.close()
+    return upload_sessions.session_status(db_session)
+
+@app.post("/uploads/{session_id}/complete", response_model=schemas.JobResponse, tags=["📋 Задания"])
+def complete_upload_session(
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Завершение загрузки**
+    
+    Собирает файл из загруженных частей, проверяет его размер (и SHA-256, если он был
+    указан), анализирует ZIP архив и ставит задание в очередь (статус `pending`).
+    
+    Возвращает 409, если загружены не все части (недостающие - в `GET /uploads/{id}`).
+    Если файл отклонен (400), он удаляется, а задание переводится в `failed`.
+    ZIP архив ограничен `ZIP_STORED_MAX_SIZE` и `ZIP_STORED_MAX_FILES`, а не лимитами загрузки через API.
+    """
+    db_session = _get_upload_session(db, session_id, current_user.id)
+    _require_active_session(db_session)
+    job = job_crud.get_job(db, job_id=db_session.job_id, owner_id=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+        
+    # Сборка и анализ файла обращаются только к MinIO - возвращаем соединение в пул
+    db.close()
+    try:
+        file_info, zip_contents = job_ingest.finalize_direct_upload(
+            object_name=db_session.object_name,
+            file_name=job.file_name,
+            content_type=job.file_content_type,
+            file_size=db_session.file_size,
+            file_checksum=job.file_checksum,
+            upload_id=db_session.upload_id,
+            part_count=db_session.part_count,
+            max_files=job_ingest.ZIP_STORED_MAX_FILES,
+            max_size=job_ingest.ZIP_STORED_MAX_SIZE
+        )
+    except job_ingest.IngestError as e:
+        if e.status_code == 400:
+            job_crud.finish_upload_session(db, db_session.id, "aborted")
+            job_crud.update_job_status(db, job.id, "failed", error=e.detail, owner_id=current_user.id)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+    db_job = job_crud.finalize_job_upload(db, job.id, current_user.id, file_info, zip_contents)
+    if db_job is None:
+        raise HTTPException(status_code=409, detail="Загрузка файла задания уже завершена")
+    job_crud.finish_upload_session(db, db_session.id, "completed")
+    return db_job
+
+@app.delete("/uploads/{session_id}", tags=["📋 Задания"])
+def abort_upload_session(
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Отмена загрузки**
+    
+    Удаляет загруженные части из хранилища и переводит задание в `failed`.
+    """
+    db_session = _get_upload_session(db, session_id, current_user.id)
+    if job_crud.finish_upload_session(db, db_session.id, "aborted") is None:
+        raise HTTPException(status_code=409, detail=f"Сессия загрузки не активна (статус: {db_session.status})")
+    job_crud.update_job_status(db, db_session.job_id, "failed", error="Загрузка отменена пользователем", owner_id=current_user.id)
+    db.close()
+    
+    minio_utils.abort_multipart_upload(db_session.object_name, db_session.upload_id)
+    return {"message": "Загрузка отменена", "job_id": db_session.job_id}
+
+def _create_batch_jobs(db: Session, owner_id: int, results: list, titles: list, descriptions: list, file_names: list):
+    """Создает задания для успешно обработанных элементов пакета и собирает ошибки"""
+    items = []
+    errors = []
+    for index, (success, result) in enumerate(results):
         if success:
-            zip_contents = None
-            
-            # Если это ZIP файл, анализируем его содержимое
-            if is_zip:
-                zip_contents = zip_utils.get_zip_contents(file_content)
-                print(f"📦 ZIP архив содержит {len(zip_contents)} файлов")
-            
-            # Обновляем информацию о файле в задании
-            job_crud.update_job_file_info(
-                db=db,
-                job_id=db_job.id,
-                file_name=file.filename,
-                file_size=len(file_content),
-                file_content_type=file.content_type,
-                file_path=file_path,
-                file_type=file_type,
-                zip_contents=zip_contents
-            )
+            file_info, zip_contents = result
+            job_data = schemas.JobCreate(title=titles[index] or file_info['file_name'], description=descriptions[index])
+            items.append((job_data, file_info, zip_contents))
         else:
-            # Если загрузка файла не удалась, удаляем задание
-            job_crud.delete_job(db=db, job_id=db_job.id)
-            raise HTTPException(status_code=500, detail="Ошибка загрузки файла")
+            errors.append(schemas.JobBatchError(
+                index=index, file_name=file_names[index], status_code=result.status_code, detail=result.detail
+            ))
+            
+    try:
+        created = job_crud.create_jobs(db=db, owner_id=owner_id, items=items)
+    except Exception:
+        # Ни одно задание не создано - возвращаем пакет целиком
+        return None, items, errors
+    return created, items, errors
+
+@app.post("/jobs/batch", response_model=schemas.JobBatchCreateResponse, tags=["📋 Задания"])
+def create_jobs_batch(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Пакетное создание заданий**
     
-    return db_job
+    Принимает несколько файлов в одном multipart запросе и создает по заданию на каждый файл.
+    Файлы загружаются в MinIO параллельно, все задания создаются в одной транзакции.
+    
+    - **files**: Файлы для загрузки (название задания - имя файла)
+    
+    Файлы, которые не удалось принять (например, некорректные ZIP архивы), попадают в `errors`
+    с позицией в запросе, остальные задания создаются.
+    """
+    if len(files) > job_ingest.JOB_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Максимум {job_ingest.JOB_BATCH_MAX_ITEMS} файлов в одном запросе")
+        
+    db.close()
+    results = job_ingest.run_batch(
+        files, lambda upload: job_ingest.upload_job_file(upload.file, upload.filename, upload.content_type)
+    )
+    
+    file_names = [upload.filename for upload in files]
+    created, items, errors = _create_batch_jobs(
+        db, current_user.id, results, [None] * len(files), [None] * len(files), file_names
+    )
+    if created is None:
+        job_ingest.remove_uploaded_files([file_info for _, file_info, _ in items])
+        raise HTTPException(status_code=500, detail="Ошибка создания заданий")
+    return {"created": created, "errors": errors}
+
+@app.post("/jobs/batch/manifest", response_model=schemas.JobBatchCreateResponse, tags=["📋 Задания"])
+def create_jobs_from_manifest(
+    manifest: schemas.JobManifestRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_superuser)
+):
+    """
+    **Создание заданий по манифесту загруженных объектов**
+    
+    Создает задания для объектов, уже загруженных в бакет (например, конвейером загрузки напрямую в MinIO).
+    Размер берется из метаданных объекта, у ZIP архивов по Range запросам читается только центральный каталог.
+    
+    - **items**: Список объектов: `object_name`, а также необязательные `file_name`, `title`,
+      `description`, `content_type` и `checksum` (SHA-256)
+    
+    Доступно только администраторам: задания получают доступ к произвольным объектам бакета.
+    Объект может принадлежать только одному заданию: объекты, уже привязанные к заданиям,
+    и повторы внутри манифеста попадают в `errors` с кодом 409.
+    """
+    if len(manifest.items) > job_ingest.JOB_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Максимум {job_ingest.JOB_BATCH_MAX_ITEMS} объектов в одном запросе")
+        
+    # Удаление задания удаляет его объект, поэтому общий объект нескольких заданий пропал бы вместе с первым из них
+    referenced = job_crud.get_referenced_file_paths(db, [item.object_name for item in manifest.items])
+    db.close()
+    
+    seen = set()
+    conflicts = []
+    for item in manifest.items:
+        conflicts.append(item.object_name in referenced or item.object_name in seen)
+        seen.add(item.object_name)
+        
+    def analyze(indexed_item):
+        index, item = indexed_item
+        if conflicts[index]:
+            raise job_ingest.IngestError(409, f"Объект '{item.object_name}' уже используется другим заданием")
+        return job_ingest.analyze_stored_object(item.object_name, item.file_name, item.content_type, item.checksum)
+        
+    results = job_ingest.run_batch(list(enumerate(manifest.items)), analyze)
+    
+    created, _, errors = _create_batch_jobs(
+        db, current_user.id, results,
+        [item.title for item in manifest.items],
+        [item.description for item in manifest.items],
+        [item.file_name or item.object_name for item in manifest.items]
+    )
+    if created is None:
+        raise HTTPException(status_code=500, detail="Ошибка создания заданий")
+    return {"created": created, "errors": errors}
 
-@app.get("/jobs/", response_model=List[schemas.JobResponse], tags=["📋 Задания"])
+@app.patch("/jobs/batch/status", response_model=schemas.JobBatchStatusResponse, tags=["📋 Задания"])
+def update_jobs_status_batch(
+    request: schemas.JobBatchStatusRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Пакетное изменение статуса заданий**
+    
+    Меняет статус всех указанных заданий текущего пользователя одним запросом в одной транзакции.
+    
+    - **job_ids**: ID заданий
+    - **status**: Новый статус (`pending`, `completed`, `failed`)
+    
+    Чужие и несуществующие задания, а также задания в статусе `uploading`
+    (файл еще загружается) возвращаются в `not_found`.
+    """
+    job_ids = list(dict.fromkeys(request.job_ids))
+    updated = job_crud.update_jobs_status(db=db, job_ids=job_ids, status=request.status, owner_id=current_user.id)
+    updated_ids = {job.id for job in updated}
+    return {
+        "updated": [job_id for job_id in job_ids if job_id in updated_ids],
+        "not_found": [job_id for job_id in job_ids if job_id not in updated_ids]
+    }
+
+@app.post("/jobs/batch/delete", response_model=schemas.JobBatchDeleteResponse, tags=["📋 Задания"])
+def delete_jobs_batch(
+    request: schemas.JobBatchIds,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Пакетное удаление заданий**
+    
+    Удаляет указанные задания текущего пользователя одним запросом в одной транзакции,
+    затем удаляет их файлы из MinIO пачками (multi-object delete).
+    
+    - **job_ids**: ID заданий
+    
+    Чужие и несуществующие задания возвращаются в `not_found`, файлы,
+    которые не удалось удалить из хранилища - в `storage_errors`.
+    """
+    job_ids = list(dict.fromkeys(request.job_ids))
+    deleted = job_crud.delete_jobs(db=db, job_ids=job_ids, owner_id=current_user.id)
+    # Объекты, на которые ссылаются оставшиеся задания, не удаляются
+    file_paths = job_crud.get_unreferenced_file_paths(db, [row.file_path for row in deleted])
+    db.close()
+    
+    deleted_ids = {row.id for row in deleted}
+    _, storage_errors = minio_utils.delete_files_from_minio(file_paths)
+    return {
+        "deleted": [job_id for job_id in job_ids if job_id in deleted_ids],
+        "not_found": [job_id for job_id in job_ids if job_id not in deleted_ids],
+        "storage_errors": storage_errors
+    }
+
+@app.get("/jobs/", response_model=schemas.JobSummaryPage, tags=["📋 Задания"])
 def get_user_jobs(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
     **Получение заданий пользователя**
     
-    Получает список заданий текущего пользователя с пагинацией.
+    Получает список заданий текущего пользователя (от новых к старым) с курсорной пагинацией.
     
-    - **skip**: Количество заданий для пропуска (по умолчанию 0)
+    - **cursor**: Курсор из поля `next_cursor` предыдущей страницы (для первой страницы не указывается)
     - **limit**: Максимальное количество заданий (по умолчанию 100)
     
-    Возвращает список заданий пользователя.
+    Возвращает краткую информацию о заданиях и курсор следующей страницы.
     """
-    jobs = job_crud.get_jobs_by_owner(db=db, owner_id=current_user.id, skip=skip, limit=limit)
-    return jobs
+    after = None
+    if cursor:
+        after = job_crud.decode_job_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
+            
+    jobs, next_cursor = job_crud.get_jobs_page_by_owner(db=db, owner_id=current_user.id, limit=limit, after=after)
+    return {"items": jobs, "next_cursor": next_cursor}
 
 @app.get("/jobs/{job_id}", response_model=schemas.JobResponse, tags=["📋 Задания"])
 def get_job(
@@ -561,14 +1185,11 @@ def get_job(
     
     Возвращает информацию о задании.
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=current_user.id)
     if job is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
     return job
 
 @app.get("/jobs/uuid/{job_uuid}", response_model=schemas.JobResponse, tags=["📋 Задания"])
@@ -586,14 +1207,11 @@ def get_job_by_uuid(
     
     Возвращает информацию о задании.
     """
-    job = job_crud.get_job_by_uuid(db=db, job_uuid=job_uuid)
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job_by_uuid(db=db, job_uuid=job_uuid, owner_id=current_user.id)
     if job is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
     return job
 
 @app.put("/jobs/{job_id}", response_model=schemas.JobResponse, tags=["📋 Задания"])
@@ -609,19 +1227,17 @@ def update_job(
     Обновляет информацию о задании.
     
     - **job_id**: ID задания
-    - **job_update**: Данные для обновления
+    - **job_update**: Данные для обновления; статус - `pending`, `completed` или `failed`
     
-    Возвращает обновленную информацию о задании.
+    Возвращает обновленную информацию о задании. Статус задания в статусе `uploading`
+    меняется только завершением загрузки (409).
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
-    if job is None:
+    # Один UPDATE ... RETURNING; чужое задание не обновляется и не находится
+    updated_job = job_crud.update_job(db=db, job_id=job_id, job_update=job_update, owner_id=current_user.id)
+    if updated_job is None:
+        if job_update.status is not None and job_crud.get_job(db, job_id=job_id, owner_id=current_user.id) is not None:
+            raise HTTPException(status_code=409, detail="Файл задания еще загружается")
         raise HTTPException(status_code=404, detail="Задание не найдено")
-    
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
-    updated_job = job_crud.update_job(db=db, job_id=job_id, job_update=job_update)
     return updated_job
 
 @app.delete("/jobs/{job_id}", tags=["📋 Задания"])
@@ -639,28 +1255,25 @@ def delete_job(
     
     Возвращает сообщение об успешном удалении.
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
-    if job is None:
+    # Удаляем задание одним DELETE ... RETURNING; чужое задание не удаляется и не находится
+    deleted = job_crud.delete_job(db=db, job_id=job_id, owner_id=current_user.id)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
-    # Удаляем файл из MinIO если он есть
-    if job.file_path:
-        minio_utils.delete_file_from_minio(job.file_path)
-    
-    # Удаляем задание из базы данных
-    success = job_crud.delete_job(db=db, job_id=job_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Ошибка удаления задания")
+    # Удаляем файл из MinIO если он есть и на него не ссылаются другие задания
+    for file_path in job_crud.get_unreferenced_file_paths(db, [deleted.file_path]):
+        minio_utils.delete_file_from_minio(file_path)
     
     return {"message": "Задание успешно удалено"}
 
 @app.get("/jobs/{job_id}/file", tags=["📋 Задания"])
 def download_job_file(
     job_id: int,
+    redirect: bool = DOWNLOAD_REDIRECT,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
@@ -670,71 +1283,138 @@ def download_job_file(
     Скачивает файл, связанный с заданием.
     
     - **job_id**: ID задания
+    - **redirect**: true - ответ 307 на presigned URL, файл скачивается напрямую из MinIO
+    
+    Поддерживаются заголовки `Range` (ответ 206, в том числе несколько диапазонов),
+    `If-Range`, `If-None-Match` и `If-Modified-Since` (ответ 304). При перенаправлении
+    их обрабатывает MinIO.
     
     Возвращает файл для скачивания.
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=current_user.id)
     if job is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
-    if not job.file_path:
+    if not job.file_path or job.status == job_crud.UPLOADING_STATUS:
         raise HTTPException(status_code=404, detail="Файл не найден")
     
-    # Получаем файл из MinIO
-    success, file_content = minio_utils.get_file_from_minio(job.file_path)
+    # Все нужные поля задания уже загружены - освобождаем соединение с БД
+    # до обращения к MinIO и передачи файла
+    db.close()
+    
+    if redirect:
+        return _redirect_to_object(job.file_path, minio_utils.MINIO_BUCKET, job.file_name, job.file_content_type)
+    
+    # Получаем метаданные файла для условных запросов и диапазонов
+    success, stat = minio_utils.stat_object(job.file_path)
     if not success:
         raise HTTPException(status_code=500, detail="Ошибка получения файла")
-    
-    # Возвращаем файл для скачивания
+        
+    object_name = job.file_path
+    media_type = job.file_content_type or "application/octet-stream"
+    headers = {
+        "Content-Disposition": http_utils.content_disposition(job.file_name),
+        "Accept-Ranges": "bytes",
+        "ETag": http_utils.quote_etag(stat.etag),
+    }
+    if stat.last_modified:
+        headers["Last-Modified"] = http_utils.format_http_date(stat.last_modified)
+        
+    # Файл у клиента актуален - тело не передаем
+    if http_utils.is_not_modified(if_none_match, if_modified_since, stat.etag, stat.last_modified):
+        headers.pop("Content-Disposition")
+        return Response(status_code=304, headers=headers)
+        
+    ranges = None
+    if http_utils.if_range_matches(if_range, stat.etag, stat.last_modified):
+        try:
+            ranges = http_utils.parse_range_header(range_header, stat.size)
+        except http_utils.RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=416,
+                detail="Запрошенный диапазон вне файла",
+                headers={"Content-Range": f"bytes */{stat.size}"}
+            )
+            
+    def open_range(offset: int, length: int):
+        success, response = minio_utils.open_object_stream(object_name, offset=offset, length=length)
+        if not success:
+            raise IOError(f"Не удалось прочитать диапазон файла '{object_name}'")
+        return minio_utils.iter_object_stream(response)
+        
+    if ranges is None:
+        # Возвращаем файл целиком по мере получения из MinIO
+        headers["Content-Length"] = str(stat.size)
+        return StreamingResponse(open_range(0, 0), media_type=media_type, headers=headers)
+        
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = http_utils.content_range(start, end, stat.size)
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(open_range(start, end - start + 1), status_code=206, media_type=media_type, headers=headers)
+        
+    # Несколько диапазонов отдаем как multipart/byteranges
+    boundary = http_utils.new_multipart_boundary()
+    headers["Content-Length"] = str(http_utils.multipart_byteranges_length(ranges, boundary, media_type, stat.size))
     return StreamingResponse(
-        io.BytesIO(file_content),
-        media_type=job.file_content_type or "application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={job.file_name}"}
+        http_utils.iter_multipart_byteranges(ranges, open_range, boundary, media_type, stat.size),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers
     )
 
-@app.get("/jobs/{job_id}/zip-contents", tags=["📋 Задания"])
+@app.get("/jobs/{job_id}/zip-contents", response_model=schemas.JobFilesPage, tags=["📋 Задания"])
 def get_zip_contents(
     job_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    extension: Optional[str] = None,
+    min_size: Optional[int] = Query(None, ge=0),
+    max_size: Optional[int] = Query(None, ge=0),
+    path_prefix: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
     **Получение содержимого ZIP архива**
     
-    Получает список файлов в ZIP архиве задания.
+    Получает список файлов в ZIP архиве задания с фильтрами и пагинацией.
     
     - **job_id**: ID задания
+    - **skip**: Количество файлов для пропуска (по умолчанию 0)
+    - **limit**: Максимальное количество файлов (по умолчанию 100)
+    - **extension**: Фильтр по расширению, например `dcm`
+    - **min_size** / **max_size**: Фильтр по размеру файла после распаковки
+    - **path_prefix**: Фильтр по префиксу пути внутри архива
     
     Возвращает информацию о файлах в ZIP архиве.
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=current_user.id)
     if job is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
     if job.file_type != "zip":
         raise HTTPException(status_code=400, detail="Задание не содержит ZIP архив")
     
-    if not job.zip_contents:
-        return {"message": "ZIP архив пуст или содержимое не найдено"}
+    filters = {
+        "extension": extension,
+        "min_size": min_size,
+        "max_size": max_size,
+        "path_prefix": path_prefix
+    }
+    files = job_crud.get_job_files(db=db, job_id=job.id, skip=skip, limit=limit, **filters)
+    total_files = job_crud.count_job_files(db=db, job_id=job.id, **filters)
     
-    try:
-        zip_contents = json.loads(job.zip_contents)
-        return {
-            "job_id": job.id,
-            "zip_filename": job.file_name,
-            "total_files": len(zip_contents),
-            "files": zip_contents
-        }
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Ошибка при чтении содержимого ZIP архива")
+    return {
+        "job_id": job.id,
+        "zip_filename": job.file_name,
+        "total_files": total_files,
+        "skip": skip,
+        "limit": limit,
+        "files": files
+    }
 
 @app.get("/jobs/{job_id}/zip-info", tags=["📋 Задания"])
 def get_zip_info(
@@ -751,23 +1431,26 @@ def get_zip_info(
     
     Возвращает статистику ZIP архива.
     """
-    job = job_crud.get_job(db=db, job_id=job_id)
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=current_user.id)
     if job is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
     
-    # Проверяем, что пользователь является владельцем задания
-    if job.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа к этому заданию")
-    
     if job.file_type != "zip":
         raise HTTPException(status_code=400, detail="Задание не содержит ZIP архив")
     
-    # Получаем файл из MinIO для анализа
-    success, file_content = minio_utils.get_file_from_minio(job.file_path)
-    if not success:
-        raise HTTPException(status_code=500, detail="Ошибка получения файла")
+    # Статистика вычисляется при загрузке и хранится в задании
+    zip_info = job_crud.get_job_zip_info(job)
     
-    zip_info = zip_utils.get_zip_file_info(file_content)
+    if zip_info is None:
+        # Для старых заданий читаем из MinIO только EOCD и центральный каталог архива
+        success, object_reader = minio_utils.open_object_reader(job.file_path)
+        if not success:
+            raise HTTPException(status_code=500, detail="Ошибка получения файла")
+            
+        zip_info = zip_utils.get_zip_file_info(object_reader)
+        if zip_info:
+            job_crud.update_job_zip_info(db=db, job_id=job.id, zip_info=zip_info)
     
     return {
         "job_id": job.id,
@@ -775,3 +1458,220 @@ def get_zip_info(
         "file_size": job.file_size,
         "zip_info": zip_info
     }
+
+@app.get("/jobs/{job_id}/zip-entries/{entry_path:path}", tags=["📋 Задания"])
+def get_zip_entry(
+    job_id: int,
+    entry_path: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Скачивание файла из ZIP архива**
+    
+    Отдает один файл из ZIP архива задания, не скачивая архив целиком.
+    Из MinIO читается только локальный заголовок и сжатые данные записи,
+    которые распаковываются потоком.
+    
+    - **job_id**: ID задания
+    - **entry_path**: Путь файла внутри архива
+    
+    Возвращает содержимое файла.
+    """
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+        
+    if job.file_type != "zip":
+        raise HTTPException(status_code=400, detail="Задание не содержит ZIP архив")
+        
+    job_file = job_crud.get_job_file_by_path(db=db, job_id=job.id, path=entry_path)
+    if job_file is None:
+        raise HTTPException(status_code=404, detail="Файл не найден в архиве")
+        
+    if job_file.header_offset is None:
+        # Для старых заданий находим запись по центральному каталогу архива
+        success, object_reader = minio_utils.open_object_reader(job.file_path)
+        if not success:
+            raise HTTPException(status_code=500, detail="Ошибка получения файла")
+        try:
+            with zipfile.ZipFile(object_reader) as zip_file:
+                file_info = zip_file.getinfo(entry_path)
+        except (KeyError, zipfile.BadZipFile):
+            raise HTTPException(status_code=404, detail="Файл не найден в архиве")
+        job_file = job_crud.update_job_file_location(db, job_file, file_info.header_offset, file_info.compress_type, file_info.CRC)
+        
+    if job_file.compress_type not in zip_utils.STREAMABLE_COMPRESS_TYPES:
+        raise HTTPException(status_code=415, detail="Метод сжатия файла не поддерживается")
+        
+    # Читаем локальный заголовок, чтобы найти начало сжатых данных
+    success, local_header = minio_utils.read_object_range(
+        job.file_path, offset=job_file.header_offset, length=zip_utils.LOCAL_HEADER_SIZE
+    )
+    if not success:
+        raise HTTPException(status_code=500, detail="Ошибка получения файла")
+    try:
+        data_offset = job_file.header_offset + zip_utils.get_entry_data_offset(local_header)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка чтения архива: {str(e)}")
+        
+    headers = {"Content-Disposition": http_utils.content_disposition(entry_path.rsplit('/', 1)[-1])}
+    if job_file.size is not None:
+        headers["Content-Length"] = str(job_file.size)
+        
+    if not job_file.compressed_size:
+        return Response(content=b"", media_type=job_file.content_type or "application/octet-stream", headers=headers)
+        
+    success, response = minio_utils.open_object_stream(job.file_path, offset=data_offset, length=job_file.compressed_size)
+    if not success:
+        raise HTTPException(status_code=500, detail="Ошибка получения файла")
+        
+    return StreamingResponse(
+        # При несовпадении CRC-32 поток обрывается, и клиент получает меньше Content-Length байт
+        zip_utils.iter_entry_data(minio_utils.iter_object_stream(response), job_file.compress_type, job_file.crc32),
+        media_type=job_file.content_type or "application/octet-stream",
+        headers=headers
+    )
+
+def _get_zip_job(db: Session, job_id: int, owner_id: int) -> models.Job:
+    """Задание пользователя с ZIP архивом или 404/400"""
+    # Чужое задание не находится вовсе - владелец проверяется в WHERE
+    job = job_crud.get_job(db=db, job_id=job_id, owner_id=owner_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    if job.file_type != "zip":
+        raise HTTPException(status_code=400, detail="Задание не содержит ZIP архив")
+    return job
+
+@app.get("/jobs/{job_id}/dicom/series", response_model=schemas.DicomSeriesList, tags=["📋 Задания"])
+def get_dicom_series(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **DICOM серии ZIP архива**
+    
+    Список серий (SeriesInstanceUID) с количеством срезов. Индекс строит
+    воркер обработки заданий; пока он не построен, indexed_at равен null.
+    
+    - **job_id**: ID задания
+    """
+    job = _get_zip_job(db, job_id, current_user.id)
+    return {
+        "job_id": job.id,
+        "indexed_at": job.dicom_indexed_at,
+        "series": job_crud.get_dicom_series(db=db, job_id=job.id)
+    }
+
+@app.get("/jobs/{job_id}/dicom/series/{series_uid}/instances", response_model=List[schemas.DicomInstanceResponse], tags=["📋 Задания"])
+def get_dicom_instances(
+    job_id: int,
+    series_uid: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    **Срезы DICOM серии**
+    
+    Срезы серии в порядке InstanceNumber (затем по оси z) с положением записи
+    в архиве: файл среза можно получить через /jobs/{job_id}/zip-entries/{path}.
+    
+    - **job_id**: ID задания
+    - **series_uid**: SeriesInstanceUID серии
+    """
+    job = _get_zip_job(db, job_id, current_user.id)
+    instances = job_crud.get_dicom_instances(db=db, job_id=job.id, series_uid=series_uid)
+    if not instances:
+        raise HTTPException(status_code=404, detail="Серия не найдена")
+    
+    return [
+        {
+            "path": instance.path,
+            "sop_instance_uid": instance.sop_instance_uid,
+            "instance_number": instance.instance_number,
+            "image_position_patient": (
+                [instance.image_position_x, instance.image_position_y, instance.image_position_z]
+                if instance.image_position_z is not None else None
+            ),
+            "rows": instance.rows,
+            "columns": instance.columns,
+            "header_offset": instance.header_offset,
+            "data_offset": instance.data_offset,
+        }
+        for instance in instances
+    ]
+
+# ==================== ЭНДПОИНТЫ ДЛЯ ВОРКЕРОВ ОБРАБОТКИ ====================
+
+@app.post("/worker/jobs/claim", response_model=List[schemas.JobResponse], tags=["⚙️ Обработка заданий"])
+def claim_jobs(
+    claim: schemas.WorkerClaimRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_superuser)
+):
+    """
+    **Взятие заданий в обработку**
+    
+    Атомарно берет до `limit` ожидающих заданий с загруженным файлом и переводит их в статус `processing`.
+    Параллельные воркеры никогда не получают одно и то же задание.
+    
+    - **worker_id**: Идентификатор воркера
+    - **limit**: Максимальное количество заданий (по умолчанию 1)
+    - **lease_seconds**: Срок аренды; без heartbeat задание вернется в очередь
+    
+    Доступно только администраторам.
+    """
+    return job_crud.claim_jobs(db=db, worker_id=claim.worker_id, limit=claim.limit, lease_seconds=claim.lease_seconds)
+
+@app.post("/worker/jobs/{job_id}/heartbeat", tags=["⚙️ Обработка заданий"])
+def heartbeat_job(
+    job_id: int,
+    heartbeat: schemas.WorkerHeartbeatRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_superuser)
+):
+    """
+    **Продление аренды задания**
+    
+    Возвращает 409, если задание больше не принадлежит воркеру (аренда истекла и задание передано другому).
+    """
+    if not job_crud.heartbeat_job(db=db, job_id=job_id, worker_id=heartbeat.worker_id, lease_seconds=heartbeat.lease_seconds):
+        raise HTTPException(status_code=409, detail="Задание не находится в обработке у этого воркера")
+    return {"message": "Аренда продлена"}
+
+@app.post("/worker/jobs/{job_id}/complete", response_model=schemas.JobResponse, tags=["⚙️ Обработка заданий"])
+def complete_job(
+    job_id: int,
+    request: schemas.WorkerCompleteRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_superuser)
+):
+    """
+    **Завершение обработки задания**
+    
+    Переводит задание в статус `completed`.
+    """
+    job = job_crud.complete_job(db=db, job_id=job_id, worker_id=request.worker_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail="Задание не находится в обработке у этого воркера")
+    return job
+
+@app.post("/worker/jobs/{job_id}/fail", response_model=schemas.JobResponse, tags=["⚙️ Обработка заданий"])
+def fail_job(
+    job_id: int,
+    request: schemas.WorkerFailRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_superuser)
+):
+    """
+    **Ошибка обработки задания**
+    
+    Сохраняет текст ошибки. Задание возвращается в очередь, пока не исчерпано
+    количество попыток, после чего переводится в статус `failed`.
+    """
+    job = job_crud.fail_job(db=db, job_id=job_id, worker_id=request.worker_id, error=request.error)
+    if job is None:
+        raise HTTPException(status_code=409, detail="Задание не находится в обработке у этого воркера")
+    return job
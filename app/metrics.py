@@ -0,0 +1,94 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from .database import get_pool_stats
+
+# Границы гистограмм: от миллисекунд для метаданных до минут для больших загрузок
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса до начала отправки ответа",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Количество запросов в обработке",
+    ["method"],
+)
+
+# Объем переданных данных
+BYTES_UPLOADED = Counter("storage_bytes_uploaded_total", "Байт загружено в объектное хранилище")
+BYTES_DOWNLOADED = Counter("storage_bytes_downloaded_total", "Байт прочитано из объектного хранилища")
+
+# Операции с MinIO
+MINIO_OPERATION_DURATION = Histogram(
+    "minio_operation_duration_seconds",
+    "Время выполнения операций с MinIO",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Кэш presigned URL для скачивания
+PRESIGNED_URL_CACHE = Counter(
+    "presigned_url_cache",
+    "Обращения к кэшу presigned URL",
+    ["result"],
+)
+
+# Запись заданий в БД
+DB_OPERATION_DURATION = Histogram(
+    "db_operation_duration_seconds",
+    "Время выполнения операций с заданиями в БД",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Разбор и валидация ZIP архивов
+ZIP_ANALYSIS_DURATION = Histogram(
+    "zip_analysis_duration_seconds",
+    "Время разбора центрального каталога ZIP архива",
+    buckets=LATENCY_BUCKETS,
+)
+
+def minio_timer(operation: str):
+    """Декоратор/контекстный менеджер, измеряющий операцию с MinIO"""
+    return MINIO_OPERATION_DURATION.labels(operation=operation).time()
+
+def db_timer(operation: str):
+    """Декоратор/контекстный менеджер, измеряющий операцию с БД"""
+    return DB_OPERATION_DURATION.labels(operation=operation).time()
+
+class DatabasePoolCollector:
+    """Публикует состояние пула соединений БД в момент сбора метрик"""
+    
+    def collect(self):
+        stats = get_pool_stats()
+        gauges = {
+            "size": "Размер пула соединений",
+            "checked_in": "Свободные соединения в пуле",
+            "checked_out": "Выданные соединения",
+            "overflow": "Соединения сверх размера пула",
+        }
+        for key, documentation in gauges.items():
+            if key in stats:
+                yield GaugeMetricFamily(f"db_pool_{key}", documentation, value=stats[key])
+        # Суффикс _total к именам счетчиков добавляет prometheus_client
+        counters = {
+            "checkouts": ("db_pool_checkouts", "Количество выдач соединений из пула"),
+            "checkout_timeouts": ("db_pool_checkout_timeouts", "Количество таймаутов ожидания соединения"),
+            "wait_seconds_total": ("db_pool_wait_seconds", "Суммарное время ожидания соединения"),
+        }
+        for key, (name, documentation) in counters.items():
+            if key in stats:
+                yield CounterMetricFamily(name, documentation, value=stats[key])
+        if "wait_seconds_max" in stats:
+            yield GaugeMetricFamily("db_pool_wait_seconds_max", "Максимальное время ожидания соединения", value=stats["wait_seconds_max"])
+
+REGISTRY.register(DatabasePoolCollector())
+
+def render() -> bytes:
+    """Метрики в текстовом формате Prometheus"""
+    return generate_latest(REGISTRY)
+
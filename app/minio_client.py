@@ -1,41 +1,46 @@
-import os
-from minio import Minio
 from minio.error import S3Error
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Iterator, List, Tuple
+from itertools import islice
 import logging
+from . import metrics, minio_utils
 
 logger = logging.getLogger(__name__)
 
+# Bucket по умолчанию для файловых эндпоинтов
+DEFAULT_BUCKET = "uploads"
+
+
+def _object_info(obj) -> dict:
+    """Описание объекта (или общего префикса при нерекурсивном листинге)"""
+    return {
+        "name": obj.object_name,
+        "size": obj.size,
+        "last_modified": obj.last_modified,
+        "is_dir": obj.is_dir
+    }
+
 class MinIOClient:
     def __init__(self):
-        self.endpoint = os.getenv("MINIO_ENDPOINT", "localhost:9000")
-        self.access_key = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
-        self.secret_key = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+        self.endpoint = minio_utils.MINIO_ENDPOINT
         self.secure = False  # Для локальной разработки
         
-        self.client = Minio(
-            self.endpoint,
-            access_key=self.access_key,
-            secret_key=self.secret_key,
-            secure=self.secure
-        )
-        
-        # Создаем bucket по умолчанию при инициализации
-        self._ensure_bucket_exists("uploads")
+    @property
+    def client(self):
+        """Общий клиент с пулом соединений из minio_utils, создается при первом обращении"""
+        return minio_utils.get_minio_client()
     
     def _ensure_bucket_exists(self, bucket_name: str):
-        """Создает bucket если он не существует"""
-        try:
-            if not self.client.bucket_exists(bucket_name):
-                self.client.make_bucket(bucket_name)
-                logger.info(f"Bucket '{bucket_name}' создан")
-        except S3Error as e:
-            logger.error(f"Ошибка при создании bucket '{bucket_name}': {e}")
+        """Создает bucket если он не существует (проверка кэшируется в minio_utils)"""
+        if not minio_utils.ensure_bucket_exists(self.client, bucket_name):
+            logger.error(f"Ошибка при создании bucket '{bucket_name}'")
     
+    @metrics.minio_timer("put")
     def upload_file(self, bucket_name: str, object_name: str, file_data: BinaryIO, 
                    content_type: str = "application/octet-stream") -> bool:
         """Загружает файл в MinIO"""
         try:
+            # Bucket проверяется при первой загрузке, а не при импорте модуля
+            self._ensure_bucket_exists(bucket_name)
             file_data.seek(0)  # Перемещаем указатель в начало файла
             
             # Получаем размер файла
@@ -50,12 +55,14 @@ class MinIOClient:
                 length=file_size,  # Указываем точный размер файла
                 content_type=content_type
             )
+            metrics.BYTES_UPLOADED.inc(file_size)
             logger.info(f"Файл '{object_name}' успешно загружен в bucket '{bucket_name}'")
             return True
         except S3Error as e:
             logger.error(f"Ошибка при загрузке файла: {e}")
             return False
     
+    @metrics.minio_timer("get")
     def download_file(self, bucket_name: str, object_name: str) -> Optional[bytes]:
         """Скачивает файл из MinIO"""
         try:
@@ -63,12 +70,28 @@ class MinIOClient:
             data = response.read()
             response.close()
             response.release_conn()
+            metrics.BYTES_DOWNLOADED.inc(len(data))
             logger.info(f"Файл '{object_name}' успешно скачан из bucket '{bucket_name}'")
             return data
         except S3Error as e:
             logger.error(f"Ошибка при скачивании файла: {e}")
             return None
     
+    @metrics.minio_timer("get")
+    def open_file_stream(self, bucket_name: str, object_name: str):
+        """
+        Открывает файл в MinIO для потокового чтения
+        
+        Возвращает ответ MinIO или None если файл не удалось открыть.
+        Ответ читается через minio_utils.iter_object_stream.
+        """
+        try:
+            return self.client.get_object(bucket_name, object_name)
+        except S3Error as e:
+            logger.error(f"Ошибка при открытии файла: {e}")
+            return None
+    
+    @metrics.minio_timer("delete")
     def delete_file(self, bucket_name: str, object_name: str) -> bool:
         """Удаляет файл из MinIO"""
         try:
@@ -79,32 +102,69 @@ class MinIOClient:
             logger.error(f"Ошибка при удалении файла: {e}")
             return False
     
+    @metrics.minio_timer("list")
     def list_files(self, bucket_name: str, prefix: str = "") -> list:
-        """Получает список файлов в bucket"""
+        """Получает список всех файлов в bucket"""
         try:
-            objects = self.client.list_objects(bucket_name, prefix=prefix, recursive=True)
-            files = []
-            for obj in objects:
-                files.append({
-                    "name": obj.object_name,
-                    "size": obj.size,
-                    "last_modified": obj.last_modified
-                })
-            return files
+            return list(self.iter_files(bucket_name, prefix=prefix))
         except S3Error as e:
             logger.error(f"Ошибка при получении списка файлов: {e}")
             return []
     
+    def iter_files(self, bucket_name: str, prefix: str = "", recursive: bool = True,
+                   start_after: Optional[str] = None) -> Iterator[dict]:
+        """
+        Лениво перечисляет файлы bucket в лексикографическом порядке
+        
+        MinIO запрашивается страницами по 1000 объектов по мере чтения итератора.
+        При recursive=False объекты группируются по разделителю "/", и вложенные
+        "каталоги" возвращаются одной записью с is_dir=True.
+        
+        Args:
+            start_after: Вернуть только объекты, имена которых больше указанного
+        """
+        objects = self.client.list_objects(
+            bucket_name,
+            prefix=prefix or None,
+            recursive=recursive,
+            start_after=start_after or None
+        )
+        for obj in objects:
+            # Каталог, на котором закончилась предыдущая страница, может вернуться повторно
+            if start_after and obj.object_name == start_after:
+                continue
+            yield _object_info(obj)
+    
+    @metrics.minio_timer("list")
+    def list_files_page(self, bucket_name: str, prefix: str = "", recursive: bool = True,
+                        start_after: Optional[str] = None, max_keys: int = 1000) -> Tuple[List[dict], Optional[str]]:
+        """
+        Получает одну страницу списка файлов
+        
+        Returns:
+            Tuple[List[dict], Optional[str]]: (files, next_start_after) - значение
+            start_after для следующей страницы или None, если список закончился
+            
+        Raises:
+            S3Error: если список получить не удалось
+        """
+        files = list(islice(self.iter_files(bucket_name, prefix, recursive, start_after), max_keys))
+        next_start_after = files[-1]["name"] if len(files) == max_keys else None
+        return files, next_start_after
+    
     def get_presigned_url(self, bucket_name: str, object_name: str, 
-                         expires_in_seconds: int = 3600) -> Optional[str]:
-        """Получает presigned URL для доступа к файлу"""
-        try:
-            url = self.client.presigned_get_object(bucket_name, object_name, 
-                                                 expires_in_seconds)
-            return url
-        except S3Error as e:
-            logger.error(f"Ошибка при создании presigned URL: {e}")
+                         expires_in_seconds: int = 3600, download_name: Optional[str] = None) -> Optional[str]:
+        """Получает presigned URL для доступа к файлу (подписанные URL кэшируются)"""
+        success, url = minio_utils.presigned_get_url(
+            object_name,
+            bucket_name=bucket_name,
+            expires_in_seconds=expires_in_seconds,
+            download_name=download_name
+        )
+        if not success:
+            logger.error(f"Ошибка при создании presigned URL для '{object_name}'")
             return None
+        return url
 
 # Глобальный экземпляр клиента
 minio_client = MinIOClient()
@@ -1,36 +1,190 @@
+import io
 import os
 import uuid
+import time
+import socket
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import urllib3
+from urllib3.connection import HTTPConnection
 from minio import Minio
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
-from typing import Optional, Tuple
+from typing import Optional, Tuple, BinaryIO, Iterator, Dict, List, Union
 import mimetypes
+from . import http_utils, metrics
 
 # Настройки MinIO
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "californiagold")
+# Размер части для multipart загрузки потока неизвестной длины (минимум 5MB)
+MINIO_PART_SIZE = int(os.getenv("MINIO_PART_SIZE", str(16 * 1024 * 1024)))
+# Размер блока и количество блоков в кэше для чтения объектов по Range запросам
+MINIO_RANGE_BLOCK_SIZE = int(os.getenv("MINIO_RANGE_BLOCK_SIZE", str(64 * 1024)))
+MINIO_RANGE_CACHE_BLOCKS = int(os.getenv("MINIO_RANGE_CACHE_BLOCKS", "32"))
+# Размер порции данных при потоковой отдаче объектов клиенту
+MINIO_STREAM_CHUNK_SIZE = int(os.getenv("MINIO_STREAM_CHUNK_SIZE", str(256 * 1024)))
 
-def get_minio_client() -> Minio:
-    """Создает клиент MinIO"""
-    return Minio(
-        MINIO_ENDPOINT,
-        access_key=MINIO_ACCESS_KEY,
-        secret_key=MINIO_SECRET_KEY,
-        secure=False  # Используем HTTP для локальной разработки
+# Адрес MinIO, доступный клиентам: на него выписываются presigned URL
+MINIO_PUBLIC_ENDPOINT = os.getenv("MINIO_PUBLIC_ENDPOINT", MINIO_ENDPOINT)
+MINIO_PUBLIC_SECURE = os.getenv("MINIO_PUBLIC_SECURE", "false").lower() == "true"
+# Регион указывается явно, чтобы подпись URL не требовала запроса к MinIO
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+# Срок действия presigned URL для прямой загрузки в MinIO
+MINIO_PRESIGNED_UPLOAD_EXPIRES = int(os.getenv("MINIO_PRESIGNED_UPLOAD_EXPIRES", "3600"))
+# Файлы больше этого размера загружаются по presigned URL частями (multipart)
+MINIO_PRESIGNED_SINGLE_MAX = int(os.getenv("MINIO_PRESIGNED_SINGLE_MAX", str(64 * 1024 * 1024)))
+# Максимальное количество частей multipart загрузки по presigned URL
+MINIO_PRESIGNED_MAX_PARTS = int(os.getenv("MINIO_PRESIGNED_MAX_PARTS", "1000"))
+
+# Время подписи presigned URL для скачивания выравнивается по окну: в пределах окна
+# один и тот же URL выдается из кэша, и каждый выданный URL действует не меньше запрошенного срока
+MINIO_PRESIGNED_URL_WINDOW = int(os.getenv("MINIO_PRESIGNED_URL_WINDOW", "300"))
+MINIO_PRESIGNED_URL_CACHE_SIZE = int(os.getenv("MINIO_PRESIGNED_URL_CACHE_SIZE", "10000"))
+# Максимальный срок действия presigned URL в S3
+MINIO_PRESIGNED_MAX_EXPIRES = 7 * 24 * 3600
+
+# Ограничения S3 на multipart загрузку
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+MULTIPART_MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+MULTIPART_MAX_PARTS = 10000
+
+# Настройки пула соединений общего клиента MinIO
+MINIO_POOL_MAXSIZE = int(os.getenv("MINIO_POOL_MAXSIZE", "32"))
+MINIO_CONNECT_TIMEOUT = float(os.getenv("MINIO_CONNECT_TIMEOUT", "5"))
+MINIO_READ_TIMEOUT = float(os.getenv("MINIO_READ_TIMEOUT", "300"))
+MINIO_MAX_RETRIES = int(os.getenv("MINIO_MAX_RETRIES", "3"))
+MINIO_TCP_KEEPALIVE = os.getenv("MINIO_TCP_KEEPALIVE", "true").lower() == "true"
+
+# Общий для процесса клиент и кэш проверенных bucket
+_client: Optional[Minio] = None
+_presign_client: Optional[Minio] = None
+_client_lock = threading.Lock()
+_known_buckets: set = set()
+
+# Кэш presigned URL для скачивания: (bucket, object, срок, окно, заголовки) -> url
+_presigned_urls: OrderedDict = OrderedDict()
+_presigned_urls_lock = threading.Lock()
+
+def _create_http_client() -> urllib3.PoolManager:
+    """Создает пул HTTP соединений для клиента MinIO"""
+    socket_options = list(HTTPConnection.default_socket_options)
+    if MINIO_TCP_KEEPALIVE:
+        # Держим простаивающие соединения живыми, чтобы не открывать их заново
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    
+    return urllib3.PoolManager(
+        maxsize=MINIO_POOL_MAXSIZE,
+        timeout=urllib3.Timeout(connect=MINIO_CONNECT_TIMEOUT, read=MINIO_READ_TIMEOUT),
+        retries=urllib3.Retry(
+            total=MINIO_MAX_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+        socket_options=socket_options,
     )
 
+def get_minio_client() -> Minio:
+    """
+    Возвращает общий для процесса клиент MinIO
+    
+    Клиент создается один раз, поэтому все операции переиспользуют
+    соединения из одного пула вместо установки нового TCP соединения.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Minio(
+                    MINIO_ENDPOINT,
+                    access_key=MINIO_ACCESS_KEY,
+                    secret_key=MINIO_SECRET_KEY,
+                    secure=False,  # Используем HTTP для локальной разработки
+                    http_client=_create_http_client()
+                )
+    return _client
+
+def get_presign_client() -> Minio:
+    """
+    Возвращает клиент для подписи URL на публичный адрес MinIO
+    
+    Подпись вычисляется локально и не обращается к MinIO, поэтому публичный
+    адрес может быть недоступен из сети API.
+    """
+    global _presign_client
+    if _presign_client is None:
+        with _client_lock:
+            if _presign_client is None:
+                _presign_client = Minio(
+                    MINIO_PUBLIC_ENDPOINT,
+                    access_key=MINIO_ACCESS_KEY,
+                    secret_key=MINIO_SECRET_KEY,
+                    secure=MINIO_PUBLIC_SECURE,
+                    region=MINIO_REGION
+                )
+    return _presign_client
+
 def ensure_bucket_exists(client: Minio, bucket_name: str = MINIO_BUCKET) -> bool:
-    """Проверяет существование bucket и создает его если нужно"""
+    """
+    Проверяет существование bucket и создает его если нужно
+    
+    Результат кэшируется, поэтому запрос к MinIO выполняется один раз на bucket.
+    """
+    if bucket_name in _known_buckets:
+        return True
     try:
         if not client.bucket_exists(bucket_name):
             client.make_bucket(bucket_name)
             print(f"✅ Bucket '{bucket_name}' создан")
+        _known_buckets.add(bucket_name)
         return True
     except S3Error as e:
         print(f"❌ Ошибка при создании bucket: {e}")
         return False
 
+def build_object_name(file_name: str) -> str:
+    """Генерирует уникальный путь для файла задания в bucket"""
+    file_uuid = str(uuid.uuid4())
+    file_extension = os.path.splitext(file_name)[1]
+    return f"jobs/{file_uuid}{file_extension}"
+
+def resolve_content_type(file_name: str, content_type: Optional[str] = None) -> str:
+    """Определяет content type по имени файла если он не указан"""
+    if content_type:
+        return content_type
+    guessed_type, _ = mimetypes.guess_type(file_name)
+    return guessed_type or "application/octet-stream"
+
+class ChecksumReader:
+    """
+    Обертка над потоком, считающая размер и SHA-256 по мере чтения.
+    
+    Позволяет передать поток в put_object и получить размер и контрольную
+    сумму загруженных данных без повторного чтения файла.
+    """
+    
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        return chunk
+    
+    @property
+    def checksum(self) -> str:
+        """SHA-256 прочитанных данных в hex"""
+        return self._sha256.hexdigest()
+
+@metrics.minio_timer("put")
 def upload_file_to_minio(file_content: bytes, file_name: str, content_type: Optional[str] = None) -> Tuple[bool, str]:
     """
     Загружает файл в MinIO
@@ -46,15 +200,10 @@ def upload_file_to_minio(file_content: bytes, file_name: str, content_type: Opti
             return False, ""
         
         # Генерируем уникальный путь для файла
-        file_uuid = str(uuid.uuid4())
-        file_extension = os.path.splitext(file_name)[1]
-        object_name = f"jobs/{file_uuid}{file_extension}"
+        object_name = build_object_name(file_name)
         
         # Определяем content type если не указан
-        if not content_type:
-            content_type, _ = mimetypes.guess_type(file_name)
-            if not content_type:
-                content_type = "application/octet-stream"
+        content_type = resolve_content_type(file_name, content_type)
         
         # Загружаем файл
         from io import BytesIO
@@ -68,6 +217,7 @@ def upload_file_to_minio(file_content: bytes, file_name: str, content_type: Opti
             content_type=content_type
         )
         
+        metrics.BYTES_UPLOADED.inc(len(file_content))
         print(f"✅ Файл '{file_name}' загружен в MinIO как '{object_name}'")
         return True, object_name
         
@@ -78,6 +228,257 @@ def upload_file_to_minio(file_content: bytes, file_name: str, content_type: Opti
         print(f"❌ Неожиданная ошибка при загрузке файла: {e}")
         return False, ""
 
+@metrics.minio_timer("put_stream")
+def upload_stream_to_minio(stream: BinaryIO, file_name: str, content_type: Optional[str] = None,
+                           part_size: int = MINIO_PART_SIZE) -> Tuple[bool, str, int, str]:
+    """
+    Загружает поток в MinIO multipart загрузкой без чтения файла в память
+    
+    Данные читаются частями по part_size, поэтому в памяти одновременно
+    находятся только загружаемые части. Размер и SHA-256 считаются на лету.
+    
+    Returns:
+        Tuple[bool, str, int, str]: (success, file_path, file_size, checksum)
+    """
+    try:
+        client = get_minio_client()
+        
+        # Убеждаемся что bucket существует
+        if not ensure_bucket_exists(client):
+            return False, "", 0, ""
+        
+        object_name = build_object_name(file_name)
+        content_type = resolve_content_type(file_name, content_type)
+        
+        reader = ChecksumReader(stream)
+        client.put_object(
+            MINIO_BUCKET,
+            object_name,
+            reader,
+            length=-1,  # Размер неизвестен заранее - загружаем частями
+            content_type=content_type,
+            part_size=part_size
+        )
+        
+        metrics.BYTES_UPLOADED.inc(reader.size)
+        print(f"✅ Файл '{file_name}' загружен в MinIO как '{object_name}' ({reader.size} байт)")
+        return True, object_name, reader.size, reader.checksum
+        
+    except S3Error as e:
+        print(f"❌ Ошибка загрузки файла в MinIO: {e}")
+        return False, "", 0, ""
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при загрузке файла: {e}")
+        return False, "", 0, ""
+
+class MinIORangeReader(io.RawIOBase):
+    """
+    Seekable файловый объект поверх объекта в MinIO
+    
+    Данные читаются HTTP Range запросами (get_object с offset/length)
+    блоками фиксированного размера с небольшим LRU кэшем. Это позволяет
+    zipfile прочитать только EOCD и центральный каталог архива, не скачивая
+    весь объект.
+    """
+    
+    def __init__(self, object_name: str, bucket_name: str = MINIO_BUCKET, client: Optional[Minio] = None,
+                 size: Optional[int] = None, block_size: int = MINIO_RANGE_BLOCK_SIZE,
+                 cache_blocks: int = MINIO_RANGE_CACHE_BLOCKS):
+        super().__init__()
+        self.object_name = object_name
+        self.bucket_name = bucket_name
+        self._client = client or get_minio_client()
+        self.size = size if size is not None else self._client.stat_object(bucket_name, object_name).size
+        self._block_size = block_size
+        self._cache_blocks = max(cache_blocks, 1)
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._position = 0
+        # Статистика для диагностики: сколько байт и запросов ушло в MinIO
+        self.bytes_fetched = 0
+        self.requests_made = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Некорректное значение whence: {whence}")
+        if position < 0:
+            raise ValueError("Отрицательная позиция в объекте")
+        self._position = position
+        return position
+    
+    def read(self, size: int = -1) -> bytes:
+        if self._position >= self.size:
+            return b""
+        end = self.size if size is None or size < 0 else min(self._position + size, self.size)
+        if end <= self._position:
+            return b""
+        
+        first_block = self._position // self._block_size
+        last_block = (end - 1) // self._block_size
+        self._load_blocks(first_block, last_block)
+        
+        chunks = []
+        for index in range(first_block, last_block + 1):
+            block = self._blocks[index]
+            self._blocks.move_to_end(index)
+            block_start = index * self._block_size
+            chunks.append(block[max(self._position - block_start, 0):end - block_start])
+        
+        data = b"".join(chunks)
+        self._position += len(data)
+        self._evict()
+        return data
+    
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def _load_blocks(self, first_block: int, last_block: int):
+        """Загружает отсутствующие в кэше блоки, объединяя соседние в один Range запрос"""
+        index = first_block
+        while index <= last_block:
+            if index in self._blocks:
+                index += 1
+                continue
+            run_end = index
+            while run_end + 1 <= last_block and run_end + 1 not in self._blocks:
+                run_end += 1
+            
+            offset = index * self._block_size
+            length = min((run_end + 1) * self._block_size, self.size) - offset
+            data = self._fetch_range(offset, length)
+            for block_index in range(index, run_end + 1):
+                start = (block_index - index) * self._block_size
+                self._blocks[block_index] = data[start:start + self._block_size]
+            index = run_end + 1
+    
+    @metrics.minio_timer("get_range")
+    def _fetch_range(self, offset: int, length: int) -> bytes:
+        """Выполняет один Range запрос к MinIO"""
+        response = self._client.get_object(self.bucket_name, self.object_name, offset=offset, length=length)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+        self.bytes_fetched += len(data)
+        self.requests_made += 1
+        metrics.BYTES_DOWNLOADED.inc(len(data))
+        return data
+    
+    def _evict(self):
+        """Удаляет самые старые блоки при переполнении кэша"""
+        while len(self._blocks) > self._cache_blocks:
+            self._blocks.popitem(last=False)
+
+def open_object_reader(object_name: str) -> Tuple[bool, Optional[MinIORangeReader]]:
+    """
+    Открывает объект MinIO для чтения по Range запросам
+    
+    Returns:
+        Tuple[bool, Optional[MinIORangeReader]]: (success, reader)
+    """
+    try:
+        return True, MinIORangeReader(object_name)
+    except S3Error as e:
+        print(f"❌ Ошибка открытия файла в MinIO: {e}")
+        return False, None
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при открытии файла: {e}")
+        return False, None
+
+@metrics.minio_timer("stat")
+def stat_object(object_name: str, bucket_name: str = MINIO_BUCKET) -> Tuple[bool, Optional[object]]:
+    """
+    Получает метаданные объекта (размер, ETag, время изменения) без чтения данных
+    
+    Returns:
+        Tuple[bool, Optional[Object]]: (success, stat)
+    """
+    try:
+        client = get_minio_client()
+        return True, client.stat_object(bucket_name, object_name)
+    except S3Error as e:
+        print(f"❌ Ошибка получения метаданных файла из MinIO: {e}")
+        return False, None
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при получении метаданных файла: {e}")
+        return False, None
+
+@metrics.minio_timer("get")
+def open_object_stream(object_name: str, bucket_name: str = MINIO_BUCKET, offset: int = 0, length: int = 0) -> Tuple[bool, Optional[urllib3.BaseHTTPResponse]]:
+    """
+    Открывает объект MinIO для потокового чтения без загрузки в память
+    
+    Ответ нужно прочитать через iter_object_stream, который вернет
+    соединение в пул после отдачи данных.
+    
+    Returns:
+        Tuple[bool, Optional[BaseHTTPResponse]]: (success, response)
+    """
+    try:
+        client = get_minio_client()
+        return True, client.get_object(bucket_name, object_name, offset=offset, length=length)
+    except S3Error as e:
+        print(f"❌ Ошибка получения файла из MinIO: {e}")
+        return False, None
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при получении файла: {e}")
+        return False, None
+
+def read_object_range(object_name: str, offset: int, length: int, bucket_name: str = MINIO_BUCKET) -> Tuple[bool, bytes]:
+    """
+    Читает небольшой диапазон байт объекта одним Range запросом
+    
+    Returns:
+        Tuple[bool, bytes]: (success, data)
+    """
+    success, response = open_object_stream(object_name, bucket_name=bucket_name, offset=offset, length=length)
+    if not success:
+        return False, b""
+    try:
+        data = response.read()
+        metrics.BYTES_DOWNLOADED.inc(len(data))
+        return True, data
+    finally:
+        response.close()
+        response.release_conn()
+
+def iter_object_stream(response: urllib3.BaseHTTPResponse, chunk_size: int = MINIO_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Отдает тело ответа MinIO порциями и освобождает соединение по завершении"""
+    try:
+        for chunk in response.stream(chunk_size):
+            metrics.BYTES_DOWNLOADED.inc(len(chunk))
+            yield chunk
+    finally:
+        response.close()
+        response.release_conn()
+
+def get_stream_headers(response: urllib3.BaseHTTPResponse) -> Dict[str, str]:
+    """Возвращает заголовки ответа MinIO, которые нужно передать клиенту"""
+    headers = {}
+    for header in ("Content-Length", "ETag", "Last-Modified"):
+        value = response.headers.get(header)
+        if value:
+            headers[header] = value
+    return headers
+
+@metrics.minio_timer("get")
 def get_file_from_minio(object_name: str) -> Tuple[bool, bytes]:
     """
     Получает файл из MinIO
@@ -92,6 +493,7 @@ def get_file_from_minio(object_name: str) -> Tuple[bool, bytes]:
         file_content = response.read()
         response.close()
         response.release_conn()
+        metrics.BYTES_DOWNLOADED.inc(len(file_content))
         
         return True, file_content
         
@@ -102,6 +504,7 @@ def get_file_from_minio(object_name: str) -> Tuple[bool, bytes]:
         print(f"❌ Неожиданная ошибка при получении файла: {e}")
         return False, b""
 
+@metrics.minio_timer("delete")
 def delete_file_from_minio(object_name: str) -> bool:
     """
     Удаляет файл из MinIO
@@ -122,6 +525,36 @@ def delete_file_from_minio(object_name: str) -> bool:
         print(f"❌ Неожиданная ошибка при удалении файла: {e}")
         return False
 
+@metrics.minio_timer("delete_many")
+def delete_files_from_minio(object_names: List[str]) -> Tuple[bool, List[str]]:
+    """
+    Удаляет несколько файлов из MinIO запросами multi-object delete
+    
+    Клиент MinIO отправляет имена пачками до 1000 объектов в одном запросе.
+    
+    Returns:
+        Tuple[bool, List[str]]: (success, список объектов, которые не удалось удалить)
+    """
+    if not object_names:
+        return True, []
+    try:
+        client = get_minio_client()
+        # remove_objects ленивый: запросы выполняются при итерации по ошибкам
+        errors = client.remove_objects(MINIO_BUCKET, (DeleteObject(name) for name in object_names))
+        failed = []
+        for error in errors:
+            print(f"❌ Ошибка удаления файла '{error.name}' из MinIO: {error.message}")
+            failed.append(error.name)
+        print(f"✅ Удалено файлов из MinIO: {len(object_names) - len(failed)}")
+        return not failed, failed
+        
+    except S3Error as e:
+        print(f"❌ Ошибка удаления файлов из MinIO: {e}")
+        return False, list(object_names)
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при удалении файлов: {e}")
+        return False, list(object_names)
+
 def get_file_url(object_name: str, expires_in_seconds: int = 3600) -> str:
     """
     Получает временную URL для доступа к файлу
@@ -129,9 +562,242 @@ def get_file_url(object_name: str, expires_in_seconds: int = 3600) -> str:
     Returns:
         str: URL для доступа к файлу
     """
+    success, url = presigned_get_url(object_name, expires_in_seconds=expires_in_seconds)
+    return url if success else ""
+
+def presigned_get_url(object_name: str, bucket_name: str = MINIO_BUCKET, expires_in_seconds: int = 3600,
+                      download_name: Optional[str] = None, content_type: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Возвращает presigned URL для скачивания объекта, переиспользуя ранее подписанные
+    
+    Время подписи округляется вниз до начала окна MINIO_PRESIGNED_URL_WINDOW, а срок
+    действия увеличивается на длину окна. Поэтому все запросы в пределах окна получают
+    один и тот же URL из кэша, а любой выданный URL действует не меньше expires_in_seconds.
+    
+    Args:
+        download_name: Имя файла для заголовка Content-Disposition ответа MinIO
+        content_type: Content-Type ответа MinIO
+        
+    Returns:
+        Tuple[bool, str]: (success, url)
+    """
+    window = max(MINIO_PRESIGNED_URL_WINDOW, 1)
+    expires_in_seconds = max(1, min(expires_in_seconds, MINIO_PRESIGNED_MAX_EXPIRES - window))
+    window_start = int(time.time()) // window * window
+    key = (bucket_name, object_name, expires_in_seconds, window_start, download_name, content_type)
+    
+    with _presigned_urls_lock:
+        url = _presigned_urls.get(key)
+        if url is not None:
+            _presigned_urls.move_to_end(key)
+    if url is not None:
+        metrics.PRESIGNED_URL_CACHE.labels(result="hit").inc()
+        return True, url
+    metrics.PRESIGNED_URL_CACHE.labels(result="miss").inc()
+    
+    response_headers = {}
+    if download_name:
+        response_headers["response-content-disposition"] = http_utils.content_disposition(download_name)
+    if content_type:
+        response_headers["response-content-type"] = content_type
+    try:
+        with metrics.minio_timer("presign"):
+            url = get_presign_client().get_presigned_url(
+                "GET",
+                bucket_name,
+                object_name,
+                timedelta(seconds=expires_in_seconds + window),
+                response_headers=response_headers or None,
+                request_date=datetime.fromtimestamp(window_start, timezone.utc)
+            )
+    except Exception as e:
+        print(f"❌ Ошибка получения URL файла: {e}")
+        return False, ""
+        
+    with _presigned_urls_lock:
+        _presigned_urls[key] = url
+        # URL прошлых окон больше не запрашиваются и вытесняются первыми
+        while len(_presigned_urls) > MINIO_PRESIGNED_URL_CACHE_SIZE:
+            _presigned_urls.popitem(last=False)
+    return True, url
+
+def multipart_part_size(file_size: int, max_parts: int = MINIO_PRESIGNED_MAX_PARTS) -> int:
+    """
+    Размер части multipart загрузки файла заданного размера
+    
+    Берется MINIO_PART_SIZE, увеличенный (с округлением до мегабайта) так,
+    чтобы частей было не больше max_parts.
+    """
+    max_parts = min(max_parts, MULTIPART_MAX_PARTS)
+    part_size = max(MINIO_PART_SIZE, MULTIPART_MIN_PART_SIZE, -(-file_size // max_parts))
+    megabyte = 1024 * 1024
+    return min(-(-part_size // megabyte) * megabyte, MULTIPART_MAX_PART_SIZE)
+
+@metrics.minio_timer("presign_put")
+def presign_upload(object_name: str, expires_in_seconds: int = MINIO_PRESIGNED_UPLOAD_EXPIRES) -> Tuple[bool, str]:
+    """
+    Выписывает presigned URL для загрузки объекта одним PUT запросом
+    
+    Returns:
+        Tuple[bool, str]: (success, url)
+    """
+    try:
+        ensure_bucket_exists(get_minio_client())
+        url = get_presign_client().presigned_put_object(MINIO_BUCKET, object_name, timedelta(seconds=expires_in_seconds))
+        return True, url
+    except Exception as e:
+        print(f"❌ Ошибка создания presigned URL для загрузки: {e}")
+        return False, ""
+
+@metrics.minio_timer("presign_multipart")
+def presign_multipart_upload(object_name: str, file_size: int, content_type: str,
+                             expires_in_seconds: int = MINIO_PRESIGNED_UPLOAD_EXPIRES) -> Tuple[bool, Optional[Dict]]:
+    """
+    Начинает multipart загрузку и выписывает presigned URL для каждой части
+    
+    Клиент загружает часть N (кроме последней - ровно part_size байт) PUT запросом
+    на URL части N, после чего загрузку завершает complete_multipart_upload.
+    
+    Returns:
+        Tuple[bool, Optional[Dict]]: (success, {"upload_id", "part_size", "parts": [{"part_number", "url"}]})
+    """
+    success, upload_id = create_multipart_upload(object_name, content_type)
+    if not success:
+        return False, None
+    try:
+        part_size = multipart_part_size(file_size)
+        part_count = max(1, -(-file_size // part_size))
+        presign_client = get_presign_client()
+        expires = timedelta(seconds=expires_in_seconds)
+        parts = [
+            {
+                "part_number": part_number,
+                "url": presign_client.get_presigned_url(
+                    "PUT", MINIO_BUCKET, object_name, expires,
+                    extra_query_params={"partNumber": str(part_number), "uploadId": upload_id}
+                )
+            }
+            for part_number in range(1, part_count + 1)
+        ]
+        return True, {"upload_id": upload_id, "part_size": part_size, "parts": parts}
+    except Exception as e:
+        print(f"❌ Ошибка подписи URL частей multipart загрузки: {e}")
+        abort_multipart_upload(object_name, upload_id)
+        return False, None
+
+@metrics.minio_timer("create_multipart")
+def create_multipart_upload(object_name: str, content_type: str) -> Tuple[bool, str]:
+    """
+    Начинает multipart загрузку объекта
+    
+    Returns:
+        Tuple[bool, str]: (success, upload_id)
+    """
     try:
         client = get_minio_client()
-        return client.presigned_get_object(MINIO_BUCKET, object_name, expires_in_seconds)
+        if not ensure_bucket_exists(client):
+            return False, ""
+        return True, client._create_multipart_upload(MINIO_BUCKET, object_name, {"Content-Type": content_type})
+    except Exception as e:
+        print(f"❌ Ошибка создания multipart загрузки: {e}")
+        return False, ""
+
+@metrics.minio_timer("upload_part")
+def upload_part(object_name: str, upload_id: str, part_number: int, data: Union[bytes, bytearray],
+                content_md5: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Загружает одну часть multipart загрузки
+    
+    Повторная загрузка части с тем же номером заменяет ее.
+    
+    Args:
+        data: Данные части; bytearray передается без копирования
+        content_md5: Base64 MD5 части из заголовка клиента - MinIO отклонит поврежденные данные
+        
+    Returns:
+        Tuple[bool, str]: (success, etag или сообщение об ошибке)
+    """
+    headers = {"Content-MD5": content_md5} if content_md5 else None
+    try:
+        etag = get_minio_client()._upload_part(MINIO_BUCKET, object_name, data, headers, upload_id, part_number)
+        metrics.BYTES_UPLOADED.inc(len(data))
+        return True, etag
     except S3Error as e:
-        print(f"❌ Ошибка получения URL файла: {e}")
-        return ""
+        print(f"❌ Ошибка загрузки части {part_number} в MinIO: {e}")
+        return False, e.code
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка при загрузке части {part_number}: {e}")
+        return False, str(e)
+
+def list_uploaded_parts(object_name: str, upload_id: str) -> List[Part]:
+    """
+    Возвращает все загруженные части multipart загрузки
+    
+    Raises:
+        S3Error: если загрузка не найдена
+    """
+    client = get_minio_client()
+    parts = []
+    marker = None
+    while True:
+        result = client._list_parts(MINIO_BUCKET, object_name, upload_id, part_number_marker=marker)
+        parts.extend(result.parts)
+        if not result.is_truncated:
+            return parts
+        marker = result.next_part_number_marker
+
+@metrics.minio_timer("complete_multipart")
+def complete_multipart_upload(object_name: str, upload_id: str, part_count: Optional[int] = None) -> Tuple[bool, str]:
+    """
+    Собирает объект из загруженных частей
+    
+    Список частей и их ETag берется у MinIO, поэтому клиенту не нужно их передавать.
+    
+    Args:
+        part_count: Ожидаемое количество частей (None - не проверять)
+        
+    Returns:
+        Tuple[bool, str]: (success, error_message)
+    """
+    try:
+        parts = list_uploaded_parts(object_name, upload_id)
+        if not parts:
+            return False, "Ни одна часть файла не загружена"
+        if part_count is not None and len(parts) != part_count:
+            return False, f"Загружено {len(parts)} из {part_count} частей файла"
+        parts = [Part(part.part_number, part.etag) for part in sorted(parts, key=lambda part: part.part_number)]
+        get_minio_client()._complete_multipart_upload(MINIO_BUCKET, object_name, upload_id, parts)
+        return True, ""
+    except S3Error as e:
+        print(f"❌ Ошибка завершения multipart загрузки: {e}")
+        return False, f"Ошибка завершения загрузки: {e.code}"
+
+@metrics.minio_timer("abort_multipart")
+def abort_multipart_upload(object_name: str, upload_id: str) -> bool:
+    """Отменяет multipart загрузку и удаляет загруженные части"""
+    try:
+        get_minio_client()._abort_multipart_upload(MINIO_BUCKET, object_name, upload_id)
+        return True
+    except S3Error as e:
+        print(f"❌ Ошибка отмены multipart загрузки: {e}")
+        return False
+
+@metrics.minio_timer("checksum")
+def compute_object_checksum(object_name: str) -> Tuple[bool, str]:
+    """
+    Считает SHA-256 объекта, читая его потоком из MinIO
+    
+    Returns:
+        Tuple[bool, str]: (success, checksum)
+    """
+    success, response = open_object_stream(object_name)
+    if not success:
+        return False, ""
+    sha256 = hashlib.sha256()
+    try:
+        for chunk in iter_object_stream(response):
+            sha256.update(chunk)
+        return True, sha256.hexdigest()
+    except Exception as e:
+        print(f"❌ Ошибка чтения файла из MinIO: {e}")
+        return False, ""
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, UUID
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, Boolean, Text, ForeignKey, UUID, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 import uuid
 from .database import Base
@@ -24,22 +24,131 @@ class User(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Индекс для keyset пагинации списка заданий пользователя
+        Index("ix_jobs_owner_created_id", "owner_id", "created_at", "id"),
+        # Частичный индекс очереди: только ожидающие обработки задания с загруженным файлом
+        Index(
+            "ix_jobs_pending_queue", "created_at", "id",
+            postgresql_where=text("status = 'pending' AND file_path IS NOT NULL")
+        ),
+        # Частичный индекс для поиска заданий с истекшей арендой
+        Index(
+            "ix_jobs_processing_lease", "lease_expires_at",
+            postgresql_where=text("status = 'processing'")
+        ),
+        # Частичный индекс для поиска брошенных прямых загрузок в MinIO
+        Index(
+            "ix_jobs_uploading_created", "created_at",
+            postgresql_where=text("status = 'uploading'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, index=True)
     title = Column(String(200), nullable=True)
     description = Column(Text, nullable=True)
-    status = Column(String(50), default="pending")  # pending, processing, completed, failed
-    file_path = Column(String(500), nullable=True)  # Путь к файлу в MinIO
+    status = Column(String(50), default="pending")  # uploading, pending, processing, completed, failed
+    file_path = Column(String(500), nullable=True, index=True)  # Путь к файлу в MinIO
     file_name = Column(String(255), nullable=True)  # Оригинальное имя файла
-    file_size = Column(Integer, nullable=True)  # Размер файла в байтах
+    file_size = Column(BigInteger, nullable=True)  # Размер файла в байтах
     file_content_type = Column(String(100), nullable=True)  # MIME тип файла
+    file_checksum = Column(String(64), nullable=True)  # SHA-256 загруженного файла
+    upload_id = Column(String(1024), nullable=True)  # Multipart загрузка по presigned URL, пока задание в статусе uploading
     file_type = Column(String(20), default="single")  # single, zip
     zip_contents = Column(Text, nullable=True)  # JSON список файлов в ZIP архиве
+    # Агрегированная статистика ZIP архива, вычисляется один раз при загрузке
+    zip_total_files = Column(Integer, nullable=True)
+    zip_total_size = Column(BigInteger, nullable=True)
+    zip_total_compressed_size = Column(BigInteger, nullable=True)
+    zip_compression_ratio = Column(Float, nullable=True)
+    zip_is_encrypted = Column(Boolean, nullable=True)
+    zip_comment = Column(Text, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Состояние обработки заданий воркерами
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Количество взятий в обработку
+    worker_id = Column(String(100), nullable=True)  # Воркер, обрабатывающий задание
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Срок аренды задания воркером
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Последний heartbeat воркера
+    last_error = Column(Text, nullable=True)  # Ошибка последней попытки обработки
+    dicom_indexed_at = Column(DateTime(timezone=True), nullable=True)  # Когда построен индекс DICOM серий
     
     # Связь с пользователем
     owner = relationship("User", back_populates="jobs")
+    
+    # Файлы внутри ZIP архива
+    files = relationship("JobFile", back_populates="job", cascade="all, delete-orphan", passive_deletes=True)
+
+class JobFile(Base):
+    __tablename__ = "job_files"
+    __table_args__ = (
+        Index("ix_job_files_job_id_extension", "job_id", "extension"),
+        Index("ix_job_files_job_id_size", "job_id", "size"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    path = Column(String(500), nullable=False)  # Путь файла внутри архива
+    extension = Column(String(50), nullable=True)  # Расширение в нижнем регистре, например ".dcm"
+    size = Column(BigInteger, nullable=True)  # Размер после распаковки
+    compressed_size = Column(BigInteger, nullable=True)  # Размер в архиве
+    content_type = Column(String(100), nullable=True)  # MIME тип файла
+    mtime = Column(DateTime, nullable=True)  # Время изменения из заголовка ZIP
+    header_offset = Column(BigInteger, nullable=True)  # Смещение локального заголовка записи в архиве
+    compress_type = Column(Integer, nullable=True)  # Метод сжатия (0 - stored, 8 - deflate)
+    crc32 = Column(BigInteger, nullable=True)  # CRC-32 распакованных данных из центрального каталога
+    
+    # Связь с заданием
+    job = relationship("Job", back_populates="files")
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        # Частичный индекс для поиска брошенных загрузок
+        Index(
+            "ix_upload_sessions_active_expires", "expires_at",
+            postgresql_where=text("status = 'active'")
+        ),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    object_name = Column(String(500), nullable=False)  # Путь объекта в MinIO
+    upload_id = Column(String(1024), nullable=False)  # Идентификатор multipart загрузки MinIO
+    file_size = Column(BigInteger, nullable=False)  # Заявленный размер файла
+    part_size = Column(BigInteger, nullable=False)  # Размер каждой части, кроме последней
+    part_count = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="active")  # active, completed, aborted, expired
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)  # Продлевается при загрузке каждой части
+
+class DicomInstance(Base):
+    __tablename__ = "dicom_instances"
+    __table_args__ = (
+        # Выборка срезов серии в порядке InstanceNumber
+        Index("ix_dicom_instances_job_series_instance", "job_id", "series_instance_uid", "instance_number"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+    job_file_id = Column(Integer, ForeignKey("job_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    path = Column(String(500), nullable=False)  # Путь файла внутри архива
+    study_instance_uid = Column(String(64), nullable=True)
+    series_instance_uid = Column(String(64), nullable=True)
+    sop_instance_uid = Column(String(64), nullable=True)
+    modality = Column(String(16), nullable=True)
+    series_description = Column(String(255), nullable=True)
+    instance_number = Column(Integer, nullable=True)
+    # ImagePositionPatient - координаты левого верхнего пикселя среза, мм
+    image_position_x = Column(Float, nullable=True)
+    image_position_y = Column(Float, nullable=True)
+    image_position_z = Column(Float, nullable=True)
+    rows = Column(Integer, nullable=True)
+    columns = Column(Integer, nullable=True)
+    header_offset = Column(BigInteger, nullable=False)  # Смещение локального заголовка записи в архиве
+    data_offset = Column(BigInteger, nullable=False)  # Смещение сжатых данных записи в архиве
@@ -0,0 +1,90 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+# Количество процессов для хеширования паролей (0 - хешировать в текущем потоке)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Максимум операций в работе и очереди; сверх этого запросы получают 429
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "8"))
+# Количество раундов PBKDF2; хеши с другим числом раундов пересчитываются при входе
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "30"))
+
+# Настройка для хеширования паролей
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+class PasswordHashingBusy(Exception):
+    """Очередь хеширования паролей заполнена"""
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+def get_executor() -> ProcessPoolExecutor:
+    """Возвращает отдельный пул процессов для хеширования паролей"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+def _run(func, *args):
+    """
+    Выполняет функцию в пуле процессов с ограничением очереди
+    
+    Raises:
+        PasswordHashingBusy: если в работе уже PASSWORD_HASH_MAX_PENDING операций
+    """
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+        
+    if not _pending.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = get_executor().submit(func, *args)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+
+def hash_password(password: str) -> str:
+    """Хеширует пароль"""
+    return _run(_hash, password)
+
+def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль
+    
+    Returns:
+        Tuple[bool, Optional[str]]: (is_valid, new_hash) - new_hash заполнен,
+        если хеш создан с устаревшими параметрами и его нужно сохранить заново
+    """
+    return _run(_verify_and_update, plain_password, hashed_password)
+
+def shutdown():
+    """Останавливает пул процессов"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,8 +1,12 @@
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import Optional, List
 from datetime import datetime
 import uuid
 
+# Статусы, которые пользователь может задать заданию: processing выставляет воркер
+# при аренде задания, uploading - создание задания с прямой загрузкой файла
+USER_JOB_STATUSES = ("pending", "completed", "failed")
+
 class UserBase(BaseModel):
     username: str
     email: Optional[EmailStr] = None
@@ -67,6 +71,12 @@ class JobUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     status: Optional[str] = None
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v is not None and v not in USER_JOB_STATUSES:
+            raise ValueError(f"Статус должен быть одним из: {', '.join(USER_JOB_STATUSES)}")
+        return v
 
 class JobResponse(JobBase):
     id: int
@@ -75,15 +85,192 @@ class JobResponse(JobBase):
     file_name: Optional[str] = None
     file_size: Optional[int] = None
     file_content_type: Optional[str] = None
+    file_checksum: Optional[str] = None
     file_type: Optional[str] = "single"
-    zip_contents: Optional[str] = None  # JSON строка с содержимым ZIP архива
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    attempts: Optional[int] = 0
+    last_error: Optional[str] = None
     
     class Config:
         from_attributes = True
 
 class JobWithOwner(JobResponse):
     owner: UserResponse
+
+class JobSummary(BaseModel):
+    """Краткая информация о задании для списков"""
+    id: int
+    uuid: uuid.UUID
+    title: Optional[str] = None
+    status: str
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    file_type: Optional[str] = "single"
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class JobSummaryPage(BaseModel):
+    items: List[JobSummary]
+    next_cursor: Optional[str] = None  # Курсор следующей страницы или None если страниц больше нет
+
+class JobFileResponse(BaseModel):
+    path: str
+    size: Optional[int] = None
+    compressed_size: Optional[int] = None
+    content_type: Optional[str] = None
+    mtime: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class JobFilesPage(BaseModel):
+    job_id: int
+    zip_filename: Optional[str] = None
+    total_files: int
+    skip: int
+    limit: int
+    files: List[JobFileResponse]
+
+# Схемы индекса DICOM серий
+class DicomSeriesResponse(BaseModel):
+    series_instance_uid: str
+    study_instance_uid: Optional[str] = None
+    modality: Optional[str] = None
+    series_description: Optional[str] = None
+    rows: Optional[int] = None
+    columns: Optional[int] = None
+    instance_count: int
+    
+    class Config:
+        from_attributes = True
+
+class DicomSeriesList(BaseModel):
+    job_id: int
+    indexed_at: Optional[datetime] = None  # None - индекс еще не построен
+    series: List[DicomSeriesResponse]
+
+class DicomInstanceResponse(BaseModel):
+    path: str
+    sop_instance_uid: Optional[str] = None
+    instance_number: Optional[int] = None
+    image_position_patient: Optional[List[Optional[float]]] = None
+    rows: Optional[int] = None
+    columns: Optional[int] = None
+    header_offset: int
+    data_offset: int
+
+# Схемы для воркеров обработки заданий
+class WorkerClaimRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100)
+    limit: int = Field(1, ge=1, le=100)
+    lease_seconds: Optional[int] = Field(None, ge=1, le=86400)
+
+class WorkerHeartbeatRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100)
+    lease_seconds: Optional[int] = Field(None, ge=1, le=86400)
+
+class WorkerCompleteRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100)
+
+class WorkerFailRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100)
+    error: str = Field(..., max_length=10000)
+
+# Схемы для пакетных операций с заданиями
+
+class JobBatchError(BaseModel):
+    index: int  # Позиция элемента в запросе
+    file_name: Optional[str] = None
+    status_code: int
+    detail: str
+
+class JobBatchCreateResponse(BaseModel):
+    created: List[JobResponse]
+    errors: List[JobBatchError]
+
+class JobManifestItem(BaseModel):
+    object_name: str = Field(..., min_length=1, max_length=500)  # Путь к уже загруженному объекту в бакете
+    file_name: Optional[str] = None  # По умолчанию - имя объекта
+    title: Optional[str] = None
+    description: Optional[str] = None
+    content_type: Optional[str] = None
+    checksum: Optional[str] = Field(None, max_length=64)  # SHA-256, если известен
+
+class JobManifestRequest(BaseModel):
+    items: List[JobManifestItem] = Field(..., min_length=1)
+
+class JobBatchIds(BaseModel):
+    job_ids: List[int] = Field(..., min_length=1)
+
+class JobBatchStatusRequest(JobBatchIds):
+    status: str
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v not in USER_JOB_STATUSES:
+            raise ValueError(f"Статус должен быть одним из: {', '.join(USER_JOB_STATUSES)}")
+        return v
+
+class JobBatchStatusResponse(BaseModel):
+    updated: List[int]
+    not_found: List[int]
+
+class JobBatchDeleteResponse(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
+    storage_errors: List[str]  # Объекты, которые не удалось удалить из MinIO
+
+# Схемы для прямой загрузки файлов в MinIO по presigned URL
+class JobUploadRequest(BaseModel):
+    file_name: str = Field(..., min_length=1, max_length=255)
+    file_size: int = Field(..., gt=0, le=5 * 1024 ** 4)  # Размер файла в байтах (не больше 5 TiB)
+    content_type: Optional[str] = Field(None, max_length=100)
+    checksum: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")  # SHA-256, проверяется при finalize
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+class JobUploadPart(BaseModel):
+    part_number: int
+    url: str
+
+class JobUploadResponse(BaseModel):
+    job: JobResponse
+    object_name: str
+    expires_in: int  # Срок действия URL в секундах
+    url: Optional[str] = None  # URL для загрузки одним PUT запросом
+    upload_id: Optional[str] = None  # Идентификатор multipart загрузки, передается в finalize
+    part_size: Optional[int] = None  # Размер каждой части, кроме последней
+    parts: Optional[List[JobUploadPart]] = None  # URL частей multipart загрузки
+
+class JobUploadFinalizeRequest(BaseModel):
+    upload_id: Optional[str] = None  # Для multipart загрузки
+
+# Схемы для возобновляемой загрузки частями через API
+class UploadSessionCreate(JobUploadRequest):
+    part_size: Optional[int] = Field(None, ge=5 * 1024 ** 2, le=5 * 1024 ** 3)  # Желаемый размер части
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: Optional[int] = None
+    etag: str
+
+class UploadSessionResponse(BaseModel):
+    id: uuid.UUID
+    job_id: int
+    status: str  # active, completed, aborted, expired
+    file_size: int
+    part_size: int  # Размер каждой части, кроме последней
+    part_count: int
+    expires_at: datetime  # Продлевается при загрузке каждой части
+    uploaded_parts: List[UploadPartResponse] = []
+    missing_parts: List[int] = []
+    offset: int = 0  # Байт загружено подряд с начала файла
+
+class UploadSessionCreateResponse(UploadSessionResponse):
+    job: JobResponse
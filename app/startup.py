@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+from typing import Callable, Dict
+from . import models, minio_utils
+from .database import engine
+from .db_wait import check_postgres
+from .minio_client import DEFAULT_BUCKET
+
+# Создавать таблицы при старте (в продакшене схему ведут миграции)
+STARTUP_CREATE_SCHEMA = os.getenv("STARTUP_CREATE_SCHEMA", "true").lower() == "true"
+# Через сколько секунд ожидания зависимости выводится предупреждение (проверки продолжаются)
+STARTUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_TIMEOUT_SECONDS", "60"))
+# Пауза между проверками растет от начальной до максимальной
+STARTUP_PROBE_INITIAL_DELAY = float(os.getenv("STARTUP_PROBE_INITIAL_DELAY", "0.2"))
+STARTUP_PROBE_MAX_DELAY = float(os.getenv("STARTUP_PROBE_MAX_DELAY", "5"))
+
+# Состояние старта приложения для эндпоинта /ready
+state: Dict[str, object] = {
+    "postgres": False,
+    "minio": False,
+    "schema": not STARTUP_CREATE_SCHEMA,
+    "finished": False,
+    "error": None,
+}
+
+def check_minio() -> bool:
+    """Проверяет доступность MinIO и наличие нужных bucket"""
+    try:
+        client = minio_utils.get_minio_client()
+        return (
+            minio_utils.ensure_bucket_exists(client, minio_utils.MINIO_BUCKET)
+            and minio_utils.ensure_bucket_exists(client, DEFAULT_BUCKET)
+        )
+    except Exception as e:
+        print(f"⏳ MinIO недоступен: {e.__class__.__name__}")
+        return False
+
+def create_schema() -> bool:
+    """Создает недостающие таблицы"""
+    print("📊 Создание таблиц в базе данных...")
+    models.Base.metadata.create_all(bind=engine)
+    print("✅ Таблицы созданы успешно!")
+    return True
+
+async def wait_for_dependency(name: str, probe: Callable[[], bool], timeout: float = STARTUP_TIMEOUT_SECONDS) -> bool:
+    """
+    Повторяет блокирующую проверку в пуле потоков с экспоненциальной паузой,
+    пока зависимость не станет доступна
+    
+    Args:
+        name: Имя зависимости в state
+        probe: Блокирующая проверка, возвращающая True при готовности
+        timeout: Через сколько секунд вывести предупреждение о долгом ожидании
+    """
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + timeout
+    delay = STARTUP_PROBE_INITIAL_DELAY
+    attempt = 0
+    warned = False
+    while True:
+        attempt += 1
+        if await loop.run_in_executor(None, probe):
+            print(f"✅ {name} готов! (попытка {attempt})")
+            state[name] = True
+            return True
+        if not warned and time.monotonic() > deadline:
+            print(f"⚠️  {name} недоступен дольше {timeout:.0f} с, продолжаем проверки")
+            warned = True
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STARTUP_PROBE_MAX_DELAY)
+
+async def run_startup():
+    """Параллельно ожидает PostgreSQL и MinIO, затем при необходимости создает схему"""
+    print("🔄 Ожидание готовности PostgreSQL и MinIO...")
+    try:
+        await asyncio.gather(
+            wait_for_dependency("postgres", check_postgres),
+            wait_for_dependency("minio", check_minio),
+        )
+        if STARTUP_CREATE_SCHEMA:
+            loop = asyncio.get_running_loop()
+            state["schema"] = await loop.run_in_executor(None, create_schema)
+    except Exception as e:
+        state["error"] = str(e)
+        print(f"❌ Ошибка при старте приложения: {e}")
+    finally:
+        state["finished"] = True
+
+def is_ready() -> bool:
+    """Приложение готово принимать трафик: старт завершен и все зависимости доступны"""
+    return bool(state["finished"] and state["postgres"] and state["minio"] and state["schema"])
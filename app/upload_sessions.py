@@ -0,0 +1,129 @@
+import os
+import asyncio
+from typing import Dict, List, Optional
+from minio.error import S3Error
+from . import job_crud, minio_utils, models
+from .database import SessionLocal
+
+# Период поиска брошенных сессий возобновляемой загрузки
+UPLOAD_SESSION_REAP_INTERVAL_SECONDS = float(os.getenv("UPLOAD_SESSION_REAP_INTERVAL_SECONDS", "300"))
+# Максимальный размер части: часть принимается в память API целиком
+UPLOAD_MAX_PART_SIZE = int(os.getenv("UPLOAD_MAX_PART_SIZE", str(64 * 1024 * 1024)))
+
+def choose_part_size(file_size: int, requested: Optional[int] = None) -> int:
+    """
+    Размер части для сессии загрузки
+    
+    Используется запрошенный клиентом размер (или MINIO_PART_SIZE), увеличенный
+    при необходимости так, чтобы частей было не больше лимита S3.
+    
+    Raises:
+        ValueError: если запрошенный размер больше UPLOAD_MAX_PART_SIZE или файл
+            не укладывается в лимит частей S3 с частями не больше UPLOAD_MAX_PART_SIZE
+    """
+    if requested and requested > UPLOAD_MAX_PART_SIZE:
+        raise ValueError(f"Размер части не может быть больше {UPLOAD_MAX_PART_SIZE} байт")
+    minimum = max(minio_utils.MULTIPART_MIN_PART_SIZE, -(-file_size // minio_utils.MULTIPART_MAX_PARTS))
+    if minimum > UPLOAD_MAX_PART_SIZE:
+        raise ValueError("Файл слишком большой для загрузки частями через API, используйте POST /jobs/upload")
+    return min(max(requested or minio_utils.MINIO_PART_SIZE, minimum), UPLOAD_MAX_PART_SIZE)
+
+def expected_part_size(db_session: models.UploadSession, part_number: int) -> int:
+    """Размер части с указанным номером: все части, кроме последней, равны part_size"""
+    if part_number < db_session.part_count:
+        return db_session.part_size
+    return db_session.file_size - db_session.part_size * (db_session.part_count - 1)
+
+def session_status(db_session: models.UploadSession) -> Dict:
+    """
+    Состояние сессии с загруженными частями из MinIO
+    
+    offset - количество байт, загруженных подряд с начала файла: при
+    последовательной загрузке с него можно продолжить после обрыва.
+    """
+    parts: List[Dict] = []
+    missing_parts: List[int] = []
+    offset = db_session.file_size if db_session.status == "completed" else 0
+    if db_session.status == "active":
+        try:
+            uploaded = minio_utils.list_uploaded_parts(db_session.object_name, db_session.upload_id)
+        except S3Error as e:
+            print(f"❌ Ошибка получения частей загрузки из MinIO: {e}")
+            uploaded = []
+        parts = [
+            {"part_number": part.part_number, "size": part.size, "etag": part.etag}
+            for part in sorted(uploaded, key=lambda part: part.part_number)
+        ]
+        uploaded_numbers = {part["part_number"] for part in parts}
+        missing_parts = [number for number in range(1, db_session.part_count + 1) if number not in uploaded_numbers]
+        
+        for expected_number, part in enumerate(parts, start=1):
+            if part["part_number"] != expected_number:
+                break
+            offset += part["size"] or 0
+            
+    return {
+        "id": db_session.id,
+        "job_id": db_session.job_id,
+        "status": db_session.status,
+        "file_size": db_session.file_size,
+        "part_size": db_session.part_size,
+        "part_count": db_session.part_count,
+        "expires_at": db_session.expires_at,
+        "uploaded_parts": parts,
+        "missing_parts": missing_parts,
+        "offset": offset,
+    }
+
+def reap_expired_sessions() -> int:
+    """
+    Отменяет брошенные загрузки: сессии помечаются истекшими, задания - failed,
+    а загруженные части удаляются из MinIO
+    
+    Returns:
+        int: Количество отмененных сессий
+    """
+    db = SessionLocal()
+    try:
+        sessions = job_crud.expire_upload_sessions(db)
+    finally:
+        db.close()
+        
+    for db_session in sessions:
+        minio_utils.abort_multipart_upload(db_session.object_name, db_session.upload_id)
+    if sessions:
+        print(f"🧹 Отменено брошенных загрузок: {len(sessions)}")
+    return len(sessions)
+
+def reap_expired_direct_uploads() -> int:
+    """
+    Переводит в failed задания брошенных прямых загрузок (POST /jobs/upload),
+    отменяет их multipart загрузки и удаляет объекты, если файл успел загрузиться
+    
+    Returns:
+        int: Количество истекших заданий
+    """
+    db = SessionLocal()
+    try:
+        expired = job_crud.expire_direct_uploads(db)
+    finally:
+        db.close()
+        
+    for row in expired:
+        if row.upload_id:
+            minio_utils.abort_multipart_upload(row.file_path, row.upload_id)
+    minio_utils.delete_files_from_minio([row.file_path for row in expired if row.file_path])
+    if expired:
+        print(f"🧹 Истекло брошенных прямых загрузок: {len(expired)}")
+    return len(expired)
+
+async def reaper_loop():
+    """Фоновый цикл отмены брошенных загрузок; запускается в lifespan приложения"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, reap_expired_sessions)
+            await loop.run_in_executor(None, reap_expired_direct_uploads)
+        except Exception as e:
+            print(f"⚠️  Ошибка отмены брошенных загрузок: {e}")
+        await asyncio.sleep(UPLOAD_SESSION_REAP_INTERVAL_SECONDS)
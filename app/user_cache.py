@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any
+from sqlalchemy import DateTime
+from . import models
+
+# Настройки кэша аутентифицированных пользователей
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+# Общий Redis для согласованного кэша между воркерами (требует пакет redis)
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL")
+
+# Колонки пользователя, которые попадают в кэш (хеш пароля не кэшируем)
+_CACHED_COLUMNS = [column for column in models.User.__table__.columns if column.name != "hashed_password"]
+_DATETIME_COLUMNS = {column.name for column in _CACHED_COLUMNS if isinstance(column.type, DateTime)}
+
+class LocalUserCacheBackend:
+    """TTL/LRU кэш в памяти процесса"""
+    
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+            
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class RedisUserCacheBackend:
+    """Кэш в Redis, общий для всех воркеров"""
+    
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis
+        
+        self._client = redis.Redis.from_url(url)
+        self._ttl_seconds = ttl_seconds
+        
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"californiagold:user:{key}"
+        
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._key(key))
+        return json.loads(raw) if raw else None
+        
+    def set(self, key: str, value: Dict[str, Any]):
+        self._client.set(self._key(key), json.dumps(value), ex=self._ttl_seconds)
+        
+    def delete(self, key: str):
+        self._client.delete(self._key(key))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Возвращает backend кэша, создавая его при первом обращении"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if USER_CACHE_REDIS_URL:
+                    try:
+                        _backend = RedisUserCacheBackend(USER_CACHE_REDIS_URL, USER_CACHE_TTL_SECONDS)
+                        print("✅ Кэш пользователей использует Redis")
+                    except ImportError:
+                        print("⚠️  Пакет redis не установлен, кэш пользователей работает в памяти процесса")
+                if _backend is None:
+                    _backend = LocalUserCacheBackend(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+    return _backend
+
+def _serialize(user: models.User) -> Dict[str, Any]:
+    """Снимок колонок пользователя, пригодный для JSON"""
+    data = {}
+    for column in _CACHED_COLUMNS:
+        value = getattr(user, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data[column.name] = value
+    return data
+
+def _deserialize(data: Dict[str, Any]) -> models.User:
+    """Восстанавливает отсоединенный от сессии объект пользователя из снимка"""
+    values = dict(data)
+    for name in _DATETIME_COLUMNS:
+        if values.get(name):
+            values[name] = datetime.fromisoformat(values[name])
+    return models.User(**values)
+
+def get_cached_user(username: str) -> Optional[models.User]:
+    """
+    Получает пользователя из кэша по username (subject токена)
+    
+    Возвращает объект, не привязанный к сессии БД: его можно читать,
+    но не изменять через сессию.
+    """
+    if not USER_CACHE_ENABLED:
+        return None
+    try:
+        data = get_backend().get(username)
+    except Exception as e:
+        print(f"⚠️  Ошибка чтения кэша пользователей: {e}")
+        return None
+    return _deserialize(data) if data else None
+
+def cache_user(user: models.User):
+    """Сохраняет пользователя в кэш"""
+    if not USER_CACHE_ENABLED:
+        return
+    try:
+        get_backend().set(user.username, _serialize(user))
+    except Exception as e:
+        print(f"⚠️  Ошибка записи в кэш пользователей: {e}")
+
+def invalidate_user(username: Optional[str]):
+    """Удаляет пользователя из кэша после изменения или удаления"""
+    if not USER_CACHE_ENABLED or not username:
+        return
+    try:
+        get_backend().delete(username)
+    except Exception as e:
+        print(f"⚠️  Ошибка инвалидации кэша пользователей: {e}")
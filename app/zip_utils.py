@@ -1,79 +1,239 @@
 import zipfile
 import json
 import os
-from typing import List, Dict, Tuple, Optional
+import struct
+import zlib
+from typing import List, Dict, Tuple, Optional, Union, BinaryIO, Iterator
 from io import BytesIO
 import mimetypes
 
-def is_zip_file(file_content: bytes, filename: str) -> bool:
+# Источник ZIP архива: содержимое в памяти или seekable файловый объект
+ZipSource = Union[bytes, BinaryIO]
+
+# Локальный заголовок записи ZIP: фиксированная часть и сигнатура
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+_LOCAL_HEADER_STRUCT = struct.Struct('<IHHHHHIIIHH')
+
+# Методы сжатия, которые можно распаковать потоком
+STREAMABLE_COMPRESS_TYPES = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+# Ограничения архива по умолчанию (файл, загружаемый через API)
+ZIP_MAX_FILES = int(os.getenv("ZIP_MAX_FILES", "1000"))
+ZIP_MAX_SIZE = int(os.getenv("ZIP_MAX_SIZE", str(100 * 1024 * 1024)))
+
+def _open_source(source: ZipSource) -> BinaryIO:
     """
-    Проверяет, является ли файл ZIP архивом
+    Возвращает поток для zipfile
+    
+    Байты оборачиваются в BytesIO, файловые объекты перематываются в начало
+    и используются как есть, без копирования в память.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+def _source_size(source: ZipSource) -> int:
+    """Возвращает размер источника в байтах"""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    position = source.tell()
+    source.seek(0, 2)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+def _decode_comment(comment: bytes) -> str:
+    """
+    Декодирует комментарий архива
+    
+    Кодировка комментария в ZIP не указывается: как и zipfile для имен файлов
+    без флага UTF-8, при ошибке декодирования используем cp437, которая
+    принимает любые байты.
+    """
+    try:
+        return comment.decode('utf-8')
+    except UnicodeDecodeError:
+        return comment.decode('cp437')
+
+class ZipManifest:
+    """
+    Результат однократного разбора центрального каталога ZIP архива
+    
+    Список файлов, агрегированная статистика и результаты проверок
+    безопасности собираются за один проход по filelist, поэтому архив
+    не нужно открывать повторно для каждой операции.
+    """
+    
+    def __init__(self, zip_file: zipfile.ZipFile, archive_size: int):
+        self.archive_size = archive_size
+        self.comment = _decode_comment(zip_file.comment) if zip_file.comment else None
+        self.file_infos: List[zipfile.ZipInfo] = []
+        self.entries: List[Dict[str, any]] = []
+        self.total_size = 0
+        self.total_compressed_size = 0
+        self.encrypted_files: List[str] = []
+        # Первая найденная проблема в записях архива (zip bomb, длинное имя, zip slip)
+        self.entry_error: Optional[str] = None
+        
+        for file_info in zip_file.filelist:
+            is_encrypted = file_info.flag_bits & 0x1 != 0
+            if is_encrypted:
+                self.encrypted_files.append(file_info.filename)
+            
+            # Пропускаем директории
+            if file_info.is_dir():
+                continue
+            
+            self.file_infos.append(file_info)
+            self.total_size += file_info.file_size
+            self.total_compressed_size += file_info.compress_size
+            
+            self.entries.append({
+                'filename': file_info.filename,
+                'size': file_info.file_size,
+                'compressed_size': file_info.compress_size,
+                'compression_ratio': round((1 - file_info.compress_size / file_info.file_size) * 100, 2) if file_info.file_size > 0 else 0,
+                'modified_time': file_info.date_time,
+                'is_encrypted': is_encrypted,
+                'content_type': mimetypes.guess_type(file_info.filename)[0] or 'application/octet-stream',
+                'header_offset': file_info.header_offset,
+                'compress_type': file_info.compress_type,
+                'crc': file_info.CRC
+            })
+            
+            if self.entry_error is None:
+                self.entry_error = self._check_entry(file_info)
+    
+    @staticmethod
+    def _check_entry(file_info: zipfile.ZipInfo) -> Optional[str]:
+        """Проверяет запись архива и возвращает описание проблемы или None"""
+        # Проверяем на подозрительно высокий коэффициент сжатия (zip bombs)
+        if file_info.file_size > 0:
+            compression_ratio = file_info.compress_size / file_info.file_size
+            if compression_ratio < 0.01:  # Менее 1% от оригинального размера
+                return f"Подозрительный файл в архиве: {file_info.filename} (коэффициент сжатия: {compression_ratio:.2%})"
+        
+        # Проверяем на слишком длинные имена файлов
+        if len(file_info.filename) > 255:
+            return f"Слишком длинное имя файла: {file_info.filename}"
+        
+        # Проверяем на подозрительные пути (zip slip атаки)
+        if '..' in file_info.filename or file_info.filename.startswith('/'):
+            return f"Подозрительный путь в архиве: {file_info.filename}"
+        
+        return None
+    
+    @classmethod
+    def from_source(cls, source: ZipSource) -> "ZipManifest":
+        """
+        Разбирает центральный каталог архива
+        
+        Raises:
+            zipfile.BadZipFile, zipfile.LargeZipFile: если архив поврежден
+        """
+        with zipfile.ZipFile(_open_source(source), 'r') as zip_file:
+            return cls(zip_file, _source_size(source))
+    
+    @property
+    def total_files(self) -> int:
+        return len(self.entries)
+    
+    @property
+    def is_encrypted(self) -> bool:
+        return bool(self.encrypted_files)
+    
+    def validate(self, max_files: int = ZIP_MAX_FILES, max_size: int = ZIP_MAX_SIZE) -> Tuple[bool, str]:
+        """
+        Валидирует архив на предмет безопасности и размера
+        
+        Returns:
+            Tuple[bool, str]: (is_valid, error_message)
+        """
+        if self.archive_size > max_size:
+            return False, f"ZIP файл слишком большой. Максимальный размер: {max_size // (1024*1024)}MB"
+        
+        if self.total_files > max_files:
+            return False, f"ZIP файл содержит слишком много файлов. Максимум: {max_files}"
+        
+        if self.entry_error:
+            return False, self.entry_error
+        
+        if self.encrypted_files:
+            return False, f"ZIP файл содержит зашифрованные файлы: {self.encrypted_files}"
+        
+        return True, ""
+    
+    def info(self) -> Dict[str, any]:
+        """Возвращает общую информацию об архиве"""
+        return {
+            'total_files': self.total_files,
+            'total_size': self.total_size,
+            'total_compressed_size': self.total_compressed_size,
+            'compression_ratio': round((1 - self.total_compressed_size / self.total_size) * 100, 2) if self.total_size > 0 else 0,
+            'is_encrypted': self.is_encrypted,
+            'comment': self.comment
+        }
+
+def open_zip_manifest(file_content: ZipSource, filename: str) -> Optional[ZipManifest]:
+    """
+    Разбирает ZIP архив один раз для всех последующих проверок
     
     Args:
-        file_content: Содержимое файла
+        file_content: Содержимое файла или seekable файловый объект
         filename: Имя файла
         
     Returns:
-        bool: True если файл является ZIP архивом
+        Optional[ZipManifest]: Манифест архива или None если файл не является ZIP архивом
     """
     # Проверяем расширение файла
     if not filename.lower().endswith('.zip'):
-        return False
+        return None
     
     # Проверяем сигнатуру ZIP файла
     try:
-        with zipfile.ZipFile(BytesIO(file_content), 'r') as zip_file:
-            # Пытаемся прочитать список файлов
-            zip_file.namelist()
-            return True
+        return ZipManifest.from_source(file_content)
     except (zipfile.BadZipFile, zipfile.LargeZipFile):
-        return False
+        return None
     except Exception:
-        return False
+        return None
 
-def get_zip_contents(file_content: bytes) -> List[Dict[str, str]]:
+def is_zip_file(file_content: ZipSource, filename: str) -> bool:
+    """
+    Проверяет, является ли файл ZIP архивом
+    
+    Args:
+        file_content: Содержимое файла или seekable файловый объект
+        filename: Имя файла
+        
+    Returns:
+        bool: True если файл является ZIP архивом
+    """
+    return open_zip_manifest(file_content, filename) is not None
+
+def get_zip_contents(file_content: ZipSource) -> List[Dict[str, str]]:
     """
     Получает список файлов в ZIP архиве
     
     Args:
-        file_content: Содержимое ZIP файла
+        file_content: Содержимое ZIP файла или seekable файловый объект
         
     Returns:
         List[Dict]: Список файлов с информацией о каждом
     """
-    contents = []
-    
     try:
-        with zipfile.ZipFile(BytesIO(file_content), 'r') as zip_file:
-            for file_info in zip_file.filelist:
-                # Пропускаем директории
-                if file_info.is_dir():
-                    continue
-                
-                # Получаем информацию о файле
-                file_data = {
-                    'filename': file_info.filename,
-                    'size': file_info.file_size,
-                    'compressed_size': file_info.compress_size,
-                    'compression_ratio': round((1 - file_info.compress_size / file_info.file_size) * 100, 2) if file_info.file_size > 0 else 0,
-                    'modified_time': file_info.date_time,
-                    'is_encrypted': file_info.flag_bits & 0x1 != 0,
-                    'content_type': mimetypes.guess_type(file_info.filename)[0] or 'application/octet-stream'
-                }
-                contents.append(file_data)
-                
+        return ZipManifest.from_source(file_content).entries
     except Exception as e:
         print(f"❌ Ошибка при чтении ZIP архива: {e}")
         return []
-    
-    return contents
 
-def validate_zip_file(file_content: bytes, max_files: int = 1000, max_size: int = 100 * 1024 * 1024) -> Tuple[bool, str]:
+def validate_zip_file(file_content: ZipSource, max_files: int = ZIP_MAX_FILES, max_size: int = ZIP_MAX_SIZE) -> Tuple[bool, str]:
     """
     Валидирует ZIP файл на предмет безопасности и размера
     
     Args:
-        file_content: Содержимое ZIP файла
+        file_content: Содержимое ZIP файла или seekable файловый объект
         max_files: Максимальное количество файлов в архиве
         max_size: Максимальный размер архива в байтах
         
@@ -81,39 +241,11 @@ def validate_zip_file(file_content: bytes, max_files: int = 1000, max_size: int
         Tuple[bool, str]: (is_valid, error_message)
     """
     try:
-        # Проверяем размер файла
-        if len(file_content) > max_size:
+        # Проверяем размер файла до разбора архива
+        if _source_size(file_content) > max_size:
             return False, f"ZIP файл слишком большой. Максимальный размер: {max_size // (1024*1024)}MB"
         
-        with zipfile.ZipFile(BytesIO(file_content), 'r') as zip_file:
-            # Проверяем количество файлов
-            file_count = len([f for f in zip_file.filelist if not f.is_dir()])
-            if file_count > max_files:
-                return False, f"ZIP файл содержит слишком много файлов. Максимум: {max_files}"
-            
-            # Проверяем на zip bombs (файлы с очень высоким коэффициентом сжатия)
-            for file_info in zip_file.filelist:
-                if file_info.is_dir():
-                    continue
-                
-                # Проверяем на подозрительно высокий коэффициент сжатия
-                if file_info.file_size > 0:
-                    compression_ratio = file_info.compress_size / file_info.file_size
-                    if compression_ratio < 0.01:  # Менее 1% от оригинального размера
-                        return False, f"Подозрительный файл в архиве: {file_info.filename} (коэффициент сжатия: {compression_ratio:.2%})"
-                
-                # Проверяем на слишком длинные имена файлов
-                if len(file_info.filename) > 255:
-                    return False, f"Слишком длинное имя файла: {file_info.filename}"
-                
-                # Проверяем на подозрительные пути (zip slip атаки)
-                if '..' in file_info.filename or file_info.filename.startswith('/'):
-                    return False, f"Подозрительный путь в архиве: {file_info.filename}"
-            
-            # Проверяем на зашифрованные файлы
-            encrypted_files = [f for f in zip_file.filelist if f.flag_bits & 0x1 != 0]
-            if encrypted_files:
-                return False, f"ZIP файл содержит зашифрованные файлы: {[f.filename for f in encrypted_files]}"
+        return ZipManifest.from_source(file_content).validate(max_files=max_files, max_size=max_size)
                 
     except zipfile.BadZipFile:
         return False, "Поврежденный ZIP файл"
@@ -121,15 +253,13 @@ def validate_zip_file(file_content: bytes, max_files: int = 1000, max_size: int
         return False, "ZIP файл слишком большой для обработки"
     except Exception as e:
         return False, f"Ошибка валидации ZIP файла: {str(e)}"
-    
-    return True, ""
 
-def extract_zip_file(file_content: bytes, extract_to: str) -> Tuple[bool, List[str]]:
+def extract_zip_file(file_content: ZipSource, extract_to: str) -> Tuple[bool, List[str]]:
     """
     Извлекает ZIP файл в указанную директорию
     
     Args:
-        file_content: Содержимое ZIP файла
+        file_content: Содержимое ZIP файла или seekable файловый объект
         extract_to: Путь для извлечения
         
     Returns:
@@ -140,7 +270,7 @@ def extract_zip_file(file_content: bytes, extract_to: str) -> Tuple[bool, List[s
     try:
         os.makedirs(extract_to, exist_ok=True)
         
-        with zipfile.ZipFile(BytesIO(file_content), 'r') as zip_file:
+        with zipfile.ZipFile(_open_source(file_content), 'r') as zip_file:
             for file_info in zip_file.filelist:
                 if file_info.is_dir():
                     continue
@@ -195,33 +325,95 @@ def create_zip_from_files(file_paths: List[str], zip_name: str) -> Tuple[bool, b
         print(f"❌ Ошибка при создании ZIP файла: {e}")
         return False, b""
 
-def get_zip_file_info(file_content: bytes) -> Dict[str, any]:
+def get_zip_file_info(file_content: ZipSource) -> Dict[str, any]:
     """
     Получает общую информацию о ZIP файле
     
     Args:
-        file_content: Содержимое ZIP файла
+        file_content: Содержимое ZIP файла или seekable файловый объект
         
     Returns:
         Dict: Информация о ZIP файле
     """
     try:
-        with zipfile.ZipFile(BytesIO(file_content), 'r') as zip_file:
-            file_list = zip_file.filelist
-            
-            total_files = len([f for f in file_list if not f.is_dir()])
-            total_size = sum(f.file_size for f in file_list if not f.is_dir())
-            total_compressed_size = sum(f.compress_size for f in file_list if not f.is_dir())
-            
-            return {
-                'total_files': total_files,
-                'total_size': total_size,
-                'total_compressed_size': total_compressed_size,
-                'compression_ratio': round((1 - total_compressed_size / total_size) * 100, 2) if total_size > 0 else 0,
-                'is_encrypted': any(f.flag_bits & 0x1 != 0 for f in file_list),
-                'comment': zip_file.comment.decode('utf-8') if zip_file.comment else None
-            }
+        return ZipManifest.from_source(file_content).info()
             
     except Exception as e:
         print(f"❌ Ошибка при получении информации о ZIP файле: {e}")
         return {}
+
+def get_entry_data_offset(local_header: bytes) -> int:
+    """
+    Вычисляет смещение данных записи относительно начала ее локального заголовка
+    
+    Длина дополнительного поля в локальном заголовке может отличаться от
+    центрального каталога, поэтому ее нужно читать из самого заголовка.
+    
+    Args:
+        local_header: Первые LOCAL_HEADER_SIZE байт локального заголовка
+        
+    Returns:
+        int: Смещение начала сжатых данных
+    """
+    if len(local_header) < LOCAL_HEADER_SIZE:
+        raise zipfile.BadZipFile("Неполный локальный заголовок записи")
+    
+    fields = _LOCAL_HEADER_STRUCT.unpack(local_header[:LOCAL_HEADER_SIZE])
+    if fields[0] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile("Некорректная сигнатура локального заголовка записи")
+    
+    name_length, extra_length = fields[9], fields[10]
+    return LOCAL_HEADER_SIZE + name_length + extra_length
+
+def _inflate(chunks: Iterator[bytes], compress_type: int) -> Iterator[bytes]:
+    """Распаковывает поток сжатых данных записи"""
+    if compress_type == zipfile.ZIP_STORED:
+        yield from chunks
+        return
+    
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+def iter_entry_data(chunks: Iterator[bytes], compress_type: int, crc: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Распаковывает данные записи ZIP потоком
+    
+    Args:
+        chunks: Поток сжатых данных записи
+        compress_type: Метод сжатия записи
+        crc: CRC-32 распакованных данных из центрального каталога (None - не проверять)
+        
+    Returns:
+        Iterator[bytes]: Поток распакованных данных
+        
+    Raises:
+        ValueError: если метод сжатия не поддерживается
+        zipfile.BadZipFile: если CRC-32 данных не совпал (до отдачи последнего блока)
+    """
+    if compress_type not in STREAMABLE_COMPRESS_TYPES:
+        raise ValueError(f"Метод сжатия {compress_type} не поддерживается")
+    if crc is None:
+        yield from _inflate(chunks, compress_type)
+        return
+    
+    # Последний блок придерживается до проверки CRC-32, поэтому поврежденная
+    # запись никогда не отдается целиком
+    actual_crc = 0
+    pending = None
+    for data in _inflate(chunks, compress_type):
+        if not data:
+            continue
+        actual_crc = zlib.crc32(data, actual_crc)
+        if pending is not None:
+            yield pending
+        pending = data
+    if actual_crc != crc:
+        raise zipfile.BadZipFile(f"Неверная контрольная сумма записи: {actual_crc:08x} вместо {crc:08x}")
+    if pending is not None:
+        yield pending
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Регрессионный бенчмарк: задержка /health во время загрузки больших файлов
+
+Измеряет p50/p99 задержки /health без нагрузки и во время параллельных
+загрузок через /upload. Если блокирующие операции с MinIO снова попадут
+в event loop, p99 под нагрузкой вырастет до времени загрузки файла.
+
+Пример:
+    python benchmark_upload_latency.py --url http://localhost:8000 \\
+        --username bench --password benchpass --uploads 4 --size-mb 200
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+
+CHUNK_SIZE = 1024 * 1024
+
+def request_json(url: str, payload: dict, headers: dict = None) -> dict:
+    """Отправляет POST с JSON телом и возвращает JSON ответа"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json", **(headers or {})},
+        method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def get_token(base_url: str, username: str, password: str) -> str:
+    """Регистрирует пользователя (если нужно) и получает JWT токен"""
+    try:
+        request_json(f"{base_url}/auth/register", {"username": username, "password": password})
+    except urllib.error.HTTPError:
+        pass  # Пользователь уже существует
+    return request_json(f"{base_url}/auth/login", {"username": username, "password": password})["access_token"]
+
+def upload_large_file(base_url: str, token: str, size_mb: int, errors: list):
+    """Загружает файл заданного размера через /upload, не держа его в памяти"""
+    boundary = uuid.uuid4().hex
+    filename = f"bench-{uuid.uuid4().hex}.bin"
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    chunk = os.urandom(CHUNK_SIZE)
+    
+    def body():
+        yield head
+        for _ in range(size_mb):
+            yield chunk
+        yield tail
+        
+    request = urllib.request.Request(
+        f"{base_url}/upload",
+        data=body(),
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + size_mb * CHUNK_SIZE + len(tail)),
+        },
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+    except Exception as e:
+        errors.append(e)
+
+def measure_health(base_url: str, samples: int, interval: float, statuses: Counter = None) -> list:
+    """
+    Измеряет задержку /health в миллисекундах
+    
+    /health отвечает 503, пока экземпляр не готов - такой ответ тоже замер задержки,
+    его код ответа считается в statuses.
+    """
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{base_url}/health") as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        latencies.append((time.perf_counter() - started) * 1000)
+        if statuses is not None:
+            statuses[status] += 1
+        time.sleep(interval)
+    return latencies
+
+def percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Задержка /health во время больших загрузок")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--uploads", type=int, default=4, help="Количество параллельных загрузок")
+    parser.add_argument("--size-mb", type=int, default=200, help="Размер каждого файла в MB")
+    parser.add_argument("--samples", type=int, default=200, help="Количество замеров /health")
+    parser.add_argument("--interval", type=float, default=0.02, help="Пауза между замерами в секундах")
+    parser.add_argument("--max-p99-ms", type=float, default=100.0, help="Допустимый p99 под нагрузкой")
+    args = parser.parse_args()
+    
+    base_url = args.url.rstrip("/")
+    token = get_token(base_url, args.username, args.password)
+    
+    statuses = Counter()
+    print("🔄 Замер /health без нагрузки...")
+    baseline = measure_health(base_url, args.samples, args.interval, statuses)
+    
+    print(f"🔄 Замер /health во время {args.uploads} загрузок по {args.size_mb}MB...")
+    errors = []
+    uploads = [
+        threading.Thread(target=upload_large_file, args=(base_url, token, args.size_mb, errors))
+        for _ in range(args.uploads)
+    ]
+    for thread in uploads:
+        thread.start()
+    time.sleep(0.5)  # Даем загрузкам начаться
+    under_load = measure_health(base_url, args.samples, args.interval, statuses)
+    for thread in uploads:
+        thread.join()
+        
+    print(f"📊 Без нагрузки:  p50={percentile(baseline, 50):.1f}ms p99={percentile(baseline, 99):.1f}ms")
+    print(f"📊 Под нагрузкой: p50={percentile(under_load, 50):.1f}ms p99={percentile(under_load, 99):.1f}ms")
+    print(f"📊 Коды ответа /health: {dict(sorted(statuses.items()))}")
+    if statuses[200] < sum(statuses.values()):
+        print("⚠️  Часть ответов /health - не 200: экземпляр не был готов во время замера")
+    
+    if errors:
+        print(f"❌ Ошибки загрузки: {errors}")
+        return 1
+        
+    if percentile(under_load, 99) > args.max_p99_ms:
+        print(f"💥 p99 под нагрузкой превышает {args.max_p99_ms}ms")
+        return 1
+        
+    print("🎉 Задержка /health не зависит от загрузок")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
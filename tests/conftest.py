@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Движок БД создается при импорте app.database, поэтому URL задается до импорта приложения.
+# По умолчанию тесты работают с временной SQLite базой, а не с DATABASE_URL окружения.
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import minio_utils, models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from fake_minio import FakeMinio  # noqa: E402
+
+@pytest.fixture
+def db():
+    """Сессия БД с чистой схемой"""
+    models.Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def fake_minio(monkeypatch):
+    """Подменяет общий клиент MinIO клиентом в памяти"""
+    client = FakeMinio()
+    monkeypatch.setattr(minio_utils, "_client", client)
+    minio_utils._presigned_urls.clear()
+    return client
+
+@pytest.fixture
+def user(db):
+    """Пользователь - владелец заданий"""
+    db_user = models.User(username="tester", hashed_password="x")
+    db.add(db_user)
+    db.commit()
+    return db_user
+
+@pytest.fixture
+def client(db, fake_minio):
+    """HTTP клиент приложения (без lifespan: фоновые задачи в тестах не нужны)"""
+    from fastapi.testclient import TestClient
+    from app import main
+    return TestClient(main.app)
+
+@pytest.fixture
+def auth_headers(user):
+    """Заголовок авторизации пользователя user"""
+    from app import auth, user_cache
+    # id пользователя меняется между тестами - кэш не должен вернуть прежнего
+    user_cache.invalidate_user(user.username)
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': user.username})}"}
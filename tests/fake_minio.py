@@ -0,0 +1,118 @@
+"""Клиент MinIO в памяти для тестов: реализует только вызовы, которые использует приложение"""
+import io
+import uuid
+import hashlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from minio.datatypes import Part
+from minio.error import S3Error
+
+_LAST_MODIFIED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def _s3_error(code: str, object_name: str = "") -> S3Error:
+    return S3Error(None, code, code, object_name, "request-id", "host-id")
+
+class FakeResponse:
+    """Ответ get_object с интерфейсом urllib3"""
+    
+    def __init__(self, data: bytes, headers: dict):
+        self._body = io.BytesIO(data)
+        self.headers = headers
+        
+    def read(self, amt=None) -> bytes:
+        return self._body.read(amt)
+    
+    def stream(self, amt=65536):
+        while True:
+            chunk = self._body.read(amt)
+            if not chunk:
+                return
+            yield chunk
+            
+    def close(self):
+        pass
+    
+    def release_conn(self):
+        pass
+
+class FakeMinio:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+        
+    def _require(self, object_name: str) -> bytes:
+        if object_name not in self.objects:
+            raise _s3_error("NoSuchKey", object_name)
+        return self.objects[object_name]
+    
+    def bucket_exists(self, bucket_name):
+        return True
+    
+    def make_bucket(self, bucket_name):
+        pass
+    
+    def stat_object(self, bucket_name, object_name):
+        self.calls.append(("stat", object_name))
+        data = self._require(object_name)
+        return SimpleNamespace(
+            size=len(data),
+            etag=hashlib.md5(data).hexdigest(),
+            last_modified=_LAST_MODIFIED,
+            content_type="application/octet-stream",
+        )
+    
+    def get_object(self, bucket_name, object_name, offset=0, length=0, **kwargs):
+        self.calls.append(("get", object_name, offset, length))
+        data = self._require(object_name)
+        body = data[offset:offset + length] if length else data[offset:]
+        return FakeResponse(body, {"Content-Length": str(len(body)), "ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+    
+    def put_object(self, bucket_name, object_name, data, length, content_type=None, part_size=0, **kwargs):
+        self.calls.append(("put", object_name))
+        chunks = []
+        while True:
+            chunk = data.read(part_size or 1024 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.objects[object_name] = b"".join(chunks)
+        
+    def remove_object(self, bucket_name, object_name):
+        self.calls.append(("remove", object_name))
+        self.objects.pop(object_name, None)
+        
+    def remove_objects(self, bucket_name, delete_objects):
+        for delete_object in delete_objects:
+            self.calls.append(("remove", delete_object.name))
+            self.objects.pop(delete_object.name, None)
+        return iter([])
+    
+    def _create_multipart_upload(self, bucket_name, object_name, headers):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"object_name": object_name, "parts": {}}
+        return upload_id
+    
+    def _upload(self, upload_id: str) -> dict:
+        if upload_id not in self.uploads:
+            raise _s3_error("NoSuchUpload")
+        return self.uploads[upload_id]
+    
+    def _upload_part(self, bucket_name, object_name, data, headers, upload_id, part_number):
+        self._upload(upload_id)["parts"][part_number] = bytes(data)
+        return f"etag-{part_number}"
+    
+    def _list_parts(self, bucket_name, object_name, upload_id, part_number_marker=None):
+        parts = self._upload(upload_id)["parts"]
+        return SimpleNamespace(
+            parts=[Part(number, f"etag-{number}", size=len(data)) for number, data in sorted(parts.items())],
+            is_truncated=False,
+        )
+    
+    def _complete_multipart_upload(self, bucket_name, object_name, upload_id, parts):
+        uploaded = self._upload(upload_id)["parts"]
+        self.objects[object_name] = b"".join(uploaded[part.part_number] for part in parts)
+        del self.uploads[upload_id]
+        
+    def _abort_multipart_upload(self, bucket_name, object_name, upload_id):
+        self.uploads.pop(upload_id, None)
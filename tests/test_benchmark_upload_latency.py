@@ -0,0 +1,23 @@
+import io
+import urllib.error
+from collections import Counter
+import benchmark_upload_latency
+
+def test_measure_health_records_unready_status(monkeypatch):
+    responses = iter([503, 200])
+    
+    def urlopen(url):
+        assert url == "http://api/health"
+        status = next(responses)
+        if status != 200:
+            raise urllib.error.HTTPError(url, status, "Service Unavailable", {}, io.BytesIO(b"{}"))
+        response = io.BytesIO(b"{}")
+        response.status = status
+        return response
+        
+    monkeypatch.setattr(benchmark_upload_latency.urllib.request, "urlopen", urlopen)
+    statuses = Counter()
+    
+    latencies = benchmark_upload_latency.measure_health("http://api", 2, 0, statuses)
+    assert len(latencies) == 2
+    assert statuses == {503: 1, 200: 1}
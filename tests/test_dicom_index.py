@@ -0,0 +1,77 @@
+import io
+import zipfile
+import pytest
+from app import dicom_index, job_crud, schemas, zip_utils
+
+pydicom = pytest.importorskip("pydicom")
+
+def make_dicom(series_uid: str, instance_number: int, preamble: bool = True) -> bytes:
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+    
+    dataset = Dataset()
+    dataset.SOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+    dataset.SOPInstanceUID = generate_uid()
+    dataset.StudyInstanceUID = "1.2.3"
+    dataset.SeriesInstanceUID = series_uid
+    dataset.Modality = "CT"
+    dataset.InstanceNumber = instance_number
+    dataset.ImagePositionPatient = [0, 0, instance_number]
+    dataset.Rows = 2
+    dataset.Columns = 2
+    dataset.BitsAllocated = 16
+    dataset.PixelData = b"\0" * 8
+    buffer = io.BytesIO()
+    if preamble:
+        dataset.file_meta = FileMetaDataset()
+        dataset.file_meta.MediaStorageSOPClassUID = dataset.SOPClassUID
+        dataset.file_meta.MediaStorageSOPInstanceUID = dataset.SOPInstanceUID
+        dataset.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        dataset.save_as(buffer, enforce_file_format=True)
+    else:
+        dataset.save_as(buffer, implicit_vr=True, little_endian=True)
+    return buffer.getvalue()
+
+def create_dicom_job(db, fake_minio, owner_id, files: dict):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(name, data)
+    data = buffer.getvalue()
+    fake_minio.objects["jobs/study.zip"] = data
+    manifest = zip_utils.ZipManifest.from_source(data)
+    file_info = {
+        "file_name": "study.zip",
+        "file_size": len(data),
+        "file_content_type": "application/zip",
+        "file_path": "jobs/study.zip",
+        "file_type": "zip",
+    }
+    return job_crud.create_job(db, schemas.JobCreate(title="study"), owner_id, file_info=file_info, zip_contents=manifest.entries)
+
+def test_has_dicom_signature():
+    assert dicom_index._has_dicom_signature(make_dicom("1.2.3.4", 1))
+    assert dicom_index._has_dicom_signature(make_dicom("1.2.3.4", 1, preamble=False))
+    assert not dicom_index._has_dicom_signature(b"%PDF-1.7" + b"\0" * 200)
+
+def test_index_job_finds_dicom_without_dicom_extension(db, fake_minio, user, monkeypatch):
+    monkeypatch.setattr(dicom_index, "DICOM_INDEX_WORKERS", 0)
+    job = create_dicom_job(db, fake_minio, user.id, {
+        "study/1.2.3.4.1": make_dicom("1.2.3.4", 1),
+        "study/1.2.3.4.2": make_dicom("1.2.3.4", 2, preamble=False),
+        "study/IM0001.dcm": make_dicom("1.2.3.5", 1),
+        "study/readme": b"not a dicom file " * 20,
+        "study/report.pdf": make_dicom("1.2.3.6", 1),
+        "study/tiny": b"\x08\x00",
+    })
+    
+    candidates = job_crud.get_dicom_candidates(db, job.id, dicom_index.DICOM_MIN_FILE_SIZE, dicom_index.DICOM_SKIP_EXTENSIONS)
+    assert sorted(job_file.path for job_file in candidates) == [
+        "study/1.2.3.4.1", "study/1.2.3.4.2", "study/IM0001.dcm", "study/readme"
+    ]
+    
+    assert dicom_index.index_job(job) == 3
+    instances = job_crud.get_dicom_instances(db, job.id, "1.2.3.4")
+    assert [(instance.path, instance.instance_number) for instance in instances] == [
+        ("study/1.2.3.4.1", 1), ("study/1.2.3.4.2", 2)
+    ]
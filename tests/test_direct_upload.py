@@ -0,0 +1,103 @@
+import io
+import os
+import zipfile
+from datetime import timedelta
+import pytest
+from app import job_crud, minio_utils, models, schemas, upload_sessions, zip_utils
+
+MEGABYTE = 1024 * 1024
+
+@pytest.mark.parametrize("file_size, max_parts, expected", [
+    (1, 1000, minio_utils.MINIO_PART_SIZE),
+    (100 * 1024 * MEGABYTE, 1000, 103 * MEGABYTE),
+    (5 * 1024 ** 4, 10, minio_utils.MULTIPART_MAX_PART_SIZE),
+])
+def test_multipart_part_size(file_size, max_parts, expected):
+    assert minio_utils.multipart_part_size(file_size, max_parts) == expected
+
+def test_single_put_upload_finalize(client, db, fake_minio, user, auth_headers):
+    data = os.urandom(1000)
+    response = client.post("/jobs/upload", headers=auth_headers, json={"file_name": "scan.bin", "file_size": len(data)})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["url"] and body["job"]["status"] == "uploading"
+    job_id = body["job"]["id"]
+    
+    # Файл еще не загружен - finalize можно повторить позже
+    assert client.post(f"/jobs/{job_id}/upload/finalize", headers=auth_headers).status_code == 409
+    
+    fake_minio.objects[body["object_name"]] = data
+    response = client.post(f"/jobs/{job_id}/upload/finalize", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert client.post(f"/jobs/{job_id}/upload/finalize", headers=auth_headers).status_code == 409
+
+def test_multipart_upload_finalize(client, db, fake_minio, user, auth_headers, monkeypatch):
+    monkeypatch.setattr(minio_utils, "MINIO_PRESIGNED_SINGLE_MAX", MEGABYTE)
+    data = os.urandom(6 * MEGABYTE)
+    body = client.post("/jobs/upload", headers=auth_headers, json={"file_name": "scan.bin", "file_size": len(data)}).json()
+    assert [part["part_number"] for part in body["parts"]] == [1]
+    
+    fake_minio._upload_part(None, body["object_name"], data, None, body["upload_id"], 1)
+    # upload_id сохранен в задании - передавать его в finalize необязательно
+    response = client.post(f"/jobs/{body['job']['id']}/upload/finalize", headers=auth_headers)
+    assert response.status_code == 200
+    assert fake_minio.objects[body["object_name"]] == data
+    assert job_crud.get_job(db, body["job"]["id"]).upload_id is None
+
+def test_finalize_accepts_archive_over_api_limits(client, db, fake_minio, user, auth_headers):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zip_file:
+        for index in range(zip_utils.ZIP_MAX_FILES + 500):
+            zip_file.writestr(f"series/{index}.dcm", os.urandom(64))
+    data = buffer.getvalue()
+    body = client.post("/jobs/upload", headers=auth_headers, json={"file_name": "study.zip", "file_size": len(data)}).json()
+    fake_minio.objects[body["object_name"]] = data
+    
+    response = client.post(f"/jobs/{body['job']['id']}/upload/finalize", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["file_type"] == "zip"
+    assert job_crud.count_job_files(db, body["job"]["id"]) == zip_utils.ZIP_MAX_FILES + 500
+
+def test_finalize_rejects_size_mismatch(client, db, fake_minio, user, auth_headers):
+    body = client.post("/jobs/upload", headers=auth_headers, json={"file_name": "scan.bin", "file_size": 10}).json()
+    fake_minio.objects[body["object_name"]] = b"abc"
+    
+    assert client.post(f"/jobs/{body['job']['id']}/upload/finalize", headers=auth_headers).status_code == 400
+    assert body["object_name"] not in fake_minio.objects
+    assert job_crud.get_job(db, body["job"]["id"]).status == "failed"
+
+def create_uploading_job(db, owner_id, object_name, age_seconds):
+    file_info = {"file_name": object_name, "file_size": 3, "file_content_type": "application/octet-stream", "file_path": object_name}
+    job = job_crud.create_job(db, schemas.JobCreate(title=object_name), owner_id, file_info=file_info, status=job_crud.UPLOADING_STATUS)
+    job.created_at = job_crud._utcnow() - timedelta(seconds=age_seconds)
+    db.commit()
+    return job
+
+def test_reap_expired_direct_uploads(client, db, fake_minio, user, auth_headers, monkeypatch):
+    stale_age = job_crud.DIRECT_UPLOAD_TTL_SECONDS + 60
+    stale = create_uploading_job(db, user.id, "stale.bin", stale_age)
+    fresh = create_uploading_job(db, user.id, "fresh.bin", 60)
+    # Брошенная multipart загрузка по presigned URL с одной загруженной частью
+    monkeypatch.setattr(minio_utils, "MINIO_PRESIGNED_SINGLE_MAX", MEGABYTE)
+    body = client.post("/jobs/upload", headers=auth_headers, json={"file_name": "big.bin", "file_size": 6 * MEGABYTE}).json()
+    fake_minio._upload_part(None, body["object_name"], b"part", None, body["upload_id"], 1)
+    multipart = job_crud.get_job(db, body["job"]["id"])
+    assert multipart.upload_id == body["upload_id"]
+    multipart.created_at = job_crud._utcnow() - timedelta(seconds=stale_age)
+    # Задание возобновляемой загрузки истекает вместе со своей сессией
+    with_session = create_uploading_job(db, user.id, "session.bin", stale_age)
+    db.add(models.UploadSession(
+        job_id=with_session.id, owner_id=user.id, object_name="session.bin", upload_id="u", file_size=3,
+        part_size=3, part_count=1, expires_at=job_crud._utcnow() + timedelta(hours=1)
+    ))
+    db.commit()
+    fake_minio.objects["stale.bin"] = b"abc"
+    
+    assert upload_sessions.reap_expired_direct_uploads() == 2
+    db.expire_all()
+    assert [job_crud.get_job(db, job.id).status for job in (stale, multipart, fresh, with_session)] == [
+        "failed", "failed", "uploading", "uploading"
+    ]
+    assert "stale.bin" not in fake_minio.objects
+    assert body["upload_id"] not in fake_minio.uploads
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+import pytest
+from app import http_utils
+
+LAST_MODIFIED = datetime(2024, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=900-", [(900, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("bytes=990-5000", [(990, 999)]),
+    ("bytes=0-0, 10-19", [(0, 0), (10, 19)]),
+    ("bytes=5000-6000, 0-1", [(0, 1)]),
+])
+def test_parse_range_header(header, expected):
+    assert http_utils.parse_range_header(header, 1000) == expected
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=",
+    "bytes=10-5",
+    "bytes=a-b",
+    "bytes=5",
+    "bytes=" + ",".join(["0-1"] * (http_utils.MAX_RANGES + 1)),
+])
+def test_invalid_range_means_whole_file(header):
+    assert http_utils.parse_range_header(header, 1000) is None
+
+def test_unsatisfiable_range():
+    with pytest.raises(http_utils.RangeNotSatisfiable):
+        http_utils.parse_range_header("bytes=1000-", 1000)
+    with pytest.raises(http_utils.RangeNotSatisfiable):
+        http_utils.parse_range_header("bytes=-0", 1000)
+
+def test_if_range():
+    assert http_utils.if_range_matches(None, "abc", LAST_MODIFIED)
+    assert http_utils.if_range_matches('"abc"', "abc", LAST_MODIFIED)
+    assert not http_utils.if_range_matches('"old"', "abc", LAST_MODIFIED)
+    assert http_utils.if_range_matches("Mon, 01 Jan 2024 12:00:00 GMT", "abc", LAST_MODIFIED)
+    assert not http_utils.if_range_matches("Mon, 01 Jan 2024 11:00:00 GMT", "abc", LAST_MODIFIED)
+    assert not http_utils.if_range_matches("garbage", "abc", LAST_MODIFIED)
+
+def test_is_not_modified():
+    assert http_utils.is_not_modified('W/"abc", "def"', None, "abc", LAST_MODIFIED)
+    assert http_utils.is_not_modified("*", None, "abc", LAST_MODIFIED)
+    assert not http_utils.is_not_modified('"old"', "Mon, 01 Jan 2024 12:00:00 GMT", "abc", LAST_MODIFIED)
+    assert http_utils.is_not_modified(None, "Mon, 01 Jan 2024 12:00:00 GMT", "abc", LAST_MODIFIED)
+    assert not http_utils.is_not_modified(None, "Mon, 01 Jan 2024 11:59:59 GMT", "abc", LAST_MODIFIED)
+    assert not http_utils.is_not_modified(None, None, "abc", LAST_MODIFIED)
+
+def test_multipart_byteranges_length_matches_body():
+    data = bytes(range(256)) * 4
+    ranges = [(0, 9), (100, 199), (1000, 1023)]
+    boundary = http_utils.new_multipart_boundary()
+    body = b"".join(http_utils.iter_multipart_byteranges(
+        ranges, lambda offset, length: iter([data[offset:offset + length]]), boundary, "application/zip", len(data)
+    ))
+    assert len(body) == http_utils.multipart_byteranges_length(ranges, boundary, "application/zip", len(data))
+    assert b"Content-Range: bytes 100-199/1024" in body
+    assert body.endswith(f"--{boundary}--\r\n".encode())
+
+def test_format_http_date():
+    assert http_utils.format_http_date(datetime(2024, 1, 1, 12, 0, 0)) == "Mon, 01 Jan 2024 12:00:00 GMT"
+    assert http_utils.quote_etag("abc") == '"abc"'
+    assert http_utils.quote_etag('W/"abc"') == 'W/"abc"'
+
+def test_content_disposition_non_ascii():
+    header = http_utils.content_disposition('Снимок "1".dcm')
+    header.encode("latin-1")
+    assert header == "attachment; filename=\"______ _1_.dcm\"; filename*=UTF-8''%D0%A1%D0%BD%D0%B8%D0%BC%D0%BE%D0%BA%20%221%22.dcm"
+    assert http_utils.content_disposition("a.zip") == "attachment; filename=\"a.zip\"; filename*=UTF-8''a.zip"
@@ -0,0 +1,67 @@
+import pytest
+from app import job_crud, models, schemas
+
+def create_object_job(db, owner_id, object_name):
+    file_info = {
+        "file_name": object_name,
+        "file_size": 3,
+        "file_content_type": "application/octet-stream",
+        "file_path": object_name,
+    }
+    return job_crud.create_job(db, schemas.JobCreate(title=object_name), owner_id, file_info=file_info)
+
+def test_manifest_rejects_referenced_and_duplicate_objects(client, db, fake_minio, user, auth_headers):
+    user.is_superuser = True
+    db.commit()
+    fake_minio.objects["incoming/a.bin"] = b"abc"
+    fake_minio.objects["incoming/b.bin"] = b"def"
+    create_object_job(db, user.id, "incoming/a.bin")
+    
+    response = client.post("/jobs/batch/manifest", headers=auth_headers, json={"items": [
+        {"object_name": "incoming/a.bin"},
+        {"object_name": "incoming/b.bin"},
+        {"object_name": "incoming/b.bin"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [job["file_name"] for job in body["created"]] == ["b.bin"]
+    assert [(error["index"], error["status_code"]) for error in body["errors"]] == [(0, 409), (2, 409)]
+
+def test_delete_keeps_object_referenced_by_other_job(client, db, fake_minio, user, auth_headers):
+    fake_minio.objects["shared.bin"] = b"abc"
+    first = create_object_job(db, user.id, "shared.bin")
+    second = create_object_job(db, user.id, "shared.bin")
+    
+    assert client.delete(f"/jobs/{first.id}", headers=auth_headers).status_code == 200
+    assert "shared.bin" in fake_minio.objects
+    
+    response = client.post("/jobs/batch/delete", headers=auth_headers, json={"job_ids": [second.id]})
+    assert response.json()["deleted"] == [second.id]
+    assert "shared.bin" not in fake_minio.objects
+
+def test_unreferenced_file_paths(db, user):
+    create_object_job(db, user.id, "kept.bin")
+    
+    assert job_crud.get_unreferenced_file_paths(db, ["kept.bin", "gone.bin", None, "gone.bin"]) == ["gone.bin"]
+    assert db.query(models.Job).count() == 1
+
+def test_status_update_skips_uploading_jobs(client, db, user, auth_headers):
+    ready = create_object_job(db, user.id, "ready.bin")
+    uploading = job_crud.create_job(db, schemas.JobCreate(title="upload"), user.id, status=job_crud.UPLOADING_STATUS)
+    
+    response = client.patch("/jobs/batch/status", headers=auth_headers, json={
+        "job_ids": [ready.id, uploading.id], "status": "pending"
+    })
+    assert response.json() == {"updated": [ready.id], "not_found": [uploading.id]}
+    assert client.put(f"/jobs/{uploading.id}", headers=auth_headers, json={"status": "failed"}).status_code == 409
+    # Название задания, которое загружается, менять можно
+    assert client.put(f"/jobs/{uploading.id}", headers=auth_headers, json={"title": "renamed"}).status_code == 200
+    db.expire_all()
+    assert job_crud.get_job(db, uploading.id).status == job_crud.UPLOADING_STATUS
+
+@pytest.mark.parametrize("status", ["processing", "uploading"])
+def test_status_update_rejects_internal_statuses(client, db, user, auth_headers, status):
+    job = create_object_job(db, user.id, "ready.bin")
+    
+    assert client.patch("/jobs/batch/status", headers=auth_headers, json={"job_ids": [job.id], "status": status}).status_code == 422
+    assert client.put(f"/jobs/{job.id}", headers=auth_headers, json={"status": status}).status_code == 422
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app import job_crud, models, schemas
+
+def create_jobs(db, owner_id, created_at_list):
+    jobs = []
+    for index, created_at in enumerate(created_at_list):
+        job = job_crud.create_job(db, schemas.JobCreate(title=f"job {index}"), owner_id)
+        db.query(models.Job).filter(models.Job.id == job.id).update({"created_at": created_at})
+        jobs.append(job.id)
+    db.commit()
+    return jobs
+
+def test_cursor_round_trip():
+    job = models.Job(id=42, created_at=datetime(2024, 5, 1, 12, 30, 15, 123456))
+    assert job_crud.decode_job_cursor(job_crud.encode_job_cursor(job)) == (job.created_at, 42)
+
+def test_invalid_cursor_is_rejected():
+    assert job_crud.decode_job_cursor("not-a-cursor") is None
+    assert job_crud.decode_job_cursor("") is None
+
+def test_keyset_pages_cover_all_jobs_once(db, user):
+    same_time = datetime(2024, 1, 1, 10, 0, 0)
+    ids = create_jobs(db, user.id, [datetime(2024, 1, 1, 9, 0, 0), same_time, same_time, same_time, datetime(2024, 1, 2)])
+    
+    seen = []
+    after = None
+    while True:
+        jobs, cursor = job_crud.get_jobs_page_by_owner(db, user.id, limit=2, after=after)
+        seen.extend(job.id for job in jobs)
+        if cursor is None:
+            break
+        after = job_crud.decode_job_cursor(cursor)
+        
+    # От новых к старым, при равном created_at - по убыванию id
+    assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+def test_last_page_has_no_cursor(db, user):
+    create_jobs(db, user.id, [datetime(2024, 1, 1), datetime(2024, 1, 2)])
+    jobs, cursor = job_crud.get_jobs_page_by_owner(db, user.id, limit=2)
+    assert len(jobs) == 2
+    assert cursor is None
+
+def test_pages_only_owner_jobs(db, user):
+    other = models.User(username="other", hashed_password="x")
+    db.add(other)
+    db.commit()
+    create_jobs(db, other.id, [datetime(2024, 1, 1)])
+    own = create_jobs(db, user.id, [datetime(2024, 1, 1)])
+    jobs, _ = job_crud.get_jobs_page_by_owner(db, user.id)
+    assert [job.id for job in jobs] == own
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from app import job_crud, models, schemas
+
+def create_pending_job(db, owner_id, title="job"):
+    file_info = {
+        "file_name": "scan.bin",
+        "file_size": 3,
+        "file_content_type": "application/octet-stream",
+        "file_path": f"jobs/{title}.bin",
+    }
+    return job_crud.create_job(db, schemas.JobCreate(title=title), owner_id, file_info=file_info)
+
+def expire_lease(db, job_id):
+    db.query(models.Job).filter(models.Job.id == job_id).update({
+        "lease_expires_at": job_crud._utcnow() - timedelta(seconds=1)
+    })
+    db.commit()
+
+def get_job(db, job_id):
+    db.expire_all()
+    return job_crud.get_job(db, job_id)
+
+def test_claim_takes_pending_jobs_in_order(db, user):
+    first = create_pending_job(db, user.id, "first")
+    second = create_pending_job(db, user.id, "second")
+    job_crud.create_job(db, schemas.JobCreate(title="without file"), user.id)
+    
+    claimed = job_crud.claim_jobs(db, "worker-1", limit=5)
+    assert [job.id for job in claimed] == [first.id, second.id]
+    assert all(job.status == "processing" and job.worker_id == "worker-1" and job.attempts == 1 for job in claimed)
+    assert job_crud.claim_jobs(db, "worker-2", limit=5) == []
+
+def test_expired_lease_is_requeued_then_failed(db, user, monkeypatch):
+    monkeypatch.setattr(job_crud, "JOB_MAX_ATTEMPTS", 2)
+    job = create_pending_job(db, user.id)
+    
+    job_crud.claim_jobs(db, "worker-1")
+    expire_lease(db, job.id)
+    # Воркер без аренды не может продлить или завершить задание
+    assert [claimed.id for claimed in job_crud.claim_jobs(db, "worker-2")] == [job.id]
+    assert not job_crud.heartbeat_job(db, job.id, "worker-1")
+    assert job_crud.complete_job(db, job.id, "worker-1") is None
+    
+    expire_lease(db, job.id)
+    assert job_crud.requeue_expired_jobs(db) == 1
+    db.commit()
+    requeued = get_job(db, job.id)
+    assert requeued.status == "failed"
+    assert requeued.worker_id is None
+    assert requeued.last_error == "Истек срок аренды задания воркером"
+
+def test_requeue_is_bounded(db, user):
+    jobs = [create_pending_job(db, user.id, f"job{index}") for index in range(3)]
+    job_crud.claim_jobs(db, "worker-1", limit=3)
+    for job in jobs:
+        expire_lease(db, job.id)
+    
+    assert job_crud.requeue_expired_jobs(db, limit=2) == 2
+    assert job_crud.requeue_expired_jobs(db, limit=2) == 1
+    db.commit()
+    assert {get_job(db, job.id).status for job in jobs} == {"pending"}
+
+def test_fail_job_retries_until_attempts_exhausted(db, user, monkeypatch):
+    monkeypatch.setattr(job_crud, "JOB_MAX_ATTEMPTS", 2)
+    job = create_pending_job(db, user.id)
+    
+    job_crud.claim_jobs(db, "worker-1")
+    assert job_crud.fail_job(db, job.id, "worker-1", "boom").status == "pending"
+    job_crud.claim_jobs(db, "worker-1")
+    failed = job_crud.fail_job(db, job.id, "worker-1", "boom")
+    assert failed.status == "failed"
+    assert failed.last_error == "boom"
+
+def test_complete_job(db, user):
+    job = create_pending_job(db, user.id)
+    job_crud.claim_jobs(db, "worker-1")
+    assert job_crud.heartbeat_job(db, job.id, "worker-1")
+    completed = job_crud.complete_job(db, job.id, "worker-1")
+    assert completed.status == "completed"
+    assert completed.worker_id is None
@@ -0,0 +1,87 @@
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+import pytest
+from app import job_crud, minio_utils, upload_sessions, zip_utils
+
+MEGABYTE = 1024 * 1024
+
+def test_choose_part_size_defaults_and_minimum():
+    assert upload_sessions.choose_part_size(10 * MEGABYTE) == min(minio_utils.MINIO_PART_SIZE, upload_sessions.UPLOAD_MAX_PART_SIZE)
+    assert upload_sessions.choose_part_size(10 * MEGABYTE, 8 * MEGABYTE) == 8 * MEGABYTE
+    # Частей не больше лимита S3
+    file_size = 300 * 1024 * MEGABYTE
+    assert upload_sessions.choose_part_size(file_size, 5 * MEGABYTE) == -(-file_size // minio_utils.MULTIPART_MAX_PARTS)
+
+def test_choose_part_size_rejects_large_parts():
+    with pytest.raises(ValueError):
+        upload_sessions.choose_part_size(10 * MEGABYTE, upload_sessions.UPLOAD_MAX_PART_SIZE + 1)
+    with pytest.raises(ValueError):
+        upload_sessions.choose_part_size(upload_sessions.UPLOAD_MAX_PART_SIZE * minio_utils.MULTIPART_MAX_PARTS + 1)
+
+@pytest.mark.parametrize("part_number, expected", [(1, 5), (2, 5), (3, 2)])
+def test_expected_part_size(part_number, expected):
+    db_session = SimpleNamespace(file_size=12, part_size=5, part_count=3)
+    assert upload_sessions.expected_part_size(db_session, part_number) == expected
+
+def test_create_session_rejects_part_size_above_limit(client, db, fake_minio, user, auth_headers):
+    response = client.post("/uploads", headers=auth_headers, json={
+        "file_name": "scan.bin", "file_size": 10 * MEGABYTE, "part_size": upload_sessions.UPLOAD_MAX_PART_SIZE + 1
+    })
+    assert response.status_code == 400
+    assert not fake_minio.uploads
+
+def test_upload_session_state_machine(client, db, fake_minio, user, auth_headers):
+    data = os.urandom(5 * MEGABYTE + 100)
+    response = client.post("/uploads", headers=auth_headers, json={
+        "file_name": "scan.bin", "file_size": len(data), "part_size": 5 * MEGABYTE
+    })
+    assert response.status_code == 200
+    session = response.json()
+    assert (session["part_count"], session["missing_parts"], session["job"]["status"]) == (2, [1, 2], "uploading")
+    parts_url = f"/uploads/{session['id']}/parts"
+    
+    assert client.put(f"{parts_url}/2", headers=auth_headers, content=data[:10]).status_code == 400
+    assert client.put(f"{parts_url}/3", headers=auth_headers, content=data[:10]).status_code == 400
+    assert client.put(f"{parts_url}/2", headers=auth_headers, content=data[5 * MEGABYTE:]).status_code == 200
+    
+    status = client.get(f"/uploads/{session['id']}", headers=auth_headers).json()
+    assert (status["missing_parts"], status["offset"]) == ([1], 0)
+    assert client.post(f"/uploads/{session['id']}/complete", headers=auth_headers).status_code == 409
+    
+    assert client.put(f"{parts_url}/1", headers=auth_headers, content=data[:5 * MEGABYTE]).status_code == 200
+    response = client.post(f"/uploads/{session['id']}/complete", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert fake_minio.objects[job_crud.get_job(db, session["job"]["id"]).file_path] == data
+    
+    # Завершенная сессия не принимает части и не отменяется
+    assert client.put(f"{parts_url}/1", headers=auth_headers, content=data[:5 * MEGABYTE]).status_code == 409
+    assert client.delete(f"/uploads/{session['id']}", headers=auth_headers).status_code == 409
+
+def test_abort_upload_session(client, db, fake_minio, user, auth_headers):
+    session = client.post("/uploads", headers=auth_headers, json={"file_name": "scan.bin", "file_size": 100}).json()
+    
+    assert client.delete(f"/uploads/{session['id']}", headers=auth_headers).status_code == 200
+    assert not fake_minio.uploads
+    assert job_crud.get_job(db, session["job"]["id"]).status == "failed"
+    assert client.get(f"/uploads/{session['id']}", headers=auth_headers).json()["status"] == "aborted"
+
+def make_large_study(file_count: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zip_file:
+        for index in range(file_count):
+            zip_file.writestr(f"series/{index}.dcm", os.urandom(64))
+    return buffer.getvalue()
+
+def test_complete_session_accepts_archive_over_api_limits(client, db, fake_minio, user, auth_headers):
+    data = make_large_study(zip_utils.ZIP_MAX_FILES + 500)
+    assert not zip_utils.validate_zip_file(data)[0]
+    session = client.post("/uploads", headers=auth_headers, json={"file_name": "study.zip", "file_size": len(data)}).json()
+    
+    assert client.put(f"/uploads/{session['id']}/parts/1", headers=auth_headers, content=data).status_code == 200
+    response = client.post(f"/uploads/{session['id']}/complete", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert job_crud.count_job_files(db, session["job"]["id"]) == zip_utils.ZIP_MAX_FILES + 500
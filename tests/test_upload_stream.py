@@ -0,0 +1,32 @@
+import io
+import hashlib
+from app import minio_utils
+
+def test_checksum_reader_counts_size_and_sha256():
+    data = b"abc" * 1000
+    reader = minio_utils.ChecksumReader(io.BytesIO(data))
+    while reader.read(7):
+        pass
+    assert reader.size == len(data)
+    assert reader.checksum == hashlib.sha256(data).hexdigest()
+
+def test_build_object_name_keeps_extension():
+    object_name = minio_utils.build_object_name("study.ZIP")
+    assert object_name.startswith("jobs/")
+    assert object_name.endswith(".ZIP")
+    assert object_name != minio_utils.build_object_name("study.ZIP")
+
+def test_resolve_content_type():
+    assert minio_utils.resolve_content_type("a.zip", "application/x-custom") == "application/x-custom"
+    assert minio_utils.resolve_content_type("a.zip") == "application/zip"
+    assert minio_utils.resolve_content_type("a.unknownext") == "application/octet-stream"
+
+def test_upload_stream_reads_in_parts(fake_minio):
+    data = bytes(range(256)) * 4096
+    success, object_name, size, checksum = minio_utils.upload_stream_to_minio(
+        io.BytesIO(data), "scan.bin", part_size=64 * 1024
+    )
+    assert success
+    assert fake_minio.objects[object_name] == data
+    assert size == len(data)
+    assert checksum == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,47 @@
+import io
+import zipfile
+from app import job_crud, schemas, zip_utils
+
+def create_zip_job(db, fake_minio, owner_id, files: dict):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(name, data)
+    data = buffer.getvalue()
+    fake_minio.objects["jobs/study.zip"] = data
+    manifest = zip_utils.ZipManifest.from_source(data)
+    file_info = {
+        "file_name": "study.zip",
+        "file_size": len(data),
+        "file_content_type": "application/zip",
+        "file_path": "jobs/study.zip",
+        "file_type": "zip",
+    }
+    return job_crud.create_job(db, schemas.JobCreate(title="study"), owner_id, file_info=file_info, zip_contents=manifest.entries)
+
+def test_zip_entry_with_cyrillic_name(client, db, fake_minio, user, auth_headers):
+    content = "срез".encode() * 1000
+    job = create_zip_job(db, fake_minio, user.id, {"серия 1/срез 1.dcm": content})
+    
+    response = client.get(f"/jobs/{job.id}/zip-entries/серия 1/срез 1.dcm", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content == content
+    assert "filename*=UTF-8''%D1%81%D1%80%D0%B5%D0%B7%201.dcm" in response.headers["content-disposition"]
+    # Из архива читаются только локальный заголовок и данные записи
+    assert all(call[0] != "get" or call[3] for call in fake_minio.calls)
+
+def test_zip_entry_unsupported_method(client, db, fake_minio, user, auth_headers):
+    job = create_zip_job(db, fake_minio, user.id, {"a.txt": b"abc"})
+    job_file = job_crud.get_job_file_by_path(db, job.id, "a.txt")
+    job_file.compress_type = zipfile.ZIP_LZMA
+    db.commit()
+    
+    assert client.get(f"/jobs/{job.id}/zip-entries/a.txt", headers=auth_headers).status_code == 415
+
+def test_job_response_has_no_legacy_zip_contents(client, db, fake_minio, user, auth_headers):
+    job = create_zip_job(db, fake_minio, user.id, {"a.txt": b"abc"})
+    
+    body = client.get(f"/jobs/{job.id}", headers=auth_headers).json()
+    assert body["file_type"] == "zip"
+    # Содержимое архива отдается из job_files через /jobs/{id}/zip-contents
+    assert "zip_contents" not in body
@@ -0,0 +1,91 @@
+import io
+import zipfile
+import pytest
+from app import zip_utils
+
+def make_zip(files: dict, comment: bytes = b"", compress_type: int = zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(name, data, compress_type=compress_type)
+        zip_file.comment = comment
+    return buffer.getvalue()
+
+def test_manifest_collects_entries_and_stats():
+    data = make_zip({"a/1.dcm": b"x" * 10, "a/": b"", "b.txt": b"hello"}, compress_type=zipfile.ZIP_STORED)
+    manifest = zip_utils.ZipManifest.from_source(data)
+    
+    assert [entry["filename"] for entry in manifest.entries] == ["a/1.dcm", "b.txt"]
+    assert manifest.total_size == 15
+    assert manifest.entries[0]["header_offset"] == 0
+    assert manifest.entries[0]["compress_type"] == zipfile.ZIP_STORED
+    assert manifest.validate() == (True, "")
+
+def test_manifest_accepts_file_object():
+    data = make_zip({"a.txt": b"abc"})
+    stream = io.BytesIO(data)
+    stream.seek(5)
+    assert zip_utils.open_zip_manifest(stream, "study.zip").total_files == 1
+
+def test_non_utf8_comment_does_not_hide_archive():
+    comment = "Исследование".encode("cp1251")
+    data = make_zip({"a.txt": b"abc"}, comment=comment)
+    
+    manifest = zip_utils.open_zip_manifest(data, "study.zip")
+    assert manifest is not None
+    assert manifest.comment == comment.decode("cp437")
+    assert zip_utils.is_zip_file(data, "study.zip")
+
+def test_utf8_comment():
+    data = make_zip({"a.txt": b"abc"}, comment="КТ грудной клетки".encode("utf-8"))
+    assert zip_utils.get_zip_file_info(data)["comment"] == "КТ грудной клетки"
+
+def test_validate_rejects_zip_slip_and_bombs():
+    assert not zip_utils.validate_zip_file(make_zip({"../etc/passwd": b"x"}))[0]
+    assert not zip_utils.validate_zip_file(make_zip({"bomb.bin": bytes(1024 * 1024)}))[0]
+
+def test_non_zip_is_not_a_manifest():
+    assert zip_utils.open_zip_manifest(b"not a zip", "study.zip") is None
+    assert zip_utils.open_zip_manifest(make_zip({"a.txt": b"abc"}), "study.tar") is None
+
+def iter_compressed(data: bytes, entry: dict, chunk_size: int = 7):
+    start = entry["header_offset"]
+    data_offset = start + zip_utils.get_entry_data_offset(data[start:start + zip_utils.LOCAL_HEADER_SIZE])
+    compressed = data[data_offset:data_offset + entry["compressed_size"]]
+    return iter([compressed[index:index + chunk_size] for index in range(0, len(compressed), chunk_size)])
+
+def read_entry(data: bytes, entry: dict, crc=None) -> bytes:
+    return b"".join(zip_utils.iter_entry_data(iter_compressed(data, entry), entry["compress_type"], crc))
+
+@pytest.mark.parametrize("compress_type", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_iter_entry_data_reads_entry_by_offset(compress_type):
+    files = {"first.txt": b"first" * 100, "папка/второй.dcm": bytes(range(256)) * 20}
+    data = make_zip(files, compress_type=compress_type)
+    manifest = zip_utils.ZipManifest.from_source(data)
+    for entry in manifest.entries:
+        assert read_entry(data, entry, entry["crc"]) == files[entry["filename"]]
+
+@pytest.mark.parametrize("compress_type", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_iter_entry_data_detects_crc_mismatch(compress_type):
+    data = make_zip({"a.txt": b"payload" * 50}, compress_type=compress_type)
+    entry = zip_utils.ZipManifest.from_source(data).entries[0]
+    with pytest.raises(zipfile.BadZipFile):
+        read_entry(data, entry, entry["crc"] ^ 1)
+        
+    # До ошибки отдается меньше байт, чем размер записи
+    received = bytearray()
+    chunks = zip_utils.iter_entry_data(iter_compressed(data, entry), entry["compress_type"], entry["crc"] ^ 1)
+    with pytest.raises(zipfile.BadZipFile):
+        for chunk in chunks:
+            received += chunk
+    assert 0 < len(received) < entry["size"]
+
+def test_iter_entry_data_rejects_unsupported_method():
+    with pytest.raises(ValueError):
+        list(zip_utils.iter_entry_data(iter([b"x"]), zipfile.ZIP_BZIP2))
+
+def test_get_entry_data_offset_checks_signature():
+    with pytest.raises(zipfile.BadZipFile):
+        zip_utils.get_entry_data_offset(b"\0" * zip_utils.LOCAL_HEADER_SIZE)
+    with pytest.raises(zipfile.BadZipFile):
+        zip_utils.get_entry_data_offset(b"PK\x03\x04")